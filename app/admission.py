@@ -0,0 +1,156 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
+
+from app.config import settings
+
+
+class TokenBucket:
+    """
+    Классический token bucket: capacity токенов, пополнение refill_rate токенов в секунду.
+    """
+
+    def __init__(self, capacity: float, refill_rate: float, now: float):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.tokens = capacity
+        self.updated_at = now
+
+    def try_acquire(self, now: float) -> float:
+        """
+        Забирает один токен. Возвращает 0, если токен выдан, иначе
+        сколько секунд ждать до появления следующего.
+        """
+        elapsed = max(0.0, now - self.updated_at)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        if self.refill_rate <= 0:
+            return 60.0
+        return (1 - self.tokens) / self.refill_rate
+
+
+class LoginAdmission:
+    """
+    Внутрипроцессный контроль допуска к логину: token bucket на IP и на email
+    плюс общий лимит одновременных проверок пароля. Число отслеживаемых
+    ключей ограничено (LRU), чтобы поток случайных email не съел память.
+    """
+
+    def __init__(self, ip_burst: int, ip_per_minute: float,
+                 email_burst: int, email_per_minute: float,
+                 max_in_flight: int, max_keys: int,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ip_burst = ip_burst
+        self.ip_rate = ip_per_minute / 60
+        self.email_burst = email_burst
+        self.email_rate = email_per_minute / 60
+        self.max_in_flight = max_in_flight
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: OrderedDict[tuple[str, str], TokenBucket] = OrderedDict()
+        self.in_flight = 0
+        self.admitted = 0
+        self.rate_limited = 0
+        self.overloaded = 0
+
+    def _bucket(self, kind: str, key: str, now: float) -> TokenBucket:
+        bucket_key = (kind, key)
+        bucket = self._buckets.get(bucket_key)
+        if bucket is None:
+            if kind == 'ip':
+                bucket = TokenBucket(self.ip_burst, self.ip_rate, now)
+            else:
+                bucket = TokenBucket(self.email_burst, self.email_rate, now)
+            self._buckets[bucket_key] = bucket
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(bucket_key)
+        return bucket
+
+    def check_rate(self, ip: Optional[str], email: str) -> float:
+        """
+        Списывает токены у IP и email. Возвращает 0 или Retry-After в секундах.
+        """
+        now = self.clock()
+        for kind, key in (('ip', ip or 'unknown'), ('email', email.strip().lower())):
+            retry_after = self._bucket(kind, key, now).try_acquire(now)
+            if retry_after:
+                self.rate_limited += 1
+                return retry_after
+        return 0.0
+
+    def try_enter(self) -> bool:
+        """Занимает слот проверки пароля, если общий лимит не исчерпан."""
+        if self.in_flight >= self.max_in_flight:
+            self.overloaded += 1
+            return False
+        self.in_flight += 1
+        self.admitted += 1
+        return True
+
+    def leave(self) -> None:
+        self.in_flight -= 1
+
+    def reset(self) -> None:
+        self._buckets.clear()
+        self.in_flight = 0
+        self.admitted = 0
+        self.rate_limited = 0
+        self.overloaded = 0
+
+    def stats(self) -> dict:
+        return {
+            'tracked_keys': len(self._buckets),
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'admitted': self.admitted,
+            'rate_limited': self.rate_limited,
+            'overloaded': self.overloaded,
+        }
+
+
+login_admission = LoginAdmission(
+    ip_burst=settings.LOGIN_RATE_IP_BURST,
+    ip_per_minute=settings.LOGIN_RATE_IP_PER_MINUTE,
+    email_burst=settings.LOGIN_RATE_EMAIL_BURST,
+    email_per_minute=settings.LOGIN_RATE_EMAIL_PER_MINUTE,
+    max_in_flight=settings.LOGIN_MAX_IN_FLIGHT,
+    max_keys=settings.LOGIN_RATE_MAX_KEYS,
+)
+
+
+def _retry_after_header(seconds: float) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+
+async def admit_login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    """
+    Зависимость для POST /users/token. Отказывает до обращения к БД и argon2:
+    429 при превышении частоты по IP/email, 503 при переполнении общего лимита.
+    """
+    client_ip = request.client.host if request.client else None
+    retry_after = login_admission.check_rate(client_ip, form_data.username)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, try again later",
+            headers=_retry_after_header(retry_after),
+        )
+    if not login_admission.try_enter():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication service is busy, try again later",
+            headers=_retry_after_header(settings.PASSWORD_HASH_RETRY_AFTER_SECONDS),
+        )
+    try:
+        yield
+    finally:
+        login_admission.leave()
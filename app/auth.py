@@ -1,18 +1,28 @@
+import hashlib
+import time
+from dataclasses import dataclass
+
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime, timedelta, timezone
 import jwt
 from fastapi import Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, inspect
+from sqlalchemy.orm import make_transient_to_detached
 
+from app.cache import TTLCache
+from app.password_pool import BoundedExecutor, PoolSaturatedError
 from app.models.users import User as UserModel, UserRole
 from app.config import settings
 from app.db_depends import get_async_db
 
 
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+pwd_context = CryptContext(schemes=["argon2"], deprecated="auto",
+                           argon2__rounds=settings.PASSWORD_HASH_TIME_COST,
+                           argon2__memory_cost=settings.PASSWORD_HASH_MEMORY_COST_KIB,
+                           argon2__parallelism=settings.PASSWORD_HASH_PARALLELISM)
 
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
@@ -21,6 +31,22 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/token")
 oauth2_refresh_scheme = OAuth2PasswordBearer(tokenUrl="users/token",
                                              scheme_name="RefreshTokenAuth")
 
+principal_cache = TTLCache(maxsize=settings.PRINCIPAL_CACHE_SIZE,
+                           ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+                           name='principals')
+
+token_version_cache = TTLCache(maxsize=settings.TOKEN_VERSION_CACHE_SIZE,
+                               ttl=settings.TOKEN_VERSION_CACHE_TTL_SECONDS,
+                               name='token_versions')
+
+jwt_cache = TTLCache(maxsize=settings.JWT_CACHE_SIZE,
+                     ttl=settings.JWT_CACHE_MAX_TTL_SECONDS,
+                     name='jwt')
+
+password_pool = BoundedExecutor(max_workers=settings.PASSWORD_HASH_WORKERS,
+                                max_queue=settings.PASSWORD_HASH_QUEUE_SIZE,
+                                kind=settings.PASSWORD_HASH_EXECUTOR)
+
 
 def hash_password(password: str) -> str:
     """
@@ -34,6 +60,136 @@ def verify_password(plain_password, hashed_password):
     """
     return pwd_context.verify(plain_password, hashed_password)
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    Проверяет, создан ли хеш с устаревшими параметрами argon2.
+    """
+    return pwd_context.needs_update(hashed_password)
+
+async def _run_password_job(func, *args):
+    """
+    Выполняет хеширование в password_pool. При переполнении очереди отвечает 503.
+    """
+    try:
+        return await password_pool.run(func, *args)
+    except PoolSaturatedError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication service is busy, try again later",
+            headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+        )
+
+async def hash_password_async(password: str) -> str:
+    """
+    Асинхронная версия hash_password: не блокирует event loop.
+    """
+    return await _run_password_job(hash_password, password)
+
+async def verify_password_async(plain_password, hashed_password) -> bool:
+    """
+    Асинхронная версия verify_password: не блокирует event loop.
+    """
+    return await _run_password_job(verify_password, plain_password, hashed_password)
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """
+    Лёгкое представление пользователя из подписанных claims токена
+    (режим AUTH_STATELESS). Не привязано к сессии SQLAlchemy.
+    """
+    id: int
+    email: str
+    role: UserRole
+    token_version: int = 0
+
+
+def _principal_snapshot(user: UserModel) -> dict:
+    """
+    Снимок колонок пользователя для кэша (без связей, отложенных подзапросов
+    вроде owned_projects_count и состояния сессии).
+    """
+    return {attr.key: getattr(user, attr.key) for attr in inspect(UserModel).column_attrs
+            if not attr.deferred}
+
+async def _principal_from_snapshot(db: AsyncSession, snapshot: dict) -> UserModel:
+    """
+    Восстанавливает пользователя из снимка и привязывает его к сессии без запроса в БД.
+    """
+    user = UserModel(**snapshot)
+    make_transient_to_detached(user)
+    return await db.merge(user, load=False)
+
+def invalidate_principal(user: UserModel) -> None:
+    """
+    Сбрасывает закэшированного пользователя и его версию токенов.
+    Вызывать при смене роли, данных профиля или деактивации.
+    """
+    principal_cache.invalidate(user.email)
+    token_version_cache.invalidate(user.id)
+
+def token_claims(user: UserModel) -> dict:
+    """
+    Claims для access/refresh токенов пользователя.
+    """
+    return {"sub": user.email, "role": user.role.name, "id": user.id, "ver": user.token_version}
+
+def _revoked_token_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Token has been revoked",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+async def _principal_from_claims(db: AsyncSession, payload: dict) -> Principal:
+    """
+    Собирает Principal из claims без загрузки пользователя. Отзыв токенов
+    проверяется по token_version из небольшого кэша версий.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    user_id = payload.get("id")
+    role = payload.get("role")
+    if user_id is None or role not in UserRole.__members__:
+        raise credentials_exception
+
+    state = token_version_cache.get(user_id)
+    if state is None:
+        row = (await db.execute(
+            select(UserModel.token_version, UserModel.is_active)
+            .where(UserModel.id == user_id))).first()
+        if row is None:
+            raise credentials_exception
+        state = (row.token_version, row.is_active)
+        token_version_cache.set(user_id, state)
+
+    current_version, is_active = state
+    if not is_active:
+        raise credentials_exception
+    if current_version != payload.get("ver", 0):
+        raise _revoked_token_exception()
+    return Principal(id=user_id, email=payload["sub"], role=UserRole[role],
+                     token_version=current_version)
+
+
+def decode_token(token: str) -> dict:
+    """
+    Проверяет подпись и декодирует JWT. Уже проверенные токены запоминаются
+    по sha256 до их собственного exp, повторные запросы не пересчитывают HMAC.
+    Ошибки jwt.PyJWTError пробрасываются как есть.
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    payload = jwt_cache.get(key)
+    if payload is not None:
+        return payload
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    expires_at = payload.get("exp")
+    if expires_at is not None:
+        jwt_cache.set(key, payload, ttl=expires_at - time.time())
+    return payload
+
 def create_access_token(data: dict):
     """
     Создаёт JWT с payload (sub, role, id, exp).
@@ -57,6 +213,8 @@ async def get_current_user(token: str = Depends(oauth2_scheme),
                            db: AsyncSession = Depends(get_async_db)):
     """
     Проверяет JWT и возвращает пользователя из базы.
+    Активные пользователи кэшируются по sub на PRINCIPAL_CACHE_TTL_SECONDS.
+    В режиме AUTH_STATELESS возвращает Principal из claims без загрузки пользователя.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -64,7 +222,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme),
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_token(token)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
@@ -76,11 +234,20 @@ async def get_current_user(token: str = Depends(oauth2_scheme),
         )
     except jwt.PyJWTError:
         raise credentials_exception
-    user = await db.scalar(
-        select(UserModel)
-        .where(UserModel.email == email, UserModel.is_active == True))
-    if user is None:
-        raise credentials_exception
+
+    if settings.AUTH_STATELESS:
+        return await _principal_from_claims(db, payload)
+
+    snapshot = principal_cache.get(email)
+    if snapshot is not None:
+        user = await _principal_from_snapshot(db, snapshot)
+    else:
+        user = await db.scalar(
+            select(UserModel)
+            .where(UserModel.email == email, UserModel.is_active == True))
+        if user is None:
+            raise credentials_exception
+        principal_cache.set(email, _principal_snapshot(user))
     return user
 
 
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List, Literal  # Используем Literal для ENVIRONMENT
+from typing import List, Literal, Optional  # Используем Literal для ENVIRONMENT
 
 import os
 
@@ -20,11 +20,90 @@ class Settings(BaseSettings):
     ALGORITHM: str = 'HS256'
 
     DATABASE_URL: str
+    # Реплика для чтения. Если не задана, чтение идёт в основную БД.
+    DATABASE_REPLICA_URL: Optional[str] = None
+    # Сколько секунд после изменения пользователь читает из основной БД (read-your-writes)
+    READ_YOUR_WRITES_SECONDS: float = 5
+
+    # Пул соединений. Логирование SQL (DB_ECHO) включать только при разработке.
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
+    # Счётчик SQL-запросов на HTTP-запрос (заголовки X-DB-Queries, Server-Timing)
+    # и порог повторов одной формы запроса, после которого ответ помечается как N+1
+    QUERY_STATS_ENABLED: bool = True
+    QUERY_STATS_N_PLUS_ONE_THRESHOLD: int = 5
+
+    # Размер страницы для списков с курсорной пагинацией
+    PAGE_SIZE_DEFAULT: int = 50
+    PAGE_SIZE_MAX: int = 200
+    # Максимум задач в одном POST /projects/{id}/tasks:bulk
+    TASK_BULK_MAX_ITEMS: int = 1000
+    # До скольких строк total считается точно; больше - оценка планировщика
+    COUNT_EXACT_LIMIT: int = 10000
+    # Размер выдачи GET /users/lookup (автодополнение)
+    USER_LOOKUP_LIMIT_DEFAULT: int = 10
+    USER_LOOKUP_LIMIT_MAX: int = 50
+    # Сводка профиля: сколько последних и срочных задач и новых проектов отдавать
+    PROFILE_SUMMARY_SIZE: int = 5
+    PROFILE_SUMMARY_SIZE_MAX: int = 50
+    # Архивация проекта: задач за один INSERT ... SELECT + DELETE (одна транзакция)
+    ARCHIVE_CHUNK_SIZE: int = 1000
 
     CORS_ALLOW_ORIGINS: List[str] = ["*"]
     HOST: str = '0.0.0.0'
     PORT: int = 8000
 
+    # Кэш пользователей, прошедших аутентификацию (ключ - sub из токена)
+    PRINCIPAL_CACHE_SIZE: int = 1024
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+
+    # Аутентификация только по подписанным claims, без загрузки пользователя.
+    # Отзыв токенов - через users.token_version (кэш версий ниже).
+    AUTH_STATELESS: bool = False
+    TOKEN_VERSION_CACHE_SIZE: int = 4096
+    TOKEN_VERSION_CACHE_TTL_SECONDS: int = 30
+
+    # Кэш уже проверенных JWT (запись живёт до exp токена, но не дольше лимита)
+    JWT_CACHE_SIZE: int = 10000
+    JWT_CACHE_MAX_TTL_SECONDS: int = 3600
+
+    # Индекс членства user_id -> проекты (владелец/участник) в памяти процесса.
+    # Ограничен числом пользователей и суммарным числом хранимых ID проектов.
+    MEMBERSHIP_INDEX_MAX_USERS: int = 10000
+    MEMBERSHIP_INDEX_MAX_PROJECT_IDS: int = 500000
+    MEMBERSHIP_INDEX_TTL_SECONDS: int = 60
+
+    # Кэш GET /projects/{id}/stats; сбрасывается при записи задач проекта,
+    # TTL ограничивает устаревание из-за записей в других процессах
+    PROJECT_STATS_CACHE_SIZE: int = 1024
+    PROJECT_STATS_CACHE_TTL_SECONDS: int = 30
+
+    # Пул для хеширования/проверки паролей (argon2) вне event loop
+    PASSWORD_HASH_EXECUTOR: Literal['thread', 'process'] = 'thread'
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_SIZE: int = 32
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 1
+
+    # Параметры argon2. Подбираются под железо скриптом app/scripts/calibrate_argon2.py,
+    # хеши со старыми параметрами пересчитываются при логине.
+    PASSWORD_HASH_TIME_COST: int = 3
+    PASSWORD_HASH_MEMORY_COST_KIB: int = 65536
+    PASSWORD_HASH_PARALLELISM: int = 4
+    PASSWORD_HASH_TARGET_MS: int = 250
+
+    # Контроль допуска к POST /users/token (token bucket на IP и email)
+    LOGIN_RATE_IP_BURST: int = 20
+    LOGIN_RATE_IP_PER_MINUTE: float = 60
+    LOGIN_RATE_EMAIL_BURST: int = 5
+    LOGIN_RATE_EMAIL_PER_MINUTE: float = 10
+    LOGIN_RATE_MAX_KEYS: int = 10000
+    LOGIN_MAX_IN_FLIGHT: int = 8
+
     model_config = SettingsConfigDict(
         env_file='.env', # '.env.local',
         env_file_encoding='utf-8')
@@ -1,6 +1,20 @@
 from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import jwt
+from fastapi import Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import async_session_maker
+
+from app.database import async_engine, async_read_engine, async_session_maker, async_read_session_maker
+from app.cache import TTLCache
+from app.config import settings
+
+SAFE_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+
+# Пользователи, недавно изменявшие данные: их чтения идут в основную БД
+recent_writers = TTLCache(maxsize=10000, ttl=settings.READ_YOUR_WRITES_SECONDS,
+                          name='read_your_writes')
 
 
 async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
@@ -8,4 +22,61 @@ async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
     Предоставляет асинхронную сессию SQLAlchemy для работы с базой данных PostgreSQL.
     """
     async with async_session_maker() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+def _request_subject(request: Request) -> Optional[str]:
+    """
+    sub из Bearer-токена без проверки подписи: используется только для
+    маршрутизации чтения, аутентификацию выполняет get_current_user.
+    """
+    scheme, _, token = request.headers.get('authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return None
+    try:
+        return jwt.decode(token, options={'verify_signature': False}).get('sub')
+    except jwt.PyJWTError:
+        return None
+
+
+def remember_write(request: Request) -> None:
+    """
+    Отмечает, что автор запроса изменил данные: следующие
+    READ_YOUR_WRITES_SECONDS секунд его чтения идут в основную БД.
+    """
+    subject = _request_subject(request)
+    if subject is not None:
+        recent_writers.set(subject, True)
+
+
+async def get_async_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Сессия для запросов только на чтение. Идёт в реплику (DATABASE_REPLICA_URL),
+    кроме пользователей, недавно изменявших данные.
+    """
+    session_maker = async_read_session_maker
+    if session_maker is not async_session_maker:
+        subject = _request_subject(request)
+        if subject is not None and recent_writers.get(subject):
+            session_maker = async_session_maker
+    async with session_maker() as session:
+        yield session
+
+
+def is_replica_session(db: AsyncSession) -> bool:
+    """Сессия читает из реплики (DATABASE_REPLICA_URL), а не из основной БД."""
+    return async_read_engine is not async_engine and db.bind is async_read_engine
+
+
+@asynccontextmanager
+async def primary_session(db: AsyncSession) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Сессия основной БД для заполнения внутрипроцессных кэшей: сама db, если она
+    не из реплики, иначе отдельная короткая сессия. Отстающая реплика не должна
+    попадать в кэш, общий для всех пользователей процесса.
+    """
+    if not is_replica_session(db):
+        yield db
+        return
+    async with async_session_maker() as session:
+        yield session
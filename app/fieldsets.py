@@ -0,0 +1,214 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Iterable, Optional
+
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel, create_model
+from sqlalchemy.orm import InstrumentedAttribute, joinedload, load_only, raiseload, selectinload
+
+from app.models.archive import ArchivedTask
+from app.models.projects import Project
+from app.models.tasks import Task
+from app.models.users import User as UserModel
+from app.schemas import ProjectListSchema, ProjectRead, TaskRead, UserBasicSchema, UserRead
+
+
+@dataclass(frozen=True)
+class Relation:
+    """
+    Связь, которую клиент включает через ?include=. loader - стратегия загрузки
+    (None - связь загружает сервис, например страницей), nested - связи следующего
+    уровня, которые нужны вложенной схеме ответа, fields - поля ответа, которые
+    связь заполняет (по умолчанию - одноимённое).
+    """
+    attribute: InstrumentedAttribute
+    loader: Optional[Callable] = selectinload
+    nested: tuple[InstrumentedAttribute, ...] = ()
+    fields: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class ResourceFields:
+    """
+    Поля ресурса для ?fields= и ?include=: колонки, которые можно запросить,
+    связи и колонки, без которых сервис не обходится (ключ, владелец для проверки прав).
+    """
+    schema: type[BaseModel]
+    columns: dict[str, InstrumentedAttribute]
+    relations: dict[str, Relation] = field(default_factory=dict)
+    required: tuple[InstrumentedAttribute, ...] = ()
+
+    def parse(self, fields: Optional[str], include: Optional[str]) -> 'FieldSet':
+        """
+        Разбирает списки через запятую. Не указанный параметр - все поля / все связи,
+        пустая строка в include - без связей. Бросает ValueError на неизвестные имена.
+        """
+        selected = self._names(fields, self.columns, 'поле') if fields is not None else frozenset(self.columns)
+        included = (self._names(include, self.relations, 'связь') if include is not None
+                    else frozenset(self.relations))
+        return FieldSet(self, selected | {'id'}, included)
+
+    @staticmethod
+    def _names(value: str, allowed: dict, kind: str) -> frozenset[str]:
+        names = frozenset(name.strip() for name in value.split(',') if name.strip())
+        unknown = sorted(names - allowed.keys())
+        if unknown:
+            raise ValueError(f"Неизвестное {kind}: {', '.join(unknown)}. "
+                             f"Допустимо: {', '.join(sorted(allowed))}")
+        return names
+
+    def dependency(self) -> Callable[..., 'FieldSet']:
+        """Зависимость FastAPI: query-параметры fields и include -> FieldSet (400 на ошибку)."""
+        columns = ', '.join(self.columns)
+        relations = ', '.join(self.relations)
+
+        def fieldset(fields: Optional[str] = Query(None, description=f'Поля через запятую: {columns}'),
+                     include: Optional[str] = Query(None, description=f'Связи через запятую: {relations}; '
+                                                                      f'пусто - без связей')) -> FieldSet:
+            try:
+                return self.parse(fields, include)
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+        def fieldset_columns(fields: Optional[str] = Query(
+                None, description=f'Поля через запятую: {columns}')) -> FieldSet:
+            try:
+                return self.parse(fields, None)
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+        return fieldset if self.relations else fieldset_columns
+
+    @property
+    def full(self) -> 'FieldSet':
+        """Все поля и связи - ответ как до появления ?fields= и ?include=."""
+        return FieldSet(self, frozenset(self.columns), frozenset(self.relations))
+
+
+@lru_cache(maxsize=None)
+def _partial(schema: type[BaseModel]) -> type[BaseModel]:
+    """
+    Подкласс схемы, где все поля необязательны. Экземпляр остаётся схемой ответа
+    (FastAPI принимает его без повторной проверки), а response_model_exclude_unset
+    отбрасывает не запрошенные поля. Валидаторы схемы наследуются.
+    """
+    overrides = {name: (Optional[info.annotation], None) for name, info in schema.model_fields.items()}
+    return create_model(f'Partial{schema.__name__}', __base__=schema, **overrides)
+
+
+@dataclass(frozen=True)
+class FieldSet:
+    """Запрошенные поля и связи ресурса."""
+    resource: ResourceFields
+    fields: frozenset[str]
+    include: frozenset[str]
+
+    def load_options(self, joined: Iterable[str] = ()) -> list:
+        """
+        Загрузчики для запроса ресурса: load_only по запрошенным и служебным колонкам,
+        загрузка только включённых связей, raiseload для остальных - обращение, которому
+        нужен SQL, падает, а не превращается в скрытый запрос. joined - связи, которые
+        загружаются JOIN-ом в том же запросе вместо отдельного SELECT.
+        """
+        columns = {self.resource.columns[name] for name in self.fields} | set(self.resource.required)
+        options: list[Any] = [load_only(*columns, raiseload=True)]
+        for name in sorted(self.include):
+            relation = self.resource.relations[name]
+            if relation.loader is None:
+                continue
+            loader = joinedload if name in joined else relation.loader
+            option = loader(relation.attribute)
+            for nested in relation.nested:
+                options.append(option.selectinload(nested))
+            if not relation.nested:
+                options.append(option)
+        options.append(raiseload('*', sql_only=True))
+        return options
+
+    def rebind(self, resource: ResourceFields) -> 'FieldSet':
+        """Тот же выбор для ресурса с теми же именами полей (задачи из архива)."""
+        return FieldSet(resource, self.fields, self.include)
+
+    def response_fields(self) -> list[str]:
+        result = list(self.fields)
+        for name in self.include:
+            result.extend(self.resource.relations[name].fields or (name,))
+        return result
+
+    def shape(self, obj: Any) -> BaseModel:
+        """Ответ только из запрошенных полей; остальные атрибуты объекта не читаются."""
+        data = {name: getattr(obj, name) for name in self.response_fields()}
+        return _partial(self.resource.schema).model_validate(data, from_attributes=True)
+
+    def shape_many(self, objects: Iterable[Any]) -> list[BaseModel]:
+        return [self.shape(obj) for obj in objects]
+
+
+TASK_COLUMNS = {name: getattr(Task, name) for name in
+                ('id', 'project_id', 'title', 'description', 'status', 'priority', 'created_at', 'due_date')}
+
+PROJECT_LIST_FIELDS = ResourceFields(
+    schema=ProjectListSchema,
+    columns={name: getattr(Project, name) for name in ('id', 'title', 'description', 'dub_date', 'is_active')},
+    relations={'owner': Relation(Project.owner, joinedload)},
+    required=(Project.id, Project.owner_id, Project.created_at),
+)
+
+PROJECT_FIELDS = ResourceFields(
+    schema=ProjectRead,
+    columns={**PROJECT_LIST_FIELDS.columns, 'members_count': Project.members_count},
+    relations={
+        'owner': Relation(Project.owner, joinedload),
+        # Первая страница задач, ProjectService.get_project
+        'tasks': Relation(Project.tasks, None, fields=('tasks', 'tasks_next_cursor')),
+        'members': Relation(Project.members),
+        'task_counters': Relation(Project.task_counters),
+    },
+    required=(Project.id, Project.owner_id),
+)
+
+TASK_FIELDS = ResourceFields(
+    schema=TaskRead,
+    columns=TASK_COLUMNS,
+    relations={
+        'project': Relation(Task.project),
+        'assigned_to': Relation(Task.assigned_to),
+        'author': Relation(Task.author),
+    },
+    required=(Task.id, Task.project_id, Task.created_at, Task.assigned_to_id, Task.author_id),
+)
+
+# Те же поля задачи в archived_tasks: ?archived=true на чтении задач проекта
+ARCHIVED_TASK_FIELDS = ResourceFields(
+    schema=TaskRead,
+    columns={name: getattr(ArchivedTask, name) for name in TASK_COLUMNS},
+    relations={
+        'project': Relation(ArchivedTask.project),
+        'assigned_to': Relation(ArchivedTask.assigned_to),
+        'author': Relation(ArchivedTask.author),
+    },
+    required=(ArchivedTask.id, ArchivedTask.project_id, ArchivedTask.created_at,
+              ArchivedTask.assigned_to_id, ArchivedTask.author_id),
+)
+
+USER_COLUMNS = {name: getattr(UserModel, name) for name in
+                ('id', 'email', 'first_name', 'last_name', 'position', 'role', 'is_active')}
+
+USER_FIELDS = ResourceFields(
+    schema=UserRead,
+    columns={**USER_COLUMNS, 'owned_projects_count': UserModel.owned_projects_count},
+    relations={
+        # Сводка профиля фиксированного размера, UserService._finish_profile
+        'recent_tasks': Relation(UserModel.assigned_tasks, None),
+        'urgent_tasks': Relation(UserModel.assigned_tasks, None),
+        'owned_projects': Relation(UserModel.owned_projects, None),
+        'task_counts': Relation(UserModel.task_counter, joinedload, fields=('task_counts', 'tasks_count')),
+    },
+    required=(UserModel.id, UserModel.email),
+)
+
+USER_LIST_FIELDS = ResourceFields(
+    schema=UserBasicSchema,
+    columns=USER_COLUMNS,
+    required=(UserModel.id, UserModel.first_name),
+)
@@ -1,7 +1,9 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import users, projects, tasks
+from app.routers import users, projects, tasks, admin, search
 from app.config import settings
+from app.db_depends import SAFE_METHODS, remember_write
+from app.query_stats import query_stats_middleware
 import app.schemas.tasks
 
 app = FastAPI(
@@ -17,12 +19,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-DB-Queries", "X-DB-N-Plus-One", "Server-Timing",
+                    "X-Next-Cursor", "X-Total-Count", "X-Total-Count-Estimated"],
 )
 
+@app.middleware('http')
+async def read_your_writes(request: Request, call_next):
+    """
+    После успешного изменения данных направляет чтения пользователя в основную БД.
+    """
+    response = await call_next(request)
+    if request.method not in SAFE_METHODS and response.status_code < 400:
+        remember_write(request)
+    return response
+
+if settings.QUERY_STATS_ENABLED:
+    app.middleware('http')(query_stats_middleware)
+
 app.include_router(users.router)
 app.include_router(projects.router)
 app.include_router(tasks.router_project_tasks, prefix="/projects")
 app.include_router(tasks.router_global_tasks)
+app.include_router(admin.router)
+app.include_router(search.router)
 
 
 
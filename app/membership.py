@@ -0,0 +1,166 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db_depends import primary_session
+from app.models.projects import Project, ProjectMember
+
+
+@dataclass(frozen=True, slots=True)
+class UserMemberships:
+    """Проекты пользователя: где он владелец и где участник (без своих)."""
+    owned: frozenset[int] = frozenset()
+    member_of: frozenset[int] = frozenset()
+
+    @property
+    def project_ids(self) -> frozenset[int]:
+        return self.owned | self.member_of
+
+    @property
+    def size(self) -> int:
+        return len(self.owned) + len(self.member_of)
+
+
+class MembershipIndex:
+    """
+    Внутрипроцессный индекс user_id -> UserMemberships. Запись строится лениво
+    одним запросом и обновляется сервисами после commit (добавление/удаление
+    участника, создание/удаление проекта). Размер ограничен числом пользователей
+    и суммарным числом хранимых ID проектов (LRU), TTL страхует от изменений,
+    сделанных другими процессами.
+    """
+
+    def __init__(self, max_users: int, max_project_ids: int, ttl: float, name: str = 'memberships'):
+        self.max_users = max_users
+        self.max_project_ids = max_project_ids
+        self.ttl = ttl
+        self.name = name
+        self._data: OrderedDict[int, tuple[float, UserMemberships]] = OrderedDict()
+        self._stored_ids = 0
+        # Растёт при каждом изменении: загрузка, пересёкшаяся с изменением, не кэшируется
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id: int) -> Optional[UserMemberships]:
+        entry = self._data.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, memberships = entry
+        if expires_at <= time.monotonic():
+            self._drop(user_id)
+            self.misses += 1
+            return None
+        self._data.move_to_end(user_id)
+        self.hits += 1
+        return memberships
+
+    async def memberships(self, db: AsyncSession, user_id: int) -> UserMemberships:
+        """
+        Проекты пользователя из индекса или одним запросом к БД.
+        Промах загружается из основной БД, даже если db - сессия реплики.
+        """
+        memberships = self.get(user_id)
+        if memberships is not None:
+            return memberships
+        generation = self._generation
+        member_ids = select(ProjectMember.project_id).where(ProjectMember.user_id == user_id)
+        async with primary_session(db) as primary:
+            rows = (await primary.execute(
+                select(Project.id, Project.owner_id)
+                .where(or_(Project.owner_id == user_id, Project.id.in_(member_ids)))
+            )).all()
+        memberships = UserMemberships(
+            owned=frozenset(row.id for row in rows if row.owner_id == user_id),
+            member_of=frozenset(row.id for row in rows if row.owner_id != user_id))
+        if generation == self._generation:
+            self._store(user_id, memberships)
+        return memberships
+
+    def _store(self, user_id: int, memberships: UserMemberships) -> None:
+        # Старая запись удаляется и тогда, когда новая слишком велика для индекса
+        self._drop(user_id)
+        if self.max_users <= 0 or memberships.size > self.max_project_ids:
+            return
+        self._data[user_id] = (time.monotonic() + self.ttl, memberships)
+        self._stored_ids += memberships.size
+        while len(self._data) > self.max_users or self._stored_ids > self.max_project_ids:
+            evicted_id, _ = next(iter(self._data.items()))
+            self._drop(evicted_id)
+            self.evictions += 1
+
+    def _drop(self, user_id: int) -> None:
+        entry = self._data.pop(user_id, None)
+        if entry is not None:
+            self._stored_ids -= entry[1].size
+
+    def _update(self, user_id: int, owned: frozenset[int], member_of: frozenset[int]) -> None:
+        self._generation += 1
+        if user_id in self._data:
+            self._store(user_id, UserMemberships(owned, member_of))
+
+    def add_project(self, project_id: int, owner_id: int) -> None:
+        """Новый проект: владелец получает его в owned."""
+        current = self._peek(owner_id)
+        self._update(owner_id, current.owned | {project_id}, current.member_of - {project_id})
+
+    def add_member(self, project_id: int, user_id: int) -> None:
+        current = self._peek(user_id)
+        member_of = current.member_of if project_id in current.owned else current.member_of | {project_id}
+        self._update(user_id, current.owned, member_of)
+
+    def remove_member(self, project_id: int, user_id: int) -> None:
+        current = self._peek(user_id)
+        self._update(user_id, current.owned, current.member_of - {project_id})
+
+    def remove_project(self, project_id: int) -> None:
+        """Удалённый проект исчезает у всех закэшированных пользователей."""
+        self._generation += 1
+        affected = [user_id for user_id, (_, memberships) in self._data.items()
+                    if project_id in memberships.owned or project_id in memberships.member_of]
+        for user_id in affected:
+            current = self._data[user_id][1]
+            self._update(user_id, current.owned - {project_id}, current.member_of - {project_id})
+
+    def _peek(self, user_id: int) -> UserMemberships:
+        entry = self._data.get(user_id)
+        return entry[1] if entry is not None else UserMemberships()
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._stored_ids = 0
+        self._generation += 1
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'name': self.name,
+            'size': len(self._data),
+            'maxsize': self.max_users,
+            'project_ids': self._stored_ids,
+            'max_project_ids': self.max_project_ids,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+membership_index = MembershipIndex(
+    max_users=settings.MEMBERSHIP_INDEX_MAX_USERS,
+    max_project_ids=settings.MEMBERSHIP_INDEX_MAX_PROJECT_IDS,
+    ttl=settings.MEMBERSHIP_INDEX_TTL_SECONDS,
+)
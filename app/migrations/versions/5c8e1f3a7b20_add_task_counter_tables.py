@@ -0,0 +1,64 @@
+"""Add task counter tables
+
+Revision ID: 5c8e1f3a7b20
+Revises: b47e0c5d9a18
+Create Date: 2026-10-17 18:05:42.530114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c8e1f3a7b20'
+down_revision: Union[str, Sequence[str], None] = 'b47e0c5d9a18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'user_task_counters',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('open_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('done_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('blocked_count', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+    op.create_table(
+        'project_task_counters',
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('status', postgresql.ENUM(name='task_status', create_type=False), nullable=False),
+        sa.Column('priority', postgresql.ENUM(name='task_priority', create_type=False), nullable=False),
+        sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('project_id', 'status', 'priority'),
+    )
+    # Начальное заполнение из существующих задач (то же, что TaskCounterService.rebuild)
+    op.execute("""
+        INSERT INTO project_task_counters (project_id, status, priority, count)
+        SELECT project_id, status, priority, count(*)
+        FROM tasks
+        GROUP BY project_id, status, priority
+    """)
+    op.execute("""
+        INSERT INTO user_task_counters (user_id, open_count, done_count, blocked_count)
+        SELECT assigned_to_id,
+               sum(CASE WHEN status IN ('todo', 'in_progress') THEN 1 ELSE 0 END),
+               sum(CASE WHEN status = 'done' THEN 1 ELSE 0 END),
+               sum(CASE WHEN status = 'blocked' THEN 1 ELSE 0 END)
+        FROM tasks
+        WHERE assigned_to_id IS NOT NULL
+        GROUP BY assigned_to_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('project_task_counters')
+    op.drop_table('user_task_counters')
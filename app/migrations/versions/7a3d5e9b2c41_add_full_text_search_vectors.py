@@ -0,0 +1,37 @@
+"""Add full text search vectors
+
+Revision ID: 7a3d5e9b2c41
+Revises: e2a94d7c6f15
+Create Date: 2026-10-17 19:40:27.815093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a3d5e9b2c41'
+down_revision: Union[str, Sequence[str], None] = 'e2a94d7c6f15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Генерируемые tsvector-колонки и GIN-индексы; на больших таблицах ALTER переписывает таблицу
+    for table in ('projects', 'tasks'):
+        op.execute(
+            f"ALTER TABLE {table} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS "
+            f"(to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, ''))) STORED")
+        op.create_index(f'ix_{table}_search_vector', table, ['search_vector'],
+                        unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_search_vector', table_name='tasks')
+    op.drop_index('ix_projects_search_vector', table_name='projects')
+    op.drop_column('tasks', 'search_vector')
+    op.drop_column('projects', 'search_vector')
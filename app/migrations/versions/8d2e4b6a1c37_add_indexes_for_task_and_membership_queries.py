@@ -0,0 +1,45 @@
+"""Add indexes for task and membership queries
+
+Revision ID: 8d2e4b6a1c37
+Revises: 3f1c9a7d2b64
+Create Date: 2026-10-17 14:02:17.503214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2e4b6a1c37'
+down_revision: Union[str, Sequence[str], None] = '3f1c9a7d2b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_tasks_project_status_priority_created', 'tasks',
+                    ['project_id', 'status', 'priority', 'created_at'], unique=False)
+    op.create_index('ix_tasks_project_created_id', 'tasks',
+                    ['project_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_tasks_assigned_created', 'tasks',
+                    ['assigned_to_id', 'created_at'], unique=False,
+                    postgresql_where=sa.text('assigned_to_id IS NOT NULL'))
+    op.create_index('ix_tasks_author_id', 'tasks', ['author_id'], unique=False)
+    op.create_index('ix_projects_owner_created', 'projects',
+                    ['owner_id', 'created_at'], unique=False)
+    op.create_index('ix_project_members_user_project', 'project_members',
+                    ['user_id', 'project_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_project_members_user_project', table_name='project_members')
+    op.drop_index('ix_projects_owner_created', table_name='projects')
+    op.drop_index('ix_tasks_author_id', table_name='tasks')
+    op.drop_index('ix_tasks_assigned_created', table_name='tasks',
+                  postgresql_where=sa.text('assigned_to_id IS NOT NULL'))
+    op.drop_index('ix_tasks_project_created_id', table_name='tasks')
+    op.drop_index('ix_tasks_project_status_priority_created', table_name='tasks')
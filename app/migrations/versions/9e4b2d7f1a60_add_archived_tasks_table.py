@@ -0,0 +1,54 @@
+"""Add archived_tasks table
+
+Revision ID: 9e4b2d7f1a60
+Revises: c61f0b8e4d93
+Create Date: 2026-10-17 22:10:14.208517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4b2d7f1a60'
+down_revision: Union[str, Sequence[str], None] = 'c61f0b8e4d93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = 'id, project_id, title, description, status, priority, created_at, assigned_to_id, author_id, due_date'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'archived_tasks',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('description', sa.String(), nullable=False),
+        sa.Column('status', postgresql.ENUM(name='task_status', create_type=False), nullable=False),
+        sa.Column('priority', postgresql.ENUM(name='task_priority', create_type=False), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('assigned_to_id', sa.Integer(), nullable=True),
+        sa.Column('author_id', sa.Integer(), nullable=False),
+        sa.Column('due_date', sa.Date(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id']),
+        sa.ForeignKeyConstraint(['assigned_to_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['author_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_archived_tasks_project_created_id', 'archived_tasks',
+                    ['project_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Архивные задачи возвращаются в tasks; счётчики пользователей затем пересчитывает
+    # scripts/rebuild_task_counters
+    op.execute(f'INSERT INTO tasks ({COLUMNS}) SELECT {COLUMNS} FROM archived_tasks')
+    op.drop_index('ix_archived_tasks_project_created_id', table_name='archived_tasks')
+    op.drop_table('archived_tasks')
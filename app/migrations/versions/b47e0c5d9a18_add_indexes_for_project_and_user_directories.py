@@ -0,0 +1,33 @@
+"""Add indexes for project and user directories
+
+Revision ID: b47e0c5d9a18
+Revises: 8d2e4b6a1c37
+Create Date: 2026-10-17 16:41:09.118407
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b47e0c5d9a18'
+down_revision: Union[str, Sequence[str], None] = '8d2e4b6a1c37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_projects_created_id', 'projects', ['created_at', 'id'], unique=False)
+    op.create_index('ix_projects_title_prefix', 'projects', ['title'], unique=False,
+                    postgresql_ops={'title': 'text_pattern_ops'})
+    op.create_index('ix_users_first_name_id', 'users', ['first_name', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_first_name_id', table_name='users')
+    op.drop_index('ix_projects_title_prefix', table_name='projects')
+    op.drop_index('ix_projects_created_id', table_name='projects')
@@ -0,0 +1,32 @@
+"""Add trigram indexes for user lookup
+
+Revision ID: c61f0b8e4d93
+Revises: 7a3d5e9b2c41
+Create Date: 2026-10-17 20:21:55.370648
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c61f0b8e4d93'
+down_revision: Union[str, Sequence[str], None] = '7a3d5e9b2c41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name in ('email', 'first_name', 'last_name'):
+        op.create_index(f'ix_users_{name}_trgm', 'users', [name], unique=False,
+                        postgresql_using='gin', postgresql_ops={name: 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in ('last_name', 'first_name', 'email'):
+        op.drop_index(f'ix_users_{name}_trgm', table_name='users')
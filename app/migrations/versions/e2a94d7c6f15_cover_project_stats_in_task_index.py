@@ -0,0 +1,33 @@
+"""Cover project stats in task index
+
+Revision ID: e2a94d7c6f15
+Revises: 5c8e1f3a7b20
+Create Date: 2026-10-17 18:52:13.604871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a94d7c6f15'
+down_revision: Union[str, Sequence[str], None] = '5c8e1f3a7b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index('ix_tasks_project_status_priority_created', table_name='tasks')
+    op.create_index('ix_tasks_project_status_priority_created', 'tasks',
+                    ['project_id', 'status', 'priority', 'created_at'], unique=False,
+                    postgresql_include=['assigned_to_id', 'due_date'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_project_status_priority_created', table_name='tasks')
+    op.create_index('ix_tasks_project_status_priority_created', 'tasks',
+                    ['project_id', 'status', 'priority', 'created_at'], unique=False)
@@ -1,10 +1,17 @@
+from .archive import ArchivedTask
+from .counters import ProjectTaskCounter, UserTaskCounter
 from .projects import Project, ProjectMember
 from .tasks import Task
 from .users import User
+# DDL полнотекстового поиска (tsvector/FTS5) регистрируется при импорте
+from . import search
 
 __all__ = [
+    'ArchivedTask',
     'Project',
     'ProjectMember',
+    'ProjectTaskCounter',
     'Task',
     'User',
+    'UserTaskCounter',
 ]
\ No newline at end of file
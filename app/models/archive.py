@@ -0,0 +1,44 @@
+from datetime import datetime, date
+
+from sqlalchemy import Integer, DateTime, ForeignKey, String, Enum as SQLEnum, func, Date, Index
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.database import Base
+from app.models.tasks import TaskStatus, TaskPriority
+
+
+class ArchivedTask(Base):
+    """
+    Холодное хранение задач архивного проекта (ProjectService.archive_project).
+    Колонки и id совпадают с tasks: строки переносятся INSERT ... SELECT в обе стороны,
+    а ответы строятся по той же схеме TaskRead.
+    """
+    __tablename__ = 'archived_tasks'
+    __table_args__ = (
+        # Задачи архивного проекта и keyset-пагинация по (created_at, id)
+        Index('ix_archived_tasks_project_created_id', 'project_id', 'created_at', 'id'),
+    )
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    project_id: Mapped[int] = mapped_column(Integer, ForeignKey('projects.id'), nullable=False)
+    title: Mapped[str] = mapped_column(String, nullable=False)
+    description: Mapped[str] = mapped_column(String, nullable=False)
+    status: Mapped[TaskStatus] = mapped_column(
+        SQLEnum(TaskStatus, name='task_status', create_type=False), nullable=False)
+    priority: Mapped[TaskPriority] = mapped_column(
+        SQLEnum(TaskPriority, name='task_priority', create_type=False), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    assigned_to_id: Mapped[int|None] = mapped_column(Integer, ForeignKey('users.id'), nullable=True)
+    author_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'), nullable=False)
+    due_date: Mapped[date|None] = mapped_column(Date, nullable=True)
+    archived_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    # Только для чтения: архив меняется переносом строк, а не через ORM
+    project: Mapped['Project'] = relationship('Project', viewonly=True)
+    assigned_to: Mapped['User | None'] = relationship('User', foreign_keys=[assigned_to_id], viewonly=True)
+    author: Mapped['User'] = relationship('User', foreign_keys=[author_id], viewonly=True)
+
+
+# Колонки, которые переносятся между tasks и archived_tasks
+ARCHIVED_TASK_COLUMNS = ('id', 'project_id', 'title', 'description', 'status', 'priority',
+                         'created_at', 'assigned_to_id', 'author_id', 'due_date')
@@ -0,0 +1,35 @@
+from sqlalchemy import Integer, ForeignKey, Enum as SQLEnum
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+from app.models.tasks import TaskStatus, TaskPriority
+
+
+class UserTaskCounter(Base):
+    """
+    Денормализованные счётчики задач, назначенных пользователю. Меняются в той же
+    транзакции, что и задачи (TaskCounterService), пересчитываются scripts/rebuild_task_counters.
+    """
+    __tablename__ = 'user_task_counters'
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    # todo и in_progress
+    open_count: Mapped[int] = mapped_column(Integer, default=0, server_default='0', nullable=False)
+    done_count: Mapped[int] = mapped_column(Integer, default=0, server_default='0', nullable=False)
+    blocked_count: Mapped[int] = mapped_column(Integer, default=0, server_default='0', nullable=False)
+
+    @property
+    def total(self) -> int:
+        return self.open_count + self.done_count + self.blocked_count
+
+
+class ProjectTaskCounter(Base):
+    """Число задач проекта в разрезе статус × приоритет (строки с нулём не удаляются)."""
+    __tablename__ = 'project_task_counters'
+    project_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey('projects.id', ondelete='CASCADE'), primary_key=True)
+    status: Mapped[TaskStatus] = mapped_column(
+        SQLEnum(TaskStatus, name='task_status', create_type=False), primary_key=True)
+    priority: Mapped[TaskPriority] = mapped_column(
+        SQLEnum(TaskPriority, name='task_priority', create_type=False), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, default=0, server_default='0', nullable=False)
@@ -1,13 +1,22 @@
-from datetime import datetime, date
+from datetime import datetime, date, timezone
 
-from sqlalchemy import Integer, String, ForeignKey, DateTime, func, Date
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import Integer, String, ForeignKey, DateTime, func, Date, Index, select
+from sqlalchemy.orm import Mapped, column_property, mapped_column, relationship
 
 from app.database import Base
+from app.models.users import User
 
 
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (
+        # Проекты владельца, сортировка по created_at
+        Index('ix_projects_owner_created', 'owner_id', 'created_at'),
+        # Keyset-пагинация списка проектов по (created_at, id)
+        Index('ix_projects_created_id', 'created_at', 'id'),
+        # Поиск по началу названия (LIKE 'abc%'); в PostgreSQL нужен text_pattern_ops
+        Index('ix_projects_title_prefix', 'title', postgresql_ops={'title': 'text_pattern_ops'}),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     title: Mapped[str] = mapped_column(String, nullable=False)
     description: Mapped[str|None] = mapped_column(String, nullable=True)
@@ -15,8 +24,10 @@ class Project(Base):
     is_active: Mapped[bool] = mapped_column(default=True)
     tasks: Mapped[list['Task']] = relationship('Task', back_populates='project')
     owner: Mapped['User'] = relationship('User', back_populates='owned_projects')
+    # Значение с микросекундами из приложения - ключ курсора (created_at, id), см. Task.created_at
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), nullable=False)
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
+        server_default=func.now(), nullable=False)
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(),onupdate=func.now(), nullable=False)
     dub_date: Mapped[date|None] = mapped_column(Date, nullable=True)
@@ -30,10 +41,18 @@ class Project(Base):
         secondary='project_members',
         back_populates='projects',
     )
+    # Только для чтения: счётчики меняет TaskCounterService
+    task_counters: Mapped[list['ProjectTaskCounter']] = relationship(
+        'ProjectTaskCounter', viewonly=True,
+        order_by='[ProjectTaskCounter.status, ProjectTaskCounter.priority]')
 
 
 class ProjectMember(Base):
     __tablename__ = "project_members"
+    __table_args__ = (
+        # PK (project_id, user_id) не помогает искать проекты пользователя
+        Index('ix_project_members_user_project', 'user_id', 'project_id'),
+    )
     project_id: Mapped[int] = mapped_column(ForeignKey('projects.id'), primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey('users.id'), primary_key=True)
 
@@ -41,6 +60,15 @@ class ProjectMember(Base):
     member: Mapped['User'] = relationship('User', back_populates='projects_association')
 
 
+# Число участников подзапросом по PK project_members; только с undefer (заголовок проекта).
+# UPDATE проекта число не меняет: значение не сбрасывается при flush
+Project.members_count = column_property(
+    select(func.count()).where(ProjectMember.project_id == Project.id).correlate_except(ProjectMember)
+    .scalar_subquery(),
+    deferred=True, expire_on_flush=False)
 
-
-
+# Число проектов пользователя подзапросом по ix_projects_owner_created; только с undefer (профиль).
+# Объявлено здесь: users.py не импортирует Project
+User.owned_projects_count = column_property(
+    select(func.count()).where(Project.owner_id == User.id).correlate_except(Project).scalar_subquery(),
+    deferred=True, expire_on_flush=False)
@@ -0,0 +1,68 @@
+from sqlalchemy import DDL, Integer, String, column, event, literal_column, table
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+from app.database import Base
+
+# Словарь без стемминга: названия смешивают русский, английский и коды задач
+SEARCH_CONFIG = 'simple'
+
+# PostgreSQL: генерируемые tsvector-колонки с GIN-индексами. В ORM-модели не входят
+# (SQLite не знает to_tsvector), запросы ссылаются на них по имени.
+project_search_vector = literal_column('projects.search_vector', type_=TSVECTOR)
+task_search_vector = literal_column('tasks.search_vector', type_=TSVECTOR)
+
+SEARCH_VECTOR_SQL = (
+    f"to_tsvector('{SEARCH_CONFIG}', coalesce(title, '') || ' ' || coalesce(description, ''))")
+
+POSTGRESQL_DDL = [
+    f'ALTER TABLE {name} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED'
+    for name in ('projects', 'tasks')
+] + [
+    f'CREATE INDEX ix_{name}_search_vector ON {name} USING gin (search_vector)'
+    for name in ('projects', 'tasks')
+]
+
+# SQLite: одна FTS5-таблица на проекты и задачи, синхронизируется триггерами.
+# rowid = id * 2 для проектов и id * 2 + 1 для задач - удаление и обновление по rowid без просмотра.
+search_fts = table(
+    'search_fts',
+    column('rowid', Integer),
+    column('title', String),
+    column('description', String),
+    column('kind', String),
+    column('ref_id', Integer),
+    column('project_id', Integer),
+)
+
+_FTS_INSERT = {
+    'projects': ("INSERT INTO search_fts (rowid, title, description, kind, ref_id, project_id) "
+                 "VALUES (new.id * 2, new.title, coalesce(new.description, ''), 'project', new.id, new.id);"),
+    'tasks': ("INSERT INTO search_fts (rowid, title, description, kind, ref_id, project_id) "
+              "VALUES (new.id * 2 + 1, new.title, new.description, 'task', new.id, new.project_id);"),
+}
+_FTS_ROWID = {'projects': 'old.id * 2', 'tasks': 'old.id * 2 + 1'}
+_FTS_COLUMNS = {'projects': 'title, description', 'tasks': 'title, description, project_id'}
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE search_fts USING fts5("
+    "title, description, kind UNINDEXED, ref_id UNINDEXED, project_id UNINDEXED)",
+] + [
+    statement
+    for name in ('projects', 'tasks')
+    for statement in (
+        f"CREATE TRIGGER {name}_search_ai AFTER INSERT ON {name} BEGIN {_FTS_INSERT[name]} END",
+        f"CREATE TRIGGER {name}_search_au AFTER UPDATE OF {_FTS_COLUMNS[name]} ON {name} BEGIN "
+        f"DELETE FROM search_fts WHERE rowid = {_FTS_ROWID[name]}; {_FTS_INSERT[name]} END",
+        f"CREATE TRIGGER {name}_search_ad AFTER DELETE ON {name} BEGIN "
+        f"DELETE FROM search_fts WHERE rowid = {_FTS_ROWID[name]}; END",
+    )
+]
+
+# Для create_all (тесты, бенчмарки); в рабочей БД PostgreSQL то же создаёт миграция.
+# pg_trgm нужен до создания таблиц: на нём GIN-индексы users для автодополнения
+event.listen(Base.metadata, 'before_create',
+             DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
+for _statement in POSTGRESQL_DDL:
+    event.listen(Base.metadata, 'after_create', DDL(_statement).execute_if(dialect='postgresql'))
+for _statement in SQLITE_DDL:
+    event.listen(Base.metadata, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
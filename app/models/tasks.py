@@ -1,7 +1,7 @@
-from datetime import datetime, date
+from datetime import datetime, date, timezone
 import enum
 
-from sqlalchemy import Integer, DateTime, ForeignKey, String, Enum as SQLEnum, func, Date
+from sqlalchemy import Integer, DateTime, ForeignKey, String, Enum as SQLEnum, func, Date, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -20,6 +20,23 @@ class TaskPriority(str, enum.Enum):
 
 class Task(Base):
     __tablename__ = 'tasks'
+    __table_args__ = (
+        # Список задач проекта с фильтрами status/priority, сортировка по created_at.
+        # INCLUDE: статистика проекта (GROUP BY) читается только из индекса
+        Index('ix_tasks_project_status_priority_created',
+              'project_id', 'status', 'priority', 'created_at',
+              postgresql_include=['assigned_to_id', 'due_date']),
+        # Список задач проекта без фильтров и keyset-пагинация по (created_at, id)
+        Index('ix_tasks_project_created_id', 'project_id', 'created_at', 'id'),
+        # Задачи исполнителя (/tasks/my, профиль); неназначенные задачи не индексируются
+        Index('ix_tasks_assigned_created', 'assigned_to_id', 'created_at',
+              postgresql_where=text('assigned_to_id IS NOT NULL'),
+              sqlite_where=text('assigned_to_id IS NOT NULL')),
+        Index('ix_tasks_author_id', 'author_id'),
+        # SQLite иначе повторно выдаёт id удалённых последних строк, и задача,
+        # вернувшаяся из archived_tasks, столкнулась бы с новой. В PostgreSQL - sequence
+        {'sqlite_autoincrement': True},
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     project_id: Mapped[int] = mapped_column(Integer, ForeignKey('projects.id'))
     title: Mapped[str] = mapped_column(String, nullable=False)
@@ -30,8 +47,11 @@ class Task(Base):
     priority: Mapped[TaskPriority] = mapped_column(
         SQLEnum(TaskPriority, name='task_priority', create_type=True),
                 nullable=False)
+    # Значение по умолчанию из приложения с микросекундами: ключ курсора (created_at, id)
+    # не зависит от точности CURRENT_TIMESTAMP. server_default остаётся для вставок в обход ORM.
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),server_default=func.now(), nullable=False)
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
+        server_default=func.now(), nullable=False)
     assigned_to_id: Mapped[int|None] = mapped_column(Integer, ForeignKey('users.id'), nullable=True)
     author_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'), nullable=False)
     due_date: Mapped[date|None] = mapped_column(Date, nullable=True)
@@ -1,6 +1,6 @@
 import enum
 
-from sqlalchemy import Integer, String, Enum as SQLEnum, Boolean
+from sqlalchemy import Integer, String, Enum as SQLEnum, Boolean, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -14,6 +14,15 @@ class UserRole(enum.Enum):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Справочник сотрудников: сортировка и keyset-пагинация по (first_name, id)
+        Index('ix_users_first_name_id', 'first_name', 'id'),
+        # Автодополнение GET /users/lookup: ILIKE '%q%' и оператор % из pg_trgm.
+        # В SQLite их заменяет индекс в памяти (app/user_lookup.py)
+        *(Index(f'ix_users_{name}_trgm', name, postgresql_using='gin',
+                postgresql_ops={name: 'gin_trgm_ops'}).ddl_if(dialect='postgresql')
+          for name in ('email', 'first_name', 'last_name')),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     first_name: Mapped[str] = mapped_column(String, nullable=False)
     last_name: Mapped[str] = mapped_column(String, nullable=False)
@@ -24,6 +33,8 @@ class User(Base):
         SQLEnum(UserRole, name="user_role_enum", create_type=True),
         default=UserRole.member)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    token_version: Mapped[int] = mapped_column(
+        Integer, default=0, server_default='0', nullable=False)
 
     assigned_tasks: Mapped[list['Task']] = relationship(
         'Task',
@@ -45,3 +56,6 @@ class User(Base):
         back_populates='author',
         foreign_keys='[Task.author_id]'
     )
+    # Только для чтения: счётчики меняет TaskCounterService
+    task_counter: Mapped['UserTaskCounter | None'] = relationship(
+        'UserTaskCounter', viewonly=True, uselist=False)
@@ -0,0 +1,137 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence
+
+from fastapi import Response
+from sqlalchemy import Select, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import InstrumentedAttribute
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+
+class InvalidCursorError(ValueError):
+    """Курсор пагинации повреждён или подделан."""
+
+
+def encode_cursor(sort_value: Any, row_id: int) -> str:
+    """Непрозрачный курсор по ключу (sort_value, id) последней отданной строки."""
+    if isinstance(sort_value, datetime):
+        payload = [sort_value.isoformat(), row_id, 'dt']
+    else:
+        payload = [sort_value, row_id]
+    raw = json.dumps(payload, separators=(',', ':'), ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def decode_cursor(cursor: str) -> tuple[Any, int]:
+    """
+    Разбирает курсор. Бросает InvalidCursorError, если курсор повреждён или подделан:
+    с меткой 'dt' значение сортировки - строка ISO-даты, без метки - int или str,
+    id - int. Другие типы (списки, объекты) не доходят до SQL.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id, *kind = json.loads(base64.urlsafe_b64decode(padded))
+        if not _is_int(row_id):
+            raise ValueError('cursor id is not an integer')
+        if kind == ['dt'] and isinstance(sort_value, str):
+            sort_value = datetime.fromisoformat(sort_value)
+        elif kind or not (_is_int(sort_value) or isinstance(sort_value, str)):
+            raise ValueError('unexpected cursor sort value')
+        return sort_value, row_id
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise InvalidCursorError('Некорректный курсор пагинации.')
+
+
+def keyset_page(stmt: Select, sort_column: InstrumentedAttribute, id_column: InstrumentedAttribute,
+                limit: int, cursor: Optional[str] = None, descending: bool = True) -> Select:
+    """
+    Добавляет к запросу keyset-пагинацию по (sort_column, id): ORDER BY и условие
+    «строго после курсора». Вставки между страницами не сдвигают следующую
+    страницу, в отличие от OFFSET. Выбирается limit + 1 строка,
+    лишняя строка означает, что есть следующая страница.
+    """
+    key = tuple_(sort_column, id_column)
+    if cursor is not None:
+        sort_value, row_id = decode_cursor(cursor)
+        if not isinstance(sort_value, sort_column.type.python_type):
+            # Курсор от другого ключа сортировки или подделан
+            raise InvalidCursorError('Некорректный курсор пагинации.')
+        after = tuple_(sort_value, row_id)
+        stmt = stmt.where(key < after if descending else key > after)
+    if descending:
+        return stmt.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1)
+    return stmt.order_by(sort_column, id_column).limit(limit + 1)
+
+
+def split_page(rows: Sequence[Any], limit: int,
+               sort_attr: str = 'created_at') -> tuple[list[Any], Optional[str]]:
+    """Отрезает лишнюю строку и возвращает (строки страницы, next_cursor)."""
+    items = list(rows[:limit])
+    if len(rows) <= limit:
+        return items, None
+    last = items[-1]
+    return items, encode_cursor(getattr(last, sort_attr), last.id)
+
+
+async def count_rows(db: AsyncSession, stmt: Select, exact_limit: int) -> tuple[int, bool]:
+    """
+    Число строк запроса stmt и признак оценки.
+    Точно считается не больше exact_limit строк (count по подзапросу с LIMIT),
+    дальше - оценка планировщика PostgreSQL или нижняя граница exact_limit + 1.
+    """
+    base = stmt.order_by(None).limit(None)
+    bounded = select(func.count()).select_from(base.limit(exact_limit + 1).subquery())
+    total = await db.scalar(bounded)
+    if total <= exact_limit:
+        return total, False
+    estimate = await estimate_rows(db, base)
+    return max(estimate or 0, total), True
+
+
+class Explain(Executable, ClauseElement):
+    """
+    EXPLAIN (FORMAT JSON) для запроса. Компилируется вместе с запросом, поэтому
+    значения фильтров уходят в драйвер связанными параметрами, а не литералами в SQL.
+    """
+    inherit_cache = False
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(Explain)
+def _compile_explain(element: Explain, compiler, **kw) -> str:
+    return f'EXPLAIN (FORMAT JSON) {compiler.process(element.statement, **kw)}'
+
+
+async def estimate_rows(db: AsyncSession, stmt: Select) -> Optional[int]:
+    """Оценка числа строк из плана PostgreSQL (EXPLAIN без выполнения). None на других СУБД."""
+    if db.get_bind().dialect.name != 'postgresql':
+        return None
+    connection = await db.connection()
+    plan = (await connection.execute(Explain(stmt))).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def set_page_headers(response: Response, next_cursor: Optional[str],
+                     total: Optional[tuple[int, bool]] = None) -> None:
+    """
+    Метаданные страницы для списков, которые отдаются массивом:
+    X-Next-Cursor, X-Total-Count и X-Total-Count-Estimated.
+    """
+    if next_cursor is not None:
+        response.headers['X-Next-Cursor'] = next_cursor
+    if total is not None:
+        count, estimated = total
+        response.headers['X-Total-Count'] = str(count)
+        response.headers['X-Total-Count-Estimated'] = 'true' if estimated else 'false'
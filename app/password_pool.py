@@ -0,0 +1,85 @@
+import asyncio
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Literal, Optional
+
+
+class PoolSaturatedError(RuntimeError):
+    """Очередь пула заполнена, новая задача не принята."""
+
+
+class BoundedExecutor:
+    """
+    Пул потоков или процессов с ограниченной очередью для CPU-тяжёлых операций
+    (хеширование паролей). Не блокирует event loop и сразу отказывает,
+    если в работе и в очереди уже max_workers + max_queue задач.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int,
+                 kind: Literal['thread', 'process'] = 'thread'):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.kind = kind
+        self._executor: Optional[Executor] = None
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='password-worker')
+        return self._executor
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Выполняет func(*args) в пуле. Бросает PoolSaturatedError, если очередь заполнена.
+        """
+        if self.pending >= self.capacity:
+            self.rejected += 1
+            raise PoolSaturatedError('Password worker pool is saturated')
+        loop = asyncio.get_running_loop()
+        future = self._get_executor().submit(func, *args)
+        self.pending += 1
+        # Задача освобождает место в очереди, только когда пул её завершил:
+        # отмена ожидающей корутины не останавливает уже запущенное хеширование
+        future.add_done_callback(lambda done: self._call_in_loop(loop, self._finish, done))
+        return await asyncio.wrap_future(future)
+
+    @staticmethod
+    def _call_in_loop(loop: asyncio.AbstractEventLoop, callback: Callable[..., Any], *args: Any) -> None:
+        """Счётчики меняются в потоке event loop; после его закрытия - напрямую."""
+        try:
+            loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            callback(*args)
+
+    def _finish(self, future: Future) -> None:
+        self.pending -= 1
+        if future.cancelled() or future.exception() is not None:
+            self.failed += 1
+        else:
+            self.completed += 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            'kind': self.kind,
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'pending': self.pending,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+        }
@@ -0,0 +1,114 @@
+import bisect
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Границы корзин гистограммы ожидания соединения, мс
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+class PoolMetrics:
+    """
+    Счётчики пула соединений: время ожидания выдачи соединения (гистограмма),
+    события overflow и таймауты, возраст открытых соединений.
+    """
+
+    def __init__(self, name: str = 'primary'):
+        self.name = name
+        self.reset()
+
+    def reset(self) -> None:
+        self.wait_histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.wait_count = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.checkouts = 0
+        self.overflow_events = 0
+        self.timeouts = 0
+        self.connections_opened = 0
+        self.connections_closed = 0
+        self._connected_at: dict[int, float] = {}
+
+    def record_wait(self, seconds: float) -> None:
+        wait_ms = seconds * 1000
+        self.wait_histogram[bisect.bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+        self.wait_count += 1
+        self.wait_total_ms += wait_ms
+        self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+
+    def on_connect(self, dbapi_connection, connection_record) -> None:
+        self.connections_opened += 1
+        self._connected_at[id(connection_record)] = time.monotonic()
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        self.checkouts += 1
+
+    def on_close(self, dbapi_connection, connection_record) -> None:
+        self.connections_closed += 1
+        self._connected_at.pop(id(connection_record), None)
+
+    def snapshot(self, pool) -> dict:
+        """Текущее состояние пула и накопленные метрики."""
+        now = time.monotonic()
+        ages = [now - connected_at for connected_at in self._connected_at.values()]
+        labels = [f'<={bound}ms' for bound in WAIT_BUCKETS_MS] + [f'>{WAIT_BUCKETS_MS[-1]}ms']
+        state = {'status': pool.status()}
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            state.update(size=pool.size(), checked_out=pool.checkedout(),
+                         checked_in=pool.checkedin(), overflow=pool.overflow())
+        return {
+            'name': self.name,
+            **state,
+            'checkouts': self.checkouts,
+            'overflow_events': self.overflow_events,
+            'timeouts': self.timeouts,
+            'connections_opened': self.connections_opened,
+            'connections_closed': self.connections_closed,
+            'wait_ms': {
+                'count': self.wait_count,
+                'avg': round(self.wait_total_ms / self.wait_count, 3) if self.wait_count else 0.0,
+                'max': round(self.wait_max_ms, 3),
+                'histogram': dict(zip(labels, self.wait_histogram)),
+            },
+            'connection_age_seconds': {
+                'open': len(ages),
+                'avg': round(sum(ages) / len(ages), 1) if ages else 0.0,
+                'max': round(max(ages), 1) if ages else 0.0,
+            },
+        }
+
+
+def instrumented_pool_class(metrics: PoolMetrics) -> type[AsyncAdaptedQueuePool]:
+    """
+    Подкласс AsyncAdaptedQueuePool, замеряющий ожидание соединения.
+    Метрики хранятся на классе, поэтому переживают engine.dispose()/recreate().
+    """
+
+    class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+        pool_metrics = metrics
+
+        def _do_get(self):
+            started = time.perf_counter()
+            overflow_before = self.overflow()
+            try:
+                connection = super()._do_get()
+            except PoolTimeoutError:
+                self.pool_metrics.timeouts += 1
+                raise
+            finally:
+                self.pool_metrics.record_wait(time.perf_counter() - started)
+            if self.overflow() > max(overflow_before, 0):
+                self.pool_metrics.overflow_events += 1
+            return connection
+
+    return InstrumentedAsyncQueuePool
+
+
+def instrument_engine(engine: AsyncEngine, metrics: PoolMetrics) -> None:
+    """Подписывает metrics на события пула engine."""
+    event.listen(engine.sync_engine, 'connect', metrics.on_connect)
+    event.listen(engine.sync_engine, 'checkout', metrics.on_checkout)
+    event.listen(engine.sync_engine, 'close', metrics.on_close)
@@ -0,0 +1,102 @@
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+_IN_LIST = re.compile(r'IN \((?:\?|\$\d+|%\(\w+\)s)(?:, (?:\?|\$\d+|%\(\w+\)s))*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Нормализованный текст запроса: без лишних пробелов и с раскрытыми
+    IN-списками, свёрнутыми в один параметр. Значения параметров в текст
+    не попадают, поэтому одинаковые запросы с разными id имеют одну форму.
+    """
+    shape = _WHITESPACE.sub(' ', statement).strip()
+    return _IN_LIST.sub('IN (?)', shape)
+
+
+class QueryStats:
+    """Число SQL-запросов, суммарное время в БД и повторы одинаковых запросов."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.shapes: Counter[str] = Counter()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.total_ms += elapsed * 1000
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: Optional[int] = None) -> dict[str, int]:
+        """Формы запросов, выполненные не меньше threshold раз - вероятный N+1."""
+        threshold = threshold or settings.QUERY_STATS_N_PLUS_ONE_THRESHOLD
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+    def headers(self) -> dict[str, str]:
+        headers = {
+            'X-DB-Queries': str(self.count),
+            'Server-Timing': f'db;dur={self.total_ms:.2f};desc="{self.count} queries"',
+        }
+        repeated = self.repeated()
+        if repeated:
+            headers['X-DB-N-Plus-One'] = str(max(repeated.values()))
+        return headers
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar('query_stats', default=None)
+
+
+@contextmanager
+def capture_queries() -> Iterator[QueryStats]:
+    """
+    Считает запросы, выполненные в текущем контексте (запрос или задача asyncio).
+    Greenlet-ы SQLAlchemy наследуют контекст вызывающей задачи.
+    """
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault('query_started_at', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    started = conn.info.get('query_started_at')
+    if stats is not None and started:
+        stats.record(statement, time.perf_counter() - started.pop())
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(exception_context):
+    if exception_context.connection is not None:
+        exception_context.connection.info.pop('query_started_at', None)
+
+
+async def query_stats_middleware(request: Request, call_next):
+    """
+    Добавляет к ответу X-DB-Queries и Server-Timing; при повторе одной
+    формы запроса не меньше QUERY_STATS_N_PLUS_ONE_THRESHOLD раз - X-DB-N-Plus-One.
+    """
+    with capture_queries() as stats:
+        response = await call_next(request)
+    response.headers.update(stats.headers())
+    return response
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends
+
+from app.admission import login_admission
+from app.auth import (get_current_admin, jwt_cache, password_pool,
+                      principal_cache, token_version_cache)
+from app.database import (async_engine, async_read_engine, pool_metrics,
+                          replica_pool_metrics)
+from app.db_depends import recent_writers
+from app.membership import membership_index
+from app.services.project_service import project_stats_cache
+from app.models.users import User as UserModel
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"]
+)
+
+
+@router.get('/caches')
+async def get_cache_stats(_: UserModel = Depends(get_current_admin)):
+    """
+    Статистика внутрипроцессных кэшей, пула хеширования паролей и
+    допуска к логину (для планирования ёмкости). Только для администратора.
+    """
+    return {
+        'caches': [cache.stats() for cache in (principal_cache, token_version_cache, jwt_cache, recent_writers,
+                                                     membership_index, project_stats_cache)],
+        'password_pool': password_pool.stats(),
+        'login_admission': login_admission.stats(),
+    }
+
+
+@router.get('/db-pool')
+async def get_db_pool_stats(_: UserModel = Depends(get_current_admin)):
+    """
+    Состояние пула соединений: занятые соединения, overflow, гистограмма
+    ожидания и возраст соединений. Помогает отличить нехватку пула от медленных запросов.
+    """
+    stats = pool_metrics.snapshot(async_engine.pool)
+    if async_read_engine is not async_engine:
+        stats['replica'] = replica_pool_metrics.snapshot(async_read_engine.pool)
+    return stats
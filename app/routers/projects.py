@@ -1,13 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth import get_current_owner, get_current_member
 from app.models.users import User as UserModel
-from app.db_depends import get_async_db
+from app.config import settings
+from app.db_depends import get_async_db, get_async_read_db
+from app.fieldsets import PROJECT_FIELDS, PROJECT_LIST_FIELDS, FieldSet
+from app.pagination import set_page_headers
 from app.schemas.projects import (
     ProjectCreate as ProjectSchema,
     ProjectRead as ProjectReadSchema,
+    ProjectFilter,
+    ProjectHeader,
     ProjectListSchema,
+    ProjectMembersRead,
+    ProjectStats,
     ProjectUpdate,)
 from app.services.project_service import ProjectService
 router = APIRouter(
@@ -15,29 +24,61 @@ router = APIRouter(
     tags=["projects"]
 )
 
-@router.get("/", response_model=list[ProjectListSchema])
+@router.get("/", response_model=list[ProjectListSchema], response_model_exclude_unset=True)
 async def get_projects(
-        db: AsyncSession = Depends(get_async_db),
+        response: Response,
+        db: AsyncSession = Depends(get_async_read_db),
         current_user: UserModel = Depends(get_current_member),
-        only_owned: bool = False):
+        only_owned: bool = False,
+        filters: ProjectFilter = Depends(),
+        fieldset: FieldSet = Depends(PROJECT_LIST_FIELDS.dependency()),
+        limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX,
+                           description='Размер страницы'),
+        cursor: Optional[str] = Query(None, description='X-Next-Cursor из предыдущей страницы'),
+        with_total: bool = Query(False, description='Вернуть X-Total-Count')):
     """
-    Позволяет искать проекты по названию, статусу или владельцу.
+    Позволяет искать проекты по началу названия, статусу, владельцу и датам.
+    Отдаёт страницу от новых к старым; курсор следующей страницы - в заголовке X-Next-Cursor.
+    fields и include ограничивают поля ответа и загружаемые связи.
     """
     project_service = ProjectService(db)
-    projects = await project_service.get_projects(
-        current_user=current_user,
-        only_owned=only_owned
-    )
-    return projects
+    try:
+        projects, next_cursor = await project_service.get_projects(
+            current_user=current_user,
+            only_owned=only_owned,
+            filters=filters,
+            limit=limit,
+            cursor=cursor,
+            fieldset=fieldset
+        )
+        total = None
+        if with_total:
+            total = await project_service.count_projects(
+                current_user=current_user, only_owned=only_owned, filters=filters)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    set_page_headers(response, next_cursor, total)
+    return fieldset.shape_many(projects)
 
-@router.get("/{project_id}", response_model=ProjectReadSchema)
+@router.get("/{project_id}", response_model=ProjectReadSchema, response_model_exclude_unset=True)
 async def get_project(project_id: int,
                       db: AsyncSession = Depends(get_async_db),
-                      current_user: UserModel = Depends(get_current_member)):
+                      current_user: UserModel = Depends(get_current_member),
+                      fieldset: FieldSet = Depends(PROJECT_FIELDS.dependency()),
+                      tasks_limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX,
+                                               description='Размер первой страницы задач'),
+                      archived: bool = Query(False, description='Задачи из архива проекта')):
+    """
+    Проект с участниками, счётчиками задач и первой страницей задач; следующие страницы -
+    GET /projects/{id}/tasks/?cursor=tasks_next_cursor. fields и include ограничивают
+    поля ответа и загружаемые связи, например ?fields=title&include=owner.
+    У архивного проекта задачи читаются с ?archived=true.
+    """
     project_service = ProjectService(db=db)
     try:
-        project = await project_service.get_project(project_id, current_user)
-        return project
+        project = await project_service.get_project(project_id, current_user, fieldset=fieldset,
+                                                    tasks_limit=tasks_limit, archived=archived)
+        return fieldset.shape(project)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except PermissionError as e:
@@ -45,6 +86,23 @@ async def get_project(project_id: int,
 
 
 
+@router.get("/{project_id}/stats", response_model=ProjectStats)
+async def get_project_stats(project_id: int,
+                            db: AsyncSession = Depends(get_async_read_db),
+                            current_user: UserModel = Depends(get_current_member),
+                            archived: bool = Query(False, description='Статистика архивных задач')):
+    """
+    Статистика задач проекта по статусам, приоритетам, просрочке и исполнителям
+    без выгрузки самих задач. Доступ: owner, member, admin или manager.
+    """
+    project_service = ProjectService(db=db)
+    try:
+        return await project_service.get_project_stats(project_id, current_user, archived=archived)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except PermissionError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+
 @router.post('/', response_model=ProjectReadSchema, status_code=status.HTTP_201_CREATED)
 async def create_project(project: ProjectSchema,
                          db: AsyncSession = Depends(get_async_db),
@@ -56,7 +114,7 @@ async def create_project(project: ProjectSchema,
     return await project_service.create_project(project, current_user)
 
 
-@router.patch('/{project_id}', response_model=ProjectReadSchema)
+@router.patch('/{project_id}', response_model=ProjectHeader)
 async def update_project(project_id: int,
                          project_in: ProjectUpdate,
                          current_user: UserModel = Depends(get_current_owner),
@@ -77,12 +135,12 @@ async def update_project(project_id: int,
                             detail="Произошла непредвиденная ошибка при обновлении проекта.")
 
 @router.post('/{project_id}/members/{email}',
-             response_model=ProjectReadSchema,
+             response_model=ProjectMembersRead,
              status_code=status.HTTP_201_CREATED, tags=['Members'])
 async def add_member_to_project(project_id: int,
                                 email: str,
                                 db: AsyncSession = Depends(get_async_db),
-                                current_owner: UserModel = Depends(get_current_owner))->ProjectReadSchema:
+                                current_owner: UserModel = Depends(get_current_owner)):
     """
     Добавляет пользователя с user_id в проект project_id. Только для владельца проекта.
     """
@@ -96,7 +154,7 @@ async def add_member_to_project(project_id: int,
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
-@router.delete('/{project_id}/members/{user_id}', response_model=ProjectReadSchema)
+@router.delete('/{project_id}/members/{user_id}', response_model=ProjectMembersRead)
 async def remove_member_from_project(
         project_id: int, user_id: int,
         db: AsyncSession = Depends(get_async_db),
@@ -115,6 +173,40 @@ async def remove_member_from_project(
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
+@router.post('/{project_id}/archive', response_model=ProjectHeader)
+async def archive_project(project_id: int,
+                          db: AsyncSession = Depends(get_async_db),
+                          current_user: UserModel = Depends(get_current_owner)):
+    """
+    Переносит задачи проекта в архив и делает проект неактивным. Задачи остаются
+    доступны на чтение с ?archived=true. Только для владельца проекта и админа.
+    """
+    project_service = ProjectService(db=db)
+    try:
+        return await project_service.archive_project(project_id, current_user)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except PermissionError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+
+
+@router.post('/{project_id}/unarchive', response_model=ProjectHeader)
+async def unarchive_project(project_id: int,
+                            db: AsyncSession = Depends(get_async_db),
+                            current_user: UserModel = Depends(get_current_owner)):
+    """
+    Возвращает задачи проекта из архива и снова делает проект активным.
+    Только для владельца проекта и админа.
+    """
+    project_service = ProjectService(db=db)
+    try:
+        return await project_service.unarchive_project(project_id, current_user)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except PermissionError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+
+
 @router.delete('/{project_id}', status_code=status.HTTP_204_NO_CONTENT)
 async def delete_project(project_id: int,
                          db: AsyncSession = Depends(get_async_db),
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth import get_current_member
+from app.config import settings
+from app.db_depends import get_async_read_db
+from app.models.users import User as UserModel
+from app.schemas.search import SearchHit
+from app.services.search_service import SearchService
+
+router = APIRouter(
+    prefix="/search",
+    tags=["search"]
+)
+
+
+@router.get('', response_model=list[SearchHit])
+async def search(q: str = Query(..., min_length=1, max_length=200, description='Слова для поиска'),
+                 limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX,
+                                    description='Сколько результатов вернуть'),
+                 db: AsyncSession = Depends(get_async_read_db),
+                 current_user: UserModel = Depends(get_current_member)):
+    """
+    Полнотекстовый поиск по названиям и описаниям проектов и задач, доступных пользователю.
+    Все слова обязательны, последнее ищется по началу слова.
+    """
+    try:
+        return await SearchService(db).search(q, current_user, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
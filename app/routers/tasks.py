@@ -1,12 +1,16 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Body, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth import get_current_member, get_current_user
+from app.config import settings
 from app.models.users import User as UserModel
-from app.db_depends import get_async_db
-from app.schemas.tasks import TaskCreate, TaskRead, TaskList, TaskUpdate
+from app.db_depends import get_async_db, get_async_read_db
+from app.fieldsets import TASK_FIELDS, FieldSet
+from app.pagination import InvalidCursorError
+from app.schemas.tasks import (TaskBatchUpdate, TaskBatchUpdateResult, TaskBulkResult,
+                               TaskCreate, TaskRead, TaskList, TaskUpdate)
 from app.services.task_service import TaskService
 from app.models.tasks import TaskStatus, TaskPriority
 
@@ -19,59 +23,97 @@ router_global_tasks = APIRouter(
     tags=["tasks"]
 )
 
-@router_project_tasks.get('/{project_id}/tasks/', response_model=TaskList)
+@router_project_tasks.get('/{project_id}/tasks/', response_model=TaskList, response_model_exclude_unset=True)
 async def get_tasks_list(
     project_id: int,
     current_user: UserModel = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_db),
+    db: AsyncSession = Depends(get_async_read_db),
+    fieldset: FieldSet = Depends(TASK_FIELDS.dependency()),
     status_filter: Optional[TaskStatus] =Query(None, description='Фильтр по статусу задачи'),
-    priority_filter: Optional[TaskPriority] = Query(None, description='Фильтр по приоритету задачи')):
+    priority_filter: Optional[TaskPriority] = Query(None, description='Фильтр по приоритету задачи'),
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX,
+                       description='Размер страницы'),
+    cursor: Optional[str] = Query(None, description='next_cursor из предыдущей страницы'),
+    archived: bool = Query(False, description='Задачи из архива проекта')):
     """
-    Список задач проекта. Фильтрация по status и priority. Доступ только если пользователь owner ИЛИ member проекта.
+    Список задач проекта, от новых к старым, постранично по курсору.
+    Фильтрация по status и priority. Доступ только если пользователь owner ИЛИ member проекта.
+    fields и include ограничивают поля задач и загружаемые связи.
     """
 
     task_service = TaskService(db=db)
 
     try:
-        result = await task_service.get_project_tasks(
+        tasks, next_cursor = await task_service.get_project_tasks(
             project_id,
             status_filter=status_filter,
             priority_filter=priority_filter,
-            current_user=current_user)
-        return {'items': result}
+            current_user=current_user,
+            limit=limit,
+            cursor=cursor,
+            fieldset=fieldset,
+            archived=archived)
+        return {'items': fieldset.shape_many(tasks), 'next_cursor': next_cursor}
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except PermissionError as e:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
 
 
-@router_global_tasks.get('/{task_id}', response_model=TaskRead)
-async def get_task(task_id: int,
-                    db: AsyncSession = Depends(get_async_db),
-                    current_user: UserModel = Depends(get_current_user)):
+@router_global_tasks.get('/my', response_model=TaskList, response_model_exclude_unset=True)
+async def get_my_assigned_tasks(
+        db: AsyncSession = Depends(get_async_read_db),
+        current_user: UserModel = Depends(get_current_member),
+        fieldset: FieldSet = Depends(TASK_FIELDS.dependency()),
+        limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX,
+                           description='Размер страницы'),
+        cursor: Optional[str] = Query(None, description='next_cursor из предыдущей страницы')):
+    """
+    Получает страницу задач, назначенных текущему пользователю. (GET /tasks/my)
+    Объявлен до /{task_id}, иначе 'my' разбирается как task_id.
+    """
     task_service = TaskService(db=db)
     try:
-        task = await task_service.get_task_by_id(task_id, current_user)
-        return task
+        tasks, next_cursor = await task_service.get_my_assigned_tasks(current_user, fieldset=fieldset,
+                                                                      limit=limit, cursor=cursor)
+        return {'items': fieldset.shape_many(tasks), 'next_cursor': next_cursor}
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
-    except PermissionError as e:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
 
 
-@router_global_tasks.get('/my', response_model=TaskList)
-async def get_my_assigned_tasks(
-        db: AsyncSession = Depends(get_async_db),
-        current_user: UserModel = Depends(get_current_member)):
+@router_global_tasks.patch('/batch', response_model=TaskBatchUpdateResult)
+async def update_tasks_batch(batch: TaskBatchUpdate,
+                             current_user: UserModel = Depends(get_current_user),
+                             db: AsyncSession = Depends(get_async_db)):
     """
-    Получает список всех задач, назначенных текущему пользователю. (GET /tasks/my)
+    Пакетно обновляет задачи: общий patch для ids и/или отдельные patch-и в items.
+    Права - как у PATCH /tasks/{task_id}; отказ по одной задаче не мешает остальным.
+    Объявлен до /{task_id}, иначе 'batch' разбирается как task_id.
     """
     task_service = TaskService(db=db)
+    results = await task_service.update_tasks_batch(batch.patches(), current_user)
+    items = [{'id': task_id, 'status': 'error' if error else 'updated', 'error': error}
+             for task_id, error in results.items()]
+    updated = sum(1 for item in items if item['status'] == 'updated')
+    return {'updated': updated, 'failed': len(items) - updated, 'items': items}
+
+
+@router_global_tasks.get('/{task_id}', response_model=TaskRead, response_model_exclude_unset=True)
+async def get_task(task_id: int,
+                    db: AsyncSession = Depends(get_async_db),
+                    current_user: UserModel = Depends(get_current_user),
+                    fieldset: FieldSet = Depends(TASK_FIELDS.dependency()),
+                    archived: bool = Query(False, description='Задача архивного проекта')):
+    task_service = TaskService(db=db)
     try:
-        task = await task_service.get_my_assigned_tasks(current_user)
-        return task
+        task = await task_service.get_task_by_id(task_id, current_user, fieldset=fieldset, archived=archived)
+        return fieldset.shape(task)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except PermissionError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
 
 
 @router_project_tasks.post('/{project_id}/tasks', response_model=TaskRead, status_code=status.HTTP_201_CREATED)
@@ -95,6 +137,28 @@ async def create_task(
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
 
+@router_project_tasks.post('/{project_id}/tasks:bulk', response_model=TaskBulkResult)
+async def create_tasks_bulk(
+        project_id: int,
+        tasks: list[TaskCreate] = Body(..., min_length=1, max_length=settings.TASK_BULK_MAX_ITEMS),
+        db: AsyncSession = Depends(get_async_db),
+        current_user: UserModel = Depends(get_current_user)):
+    """
+    Создаёт пакет задач в проекте одной транзакцией. Задачи с исполнителем не из проекта
+    отклоняются по отдельности, остальные создаются; результат - по каждой позиции.
+    """
+    task_service = TaskService(db=db)
+    try:
+        results = await task_service.create_tasks_bulk(project_id, tasks, current_user)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except PermissionError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+    items = [{'index': index, 'status': 'error' if error else 'created', 'task': task, 'error': error}
+             for index, task, error in results]
+    created = sum(1 for item in items if item['status'] == 'created')
+    return {'created': created, 'failed': len(items) - created, 'items': items}
+
 @router_global_tasks.patch('/{task_id}', response_model=TaskRead)
 async def update_task(task_id: int, task: TaskUpdate,
                                   current_user: UserModel = Depends(get_current_user),
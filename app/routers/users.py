@@ -1,16 +1,22 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.admission import admit_login
 from app.auth import get_current_user, oauth2_refresh_scheme
-from app.db_depends import get_async_db
+from app.config import settings
+from app.db_depends import get_async_db, get_async_read_db
+from app.fieldsets import TASK_FIELDS, USER_FIELDS, USER_LIST_FIELDS, FieldSet
+from app.pagination import InvalidCursorError, set_page_headers
 from app.models.users import User as UserModel
-from app.schemas import TaskRead
+from app.schemas.tasks import TaskList
 from app.schemas.users import (UserRegister,
                                UserRead as UserSchema,
                                UserBasicSchema,
+                               UserReadSchema,
+                               UserFilter,
                                UserUpdate,
                                UserAdminUpdate)
 from app.services.task_service import TaskService
@@ -36,23 +42,33 @@ async def create_user(user: UserRegister, db: AsyncSession = Depends(get_async_d
             detail=str(e)
         )
 
-@router.get('/me', response_model=UserSchema)
+@router.get('/me', response_model=UserSchema, response_model_exclude_unset=True)
 async def get_user_my(db: AsyncSession = Depends(get_async_db),
-                      current_user: UserModel = Depends(get_current_user)):
+                      current_user: UserModel = Depends(get_current_user),
+                      fieldset: FieldSet = Depends(USER_FIELDS.dependency()),
+                      summary_size: int = Query(settings.PROFILE_SUMMARY_SIZE, ge=1,
+                                                le=settings.PROFILE_SUMMARY_SIZE_MAX,
+                                                description='Сколько задач и проектов в сводке')):
+    """
+    Сводка профиля: счётчики, последние и срочные задачи, последние проекты.
+    Все назначенные задачи - постранично в GET /tasks/my.
+    """
     user_service = UserService(db=db)
-    my_profile = await user_service.get_my_profile(current_user)
-    return my_profile
+    my_profile = await user_service.get_my_profile(current_user, fieldset=fieldset, summary_size=summary_size)
+    return fieldset.shape(my_profile)
 
-@router.post('/token')
-async def login(form_data: OAuth2PasswordRequestForm = Depends(),
+@router.post('/token', dependencies=[Depends(admit_login)])
+async def login(background_tasks: BackgroundTasks,
+                form_data: OAuth2PasswordRequestForm = Depends(),
                 db: AsyncSession = Depends(get_async_db)):
     """
     Аутентифицирует пользователя и возвращает access_token и refresh_token.
+    Частота попыток ограничена по IP и email (admit_login).
     """
     user_service = UserService(db=db)
 
     try:
-        return await user_service.login_user(form_data)
+        return await user_service.login_user(form_data, background_tasks)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail="Incorrect email or password",
@@ -76,22 +92,62 @@ async def refresh_tokens(refresh_token: str = Depends(oauth2_refresh_scheme), db
         raise credentials_exception
 
 
-@router.get('/{user_id}/tasks', response_model=list[TaskRead])
+@router.get('/lookup', response_model=list[UserReadSchema])
+async def lookup_users(q: str = Query(..., min_length=2, max_length=100, pattern=r'\w',
+                                      description='Часть email, имени или фамилии'),
+                       project_id: Optional[int] = Query(None, description='Только владелец и участники проекта'),
+                       limit: int = Query(settings.USER_LOOKUP_LIMIT_DEFAULT, ge=1,
+                                          le=settings.USER_LOOKUP_LIMIT_MAX,
+                                          description='Сколько пользователей вернуть'),
+                       db: AsyncSession = Depends(get_async_read_db),
+                       current_user: UserModel = Depends(get_current_user)):
+    """
+    Автодополнение при назначении исполнителя и добавлении участника:
+    нечёткий поиск по началу и части email, имени и фамилии.
+    """
+    user_service = UserService(db=db)
+    try:
+        return await user_service.lookup_users(q, current_user, project_id=project_id, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except PermissionError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+
+
+@router.get('/{user_id}/tasks', response_model=TaskList, response_model_exclude_unset=True)
 async def get_user_assigned_tasks(user_id: int,
                                   db: AsyncSession = Depends(get_async_db),
-                                  current_user: UserModel = Depends(get_current_user)):
+                                  current_user: UserModel = Depends(get_current_user),
+                                  fieldset: FieldSet = Depends(TASK_FIELDS.dependency()),
+                                  limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX,
+                                                     description='Размер страницы'),
+                                  cursor: Optional[str] = Query(None,
+                                                                description='next_cursor из предыдущей страницы')):
+    """
+    Задачи, назначенные пользователю, от новых к старым, постранично по курсору.
+    Только задачи проектов, доступных текущему пользователю.
+    """
     task_service = TaskService(db=db)
-    result = await task_service.get_user_tasks(user_id, current_user)
-    return result
+    try:
+        result, next_cursor = await task_service.get_user_tasks(user_id, current_user, fieldset=fieldset,
+                                                                limit=limit, cursor=cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {'items': fieldset.shape_many(result), 'next_cursor': next_cursor}
 
 
-@router.get('/{user_id}', response_model=UserSchema)
+@router.get('/{user_id}', response_model=UserSchema, response_model_exclude_unset=True)
 async def get_user(user_id: int, db: AsyncSession = Depends(get_async_db),
-                   current_user: UserModel = Depends(get_current_user)):
+                   current_user: UserModel = Depends(get_current_user),
+                   fieldset: FieldSet = Depends(USER_FIELDS.dependency()),
+                   summary_size: int = Query(settings.PROFILE_SUMMARY_SIZE, ge=1,
+                                             le=settings.PROFILE_SUMMARY_SIZE_MAX,
+                                             description='Сколько задач и проектов в сводке')):
+    """Сводка профиля сотрудника; все его задачи - GET /users/{user_id}/tasks."""
     user_service = UserService(db=db)
     try:
-        user = await user_service.get_user(user_id, current_user)
-        return user
+        user = await user_service.get_user(user_id, current_user, fieldset=fieldset, summary_size=summary_size)
+        return fieldset.shape(user)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except Exception as e:
@@ -114,15 +170,31 @@ async def update_user(user_id: int, user_admin_data: Optional[UserAdminUpdate],
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
 
 
-@router.get('/', response_model=list[UserBasicSchema])
-async def get_users(db: AsyncSession = Depends(get_async_db),
-                    _: UserModel = Depends(get_current_user)):
+@router.get('/', response_model=list[UserBasicSchema], response_model_exclude_unset=True)
+async def get_users(response: Response,
+                    db: AsyncSession = Depends(get_async_read_db),
+                    _: UserModel = Depends(get_current_user),
+                    filters: UserFilter = Depends(),
+                    fieldset: FieldSet = Depends(USER_LIST_FIELDS.dependency()),
+                    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX,
+                                       description='Размер страницы'),
+                    cursor: Optional[str] = Query(None, description='X-Next-Cursor из предыдущей страницы'),
+                    with_total: bool = Query(False, description='Вернуть X-Total-Count')):
+    """
+    Справочник активных сотрудников по алфавиту с фильтрами по роли и должности.
+    Курсор следующей страницы - в заголовке X-Next-Cursor.
+    """
     user_service = UserService(db=db)
     try:
-        result = await user_service.get_users()
-        return result
+        result, next_cursor = await user_service.get_users(filters=filters, limit=limit, cursor=cursor,
+                                                           fieldset=fieldset)
+        total = await user_service.count_users(filters) if with_total else None
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    set_page_headers(response, next_cursor, total)
+    return fieldset.shape_many(result)
 
 
 
@@ -1,10 +1,14 @@
 from .users import UserRead, UserBasicSchema, UserReadSchema
-from .tasks import TaskRead, TaskUpdate
-from .projects import ProjectRead, ProjectListSchema,ProjectBasic
+from .tasks import TaskRead, TaskUpdate, TaskBulkItemResult, TaskBulkResult
+from .projects import ProjectRead, ProjectHeader, ProjectListSchema, ProjectMembersRead, ProjectBasic
 
 UserReadSchema.model_rebuild()
 UserRead.model_rebuild()
 UserBasicSchema.model_rebuild()
 TaskRead.model_rebuild()
+TaskBulkItemResult.model_rebuild()
+TaskBulkResult.model_rebuild()
+ProjectHeader.model_rebuild()
+ProjectMembersRead.model_rebuild()
 ProjectRead.model_rebuild()
 ProjectListSchema.model_rebuild()
\ No newline at end of file
@@ -1,8 +1,10 @@
-from datetime import date
+from datetime import date, datetime
 from typing import Optional
 
 from pydantic import BaseModel, Field, ConfigDict
 
+from app.models.tasks import TaskPriority, TaskStatus
+
 
 class ProjectBasic(BaseModel):
     id: int
@@ -22,6 +24,17 @@ class ProjectUpdate(BaseModel):
     dub_date: Optional[date] = Field(None, description='Дата дедлайна')
 
 
+class ProjectFilter(BaseModel):
+    """Фильтры списка проектов (query-параметры GET /projects/)."""
+    title: Optional[str] = Field(None, min_length=1, max_length=50, description='Начало названия проекта')
+    owner_id: Optional[int] = Field(None, description='ID владельца')
+    is_active: Optional[bool] = Field(None, description='Активен ли проект')
+    created_from: Optional[datetime] = Field(None, description='Создан не раньше')
+    created_to: Optional[datetime] = Field(None, description='Создан раньше')
+    dub_date_from: Optional[date] = Field(None, description='Дедлайн не раньше')
+    dub_date_to: Optional[date] = Field(None, description='Дедлайн не позже')
+
+
 class ProjectListSchema(BaseModel):
     id: int = Field(..., description='ID Проекта')
     title: str = Field(..., description='Название проекта')
@@ -29,15 +42,52 @@ class ProjectListSchema(BaseModel):
     owner: 'UserReadSchema' = Field(..., description='Владелец проекта')
     model_config = ConfigDict(from_attributes=True)
     dub_date: Optional[date] = Field(None, description='Дата дедлайна')
+    is_active: bool = Field(True, description='False - проект в архиве, задачи читаются с ?archived=true')
 
-class ProjectRead(ProjectListSchema):
-    """Схема для просмотра проекта."""
+class ProjectTaskCount(BaseModel):
+    """Число задач проекта с данными статусом и приоритетом."""
+    status: TaskStatus
+    priority: TaskPriority
+    count: int
+    model_config = ConfigDict(from_attributes=True)
 
-    tasks: list['TaskRead'] = Field(default=list, description='Список задачь проекта')
-    members: list['UserReadSchema'] = Field(
-        default=list, description='Список работников учавствующих в проекте')
+
+class ProjectAssigneeLoad(BaseModel):
+    """Нагрузка исполнителя в проекте."""
+    user_id: Optional[int] = Field(None, description='ID исполнителя, None - задачи без исполнителя')
+    total: int = Field(description='Всего задач')
+    open: int = Field(description='Открытые задачи (todo и in_progress)')
+    overdue: int = Field(description='Просроченные задачи')
 
 
+class ProjectStats(BaseModel):
+    """Статистика задач проекта."""
+    project_id: int
+    total: int = Field(description='Всего задач')
+    overdue: int = Field(description='Невыполненные задачи с due_date раньше сегодняшнего дня')
+    by_status: dict[TaskStatus, int] = Field(description='Задачи по статусу')
+    by_priority: dict[TaskPriority, int] = Field(description='Задачи по приоритету')
+    assignees: list[ProjectAssigneeLoad] = Field(description='Нагрузка по исполнителям')
+    as_of: date = Field(description='Дата, относительно которой считается просрочка')
 
 
+class ProjectHeader(ProjectListSchema):
+    """Заголовок проекта без задач и списка участников - ответ на изменение проекта."""
+    members_count: int = Field(0, description='Число участников проекта')
+    task_counters: list[ProjectTaskCount] = Field(
+        default_factory=list, description='Число задач по статусу и приоритету')
+
+
+class ProjectMembersRead(ProjectHeader):
+    """Заголовок проекта со списком участников - ответ на изменение состава."""
+    members: list['UserReadSchema'] = Field(
+        default_factory=list, description='Список работников учавствующих в проекте')
+
+
+class ProjectRead(ProjectMembersRead):
+    """Схема для просмотра проекта."""
 
+    tasks: list['TaskRead'] = Field(
+        default_factory=list, description='Первая страница задач проекта, от новых к старым')
+    tasks_next_cursor: Optional[str] = Field(
+        None, description='cursor следующей страницы для GET /projects/{id}/tasks/, None - задач больше нет')
@@ -0,0 +1,13 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field, ConfigDict
+
+
+class SearchHit(BaseModel):
+    """Найденный проект или задача."""
+    kind: Literal['project', 'task'] = Field(description='Тип результата')
+    id: int = Field(description='ID проекта или задачи')
+    project_id: int = Field(description='ID проекта (для проекта совпадает с id)')
+    title: str = Field(description='Название')
+    rank: float = Field(description='Релевантность, больше - выше')
+    model_config = ConfigDict(from_attributes=True)
@@ -1,6 +1,7 @@
 from datetime import datetime, date
-from typing import Optional
-from pydantic import BaseModel, Field, ConfigDict, field_validator
+from typing import Literal, Optional
+from pydantic import BaseModel, Field, ConfigDict, field_validator, model_validator
+from app.config import settings
 from app.models.tasks import TaskStatus, TaskPriority
 
 
@@ -61,4 +62,80 @@ class TaskList(BaseModel):
     Список пагинации для задач.
     """
     items: list[TaskRead] = Field(description='Список задач')
+    next_cursor: Optional[str] = Field(None, description='Курсор следующей страницы, None на последней')
 
+
+
+class TaskBulkItemResult(BaseModel):
+    """
+    Результат создания одной задачи из пакета.
+    """
+    index: int = Field(description='Позиция задачи в запросе')
+    status: Literal['created', 'error'] = Field(description='Итог обработки')
+    task: Optional[TaskRead] = Field(None, description='Созданная задача')
+    error: Optional[str] = Field(None, description='Причина отказа')
+
+
+class TaskBulkResult(BaseModel):
+    """
+    Итог пакетного создания задач.
+    """
+    created: int = Field(description='Создано задач')
+    failed: int = Field(description='Отклонено задач')
+    items: list[TaskBulkItemResult] = Field(description='Результаты по позициям запроса')
+
+
+class TaskBatchItem(TaskUpdate):
+    """
+    Изменения для одной задачи в пакетном обновлении.
+    """
+    id: int = Field(description='ID задачи')
+
+
+class TaskBatchUpdate(BaseModel):
+    """
+    Пакетное обновление задач: общий patch для ids и/или отдельные patch-и в items.
+    """
+    ids: list[int] = Field(default_factory=list, description='ID задач для общего patch')
+    patch: Optional[TaskUpdate] = Field(None, description='Изменения для всех ids')
+    items: list[TaskBatchItem] = Field(default_factory=list, description='Изменения по отдельным задачам')
+
+    @model_validator(mode='after')
+    def check_targets(self):
+        """Каждая задача упоминается один раз, общий patch задан вместе с ids."""
+        if bool(self.ids) != (self.patch is not None):
+            raise ValueError('ids и patch задаются вместе')
+        task_ids = self.ids + [item.id for item in self.items]
+        if not task_ids:
+            raise ValueError('Не указано ни одной задачи')
+        if len(task_ids) != len(set(task_ids)):
+            raise ValueError('ID задачи указан несколько раз')
+        if len(task_ids) > settings.TASK_BULK_MAX_ITEMS:
+            raise ValueError(f'Не больше {settings.TASK_BULK_MAX_ITEMS} задач за запрос')
+        return self
+
+    def patches(self) -> dict[int, dict]:
+        """ID задачи -> изменённые поля."""
+        shared = self.patch.model_dump(exclude_unset=True) if self.patch else {}
+        result = {task_id: dict(shared) for task_id in self.ids}
+        for item in self.items:
+            result[item.id] = item.model_dump(exclude_unset=True, exclude={'id'})
+        return result
+
+
+class TaskBatchItemResult(BaseModel):
+    """
+    Результат обновления одной задачи из пакета.
+    """
+    id: int = Field(description='ID задачи')
+    status: Literal['updated', 'error'] = Field(description='Итог обработки')
+    error: Optional[str] = Field(None, description='Причина отказа')
+
+
+class TaskBatchUpdateResult(BaseModel):
+    """
+    Итог пакетного обновления задач.
+    """
+    updated: int = Field(description='Обновлено задач')
+    failed: int = Field(description='Отклонено задач')
+    items: list[TaskBatchItemResult] = Field(description='Результаты по ID')
@@ -21,6 +21,12 @@ class UserAdminUpdate(BaseModel):
     role: Optional[UserRole] = Field(None, description='Роль сотрудника')
 
 
+class UserFilter(BaseModel):
+    """Фильтры справочника сотрудников (query-параметры GET /users/)."""
+    role: Optional[UserRole] = Field(None, description='Роль сотрудника')
+    position: Optional[str] = Field(None, max_length=50, description='Должность сотрудника')
+
+
 class UserReadSchema(BaseModel):
     id: int
     email: EmailStr = Field(description='Email сотрудника')
@@ -36,13 +42,28 @@ class UserBasicSchema(UserReadSchema):
 
 
 
+class UserTaskCounts(BaseModel):
+    """Счётчики назначенных задач по статусам."""
+    open_count: int = Field(0, description='Открытые задачи (todo и in_progress)')
+    done_count: int = Field(0, description='Выполненные задачи')
+    blocked_count: int = Field(0, description='Заблокированные задачи')
+
+
 class UserRead(UserBasicSchema):
+    """
+    Сводка профиля: счётчики и несколько задач и проектов. Размер ответа не зависит
+    от истории пользователя; все назначенные задачи - GET /users/{id}/tasks.
+    """
 
     tasks_count: Optional[int] = Field(None, description='Количество задач, назначенных пользователю')
-    assigned_tasks: list['TaskRead'] = Field(description='Задачи сотрудника',
-                                             default_factory=list)
-
-    owned_projects: list['ProjectBasic'] = Field(description='Проекты сотрудника',
+    task_counts: Optional[UserTaskCounts] = Field(None, description='Задачи пользователя по статусам')
+    owned_projects_count: Optional[int] = Field(None, description='Количество проектов сотрудника')
+    recent_tasks: list['TaskRead'] = Field(description='Последние назначенные задачи, от новых к старым',
+                                           default_factory=list)
+    urgent_tasks: list['TaskRead'] = Field(description='Незавершённые задачи: ближайший дедлайн, '
+                                                       'затем высокий приоритет', default_factory=list)
+
+    owned_projects: list['ProjectBasic'] = Field(description='Последние проекты сотрудника',
                                                  default_factory=list)
 
 
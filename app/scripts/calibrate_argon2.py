@@ -0,0 +1,121 @@
+"""
+Подбирает параметры argon2 под текущее железо и записывает их в .env.
+
+    python -m app.scripts.calibrate_argon2 --target-ms 250 --max-memory-mib 128
+
+Для каждого объёма памяти (от большего к меньшему) ищется наибольший time_cost,
+при котором медианное время хеширования ещё не достигает целевого. Выбирается профиль
+с наибольшей памятью, укладывающийся в цель не менее чем с 2 проходами.
+После смены параметров старые хеши пересчитываются при следующем логине.
+"""
+import argparse
+import os
+import statistics
+import time
+from dataclasses import dataclass
+
+from passlib.context import CryptContext
+
+MEMORY_CANDIDATES_KIB = (262144, 131072, 65536, 47104, 19456)
+MIN_TIME_COST = 2
+MAX_TIME_COST = 10
+
+
+@dataclass
+class HashProfile:
+    time_cost: int
+    memory_cost_kib: int
+    parallelism: int
+    measured_ms: float
+
+    def as_env(self, target_ms: int) -> dict[str, str]:
+        return {
+            'PASSWORD_HASH_TIME_COST': str(self.time_cost),
+            'PASSWORD_HASH_MEMORY_COST_KIB': str(self.memory_cost_kib),
+            'PASSWORD_HASH_PARALLELISM': str(self.parallelism),
+            'PASSWORD_HASH_TARGET_MS': str(target_ms),
+        }
+
+
+def measure_ms(time_cost: int, memory_cost_kib: int, parallelism: int, samples: int = 3) -> float:
+    """Медианное время одного хеширования в миллисекундах."""
+    context = CryptContext(schemes=['argon2'],
+                           argon2__rounds=time_cost,
+                           argon2__memory_cost=memory_cost_kib,
+                           argon2__parallelism=parallelism)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.hash('calibration-password')
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(target_ms: float, max_memory_kib: int, parallelism: int,
+              memory_candidates=MEMORY_CANDIDATES_KIB, samples: int = 3) -> HashProfile:
+    """
+    Возвращает профиль с наибольшей памятью, который укладывается в target_ms хотя бы
+    при MIN_TIME_COST проходах, с наибольшим time_cost в пределах цели.
+    Если цель недостижима даже для минимальной памяти, возвращает самый быстрый профиль.
+    """
+    fastest = None
+    for memory_cost in sorted((m for m in memory_candidates if m <= max_memory_kib), reverse=True):
+        previous = None
+        for time_cost in range(MIN_TIME_COST, MAX_TIME_COST + 1):
+            elapsed = measure_ms(time_cost, memory_cost, parallelism, samples)
+            print(f'm={memory_cost:>7} KiB t={time_cost:>2} p={parallelism}: {elapsed:8.1f} ms')
+            profile = HashProfile(time_cost, memory_cost, parallelism, round(elapsed, 1))
+            if elapsed >= target_ms:
+                if previous is not None:
+                    # Наибольшее число проходов, ещё укладывающееся в цель
+                    return previous
+                # Даже минимальное число проходов дороже цели - пробуем меньше памяти
+                if fastest is None or elapsed < fastest.measured_ms:
+                    fastest = profile
+                break
+            if time_cost == MAX_TIME_COST:
+                return profile
+            previous = profile
+    if fastest is None:
+        raise ValueError('Нет подходящих кандидатов памяти для калибровки.')
+    return fastest
+
+
+def write_env(path: str, values: dict[str, str]) -> None:
+    """Обновляет ключи в env-файле, остальные строки сохраняет как есть."""
+    lines = []
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as env_file:
+            lines = env_file.read().splitlines()
+    pending = dict(values)
+    for index, line in enumerate(lines):
+        key = line.split('=', 1)[0].strip()
+        if key in pending:
+            lines[index] = f'{key}={pending.pop(key)}'
+    lines.extend(f'{key}={value}' for key, value in pending.items())
+    with open(path, 'w', encoding='utf-8') as env_file:
+        env_file.write('\n'.join(lines) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Калибровка стоимости argon2')
+    parser.add_argument('--target-ms', type=int, default=250, help='целевое время хеширования')
+    parser.add_argument('--max-memory-mib', type=int, default=128, help='потолок памяти на хеш')
+    parser.add_argument('--parallelism', type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument('--env-file', default='.env', help='куда записать профиль')
+    parser.add_argument('--dry-run', action='store_true', help='только показать профиль')
+    args = parser.parse_args()
+
+    profile = calibrate(args.target_ms, args.max_memory_mib * 1024, args.parallelism)
+    values = profile.as_env(args.target_ms)
+    print(f'Выбран профиль: {profile}')
+    if args.dry_run:
+        for key, value in values.items():
+            print(f'{key}={value}')
+        return
+    write_env(args.env_file, values)
+    print(f'Профиль записан в {args.env_file}')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+import asyncio
+from app.db_depends import get_async_db
+from app.services.counter_service import TaskCounterService
+
+
+async def rebuild_task_counters():
+    """
+    Пересчитывает денормализованные счётчики задач из таблицы tasks.
+    Запускать после ручных правок tasks в обход API или при расхождении счётчиков.
+    """
+    async for session in get_async_db():
+        projects, users = await TaskCounterService(session).rebuild()
+        await session.commit()
+        print(f"✅ Счётчики пересчитаны: проектов - {projects}, пользователей - {users}.")
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_task_counters())
@@ -0,0 +1,152 @@
+import enum
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import exists, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Load
+
+from app.membership import UserMemberships, membership_index
+from app.models.projects import Project, ProjectMember
+from app.models.users import User as UserModel, UserRole
+
+
+class ProjectAction(str, enum.Enum):
+    view = 'view'
+    view_tasks = 'view_tasks'
+    create_task = 'create_task'
+    edit = 'edit'
+    delete = 'delete'
+    archive = 'archive'
+
+
+class ProjectRelation(str, enum.Enum):
+    owner = 'owner'
+    member = 'member'
+    none = 'none'
+
+
+# Действие -> (системные роли с доступом к любому проекту, отношения к проекту с доступом)
+ACTION_RULES: dict[ProjectAction, tuple[frozenset, frozenset]] = {
+    ProjectAction.view: (frozenset({UserRole.admin}),
+                         frozenset({ProjectRelation.owner, ProjectRelation.member})),
+    ProjectAction.view_tasks: (frozenset({UserRole.admin, UserRole.manager}),
+                               frozenset({ProjectRelation.owner, ProjectRelation.member})),
+    ProjectAction.create_task: (frozenset(),
+                                frozenset({ProjectRelation.owner, ProjectRelation.member})),
+    ProjectAction.edit: (frozenset(), frozenset({ProjectRelation.owner})),
+    ProjectAction.delete: (frozenset({UserRole.admin}), frozenset({ProjectRelation.owner})),
+    ProjectAction.archive: (frozenset({UserRole.admin}), frozenset({ProjectRelation.owner})),
+}
+
+
+@dataclass(frozen=True, slots=True)
+class AccessDecision:
+    """
+    Ответ на вопрос «может ли пользователь выполнить действие над проектом».
+    project - загруженный проект; None, если его нет или решение принято по индексу членства.
+    """
+    project_id: int
+    action: ProjectAction
+    relation: ProjectRelation
+    allowed: bool
+    project_exists: bool
+    project: Optional[Project] = None
+
+    def ensure(self, denied_message: str) -> Optional[Project]:
+        """
+        Возвращает проект или бросает ValueError (нет проекта) / PermissionError (нет прав).
+        """
+        if not self.project_exists:
+            raise ValueError(f"Проект с ID {self.project_id} не найден.")
+        if not self.allowed:
+            raise PermissionError(denied_message)
+        return self.project
+
+
+def _is_allowed(action: ProjectAction, role: UserRole, relation: ProjectRelation) -> bool:
+    roles, relations = ACTION_RULES[action]
+    return role in roles or relation in relations
+
+
+def _relation(memberships: UserMemberships, project_id: int) -> ProjectRelation:
+    if project_id in memberships.owned:
+        return ProjectRelation.owner
+    if project_id in memberships.member_of:
+        return ProjectRelation.member
+    return ProjectRelation.none
+
+
+class ProjectAccessService:
+    """
+    Проверки доступа к проекту. Если проект не нужен для ответа, владение и
+    членство берутся из membership_index без SQL; иначе - один индексированный
+    запрос: строка проекта и EXISTS по project_members, без загрузки всех участников.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def _is_member(self, project_id, user_id: int):
+        return exists().where(ProjectMember.project_id == project_id,
+                              ProjectMember.user_id == user_id)
+
+    async def check(self, project_id: int, user: UserModel, action: ProjectAction,
+                    *options: Load, load_project: bool = True) -> AccessDecision:
+        """
+        Загружает проект и членство пользователя одним запросом. options - загрузчики
+        связей проекта, если они нужны для ответа (например, selectinload(Project.members)).
+        При load_project=False владелец и участник получают разрешение по индексу членства;
+        SQL нужен только для отказа (чтобы отличить «нет проекта» от «нет прав») и ролей.
+        """
+        if not load_project:
+            memberships = await membership_index.memberships(self.db, user.id)
+            relation = _relation(memberships, project_id)
+            if relation != ProjectRelation.none and _is_allowed(action, user.role, relation):
+                return AccessDecision(project_id, action, relation, True, True)
+
+        row = (await self.db.execute(
+            select(Project, self._is_member(Project.id, user.id).label('is_member'))
+            .where(Project.id == project_id)
+            .options(*options)
+        )).first()
+        if row is None:
+            return AccessDecision(project_id, action, ProjectRelation.none, False, False)
+
+        project, is_member = row
+        if project.owner_id == user.id:
+            relation = ProjectRelation.owner
+        elif is_member:
+            relation = ProjectRelation.member
+        else:
+            relation = ProjectRelation.none
+        return AccessDecision(project_id, action, relation,
+                              _is_allowed(action, user.role, relation), True, project)
+
+    async def accessible_project_ids(self, user: UserModel,
+                                     action: ProjectAction) -> Optional[frozenset[int]]:
+        """
+        ID проектов, где пользователь может выполнить действие, для фильтра внутри запроса
+        (Project.id IN ...). None - роль даёт доступ ко всем проектам и фильтр не нужен.
+        """
+        if _is_allowed(action, user.role, ProjectRelation.none):
+            return None
+        memberships = await membership_index.memberships(self.db, user.id)
+        return frozenset(project_id for project_id in memberships.project_ids
+                         if _is_allowed(action, user.role, _relation(memberships, project_id)))
+
+    async def check_project(self, project: Project, user: UserModel,
+                            action: ProjectAction) -> AccessDecision:
+        """
+        Проверка для уже загруженного проекта. Членство берётся из индекса, и только
+        если роль пользователя и владение проектом не решают вопрос.
+        """
+        if project.owner_id == user.id:
+            relation = ProjectRelation.owner
+        elif _is_allowed(action, user.role, ProjectRelation.none):
+            return AccessDecision(project.id, action, ProjectRelation.none, True, True, project)
+        else:
+            memberships = await membership_index.memberships(self.db, user.id)
+            relation = _relation(memberships, project.id)
+        return AccessDecision(project.id, action, relation,
+                              _is_allowed(action, user.role, relation), True, project)
@@ -0,0 +1,149 @@
+from collections import Counter, defaultdict
+from typing import NamedTuple, Optional
+
+from sqlalchemy import case, delete, func, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.archive import ArchivedTask
+from app.models.counters import ProjectTaskCounter, UserTaskCounter
+from app.models.tasks import Task, TaskPriority, TaskStatus
+
+# Статус задачи -> колонка счётчика пользователя
+STATUS_COLUMNS = {
+    TaskStatus.todo: 'open_count',
+    TaskStatus.in_progress: 'open_count',
+    TaskStatus.blocked: 'blocked_count',
+    TaskStatus.done: 'done_count',
+}
+USER_COUNT_COLUMNS = ('open_count', 'done_count', 'blocked_count')
+
+
+class TaskCounterState(NamedTuple):
+    """Поля задачи, от которых зависят счётчики."""
+    project_id: int
+    assigned_to_id: Optional[int]
+    status: TaskStatus
+    priority: TaskPriority
+
+    @classmethod
+    def of(cls, task: Task) -> 'TaskCounterState':
+        """
+        Состояние задачи для счётчиков. Исполнитель берётся из связи assigned_to:
+        после присваивания связи assigned_to_id обновится только при flush.
+        """
+        assignee = task.assigned_to
+        return cls(task.project_id if task.project is None else task.project.id,
+                   assignee.id if assignee is not None else None,
+                   task.status or TaskStatus.todo,
+                   task.priority)
+
+
+class TaskCounterDelta:
+    """Накопленные изменения счётчиков; применяются TaskCounterService.apply до commit."""
+
+    def __init__(self):
+        self.projects: Counter[tuple[int, TaskStatus, TaskPriority]] = Counter()
+        self.users: defaultdict[int, Counter[str]] = defaultdict(Counter)
+
+    def add(self, state: TaskCounterState, sign: int = 1) -> None:
+        self.projects[(state.project_id, state.status, state.priority)] += sign
+        if state.assigned_to_id is not None:
+            self.users[state.assigned_to_id][STATUS_COLUMNS[state.status]] += sign
+
+    def remove(self, state: TaskCounterState) -> None:
+        self.add(state, -1)
+
+    def move(self, before: TaskCounterState, after: TaskCounterState) -> None:
+        if before != after:
+            self.remove(before)
+            self.add(after)
+
+
+class TaskCounterService:
+    """
+    Денормализованные счётчики задач (user_task_counters, project_task_counters).
+    Изменения применяются атомарным UPSERT count = count + delta в транзакции записи задачи;
+    rebuild пересчитывает все счётчики из tasks.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def _insert(self, model):
+        dialect = self.db.get_bind().dialect.name
+        return (postgresql.insert if dialect == 'postgresql' else sqlite.insert)(model)
+
+    async def apply(self, delta: TaskCounterDelta) -> None:
+        """
+        Не больше двух запросов: многострочный UPSERT по проектам и по пользователям.
+        Ключи сортируются, чтобы параллельные транзакции блокировали строки в одном порядке.
+        """
+        project_rows = [
+            {'project_id': project_id, 'status': status, 'priority': priority, 'count': count}
+            for (project_id, status, priority), count in sorted(delta.projects.items())
+            if count]
+        if project_rows:
+            stmt = self._insert(ProjectTaskCounter).values(project_rows)
+            await self.db.execute(stmt.on_conflict_do_update(
+                index_elements=['project_id', 'status', 'priority'],
+                set_={'count': ProjectTaskCounter.count + stmt.excluded['count']}))
+
+        user_rows = [
+            {'user_id': user_id, **{column: counts[column] for column in USER_COUNT_COLUMNS}}
+            for user_id, counts in sorted(delta.users.items())
+            if any(counts.values())]
+        if user_rows:
+            stmt = self._insert(UserTaskCounter).values(user_rows)
+            await self.db.execute(stmt.on_conflict_do_update(
+                index_elements=['user_id'],
+                set_={column: getattr(UserTaskCounter, column) + stmt.excluded[column]
+                      for column in USER_COUNT_COLUMNS}))
+
+    async def shift_assignees(self, source, ids: list[int], sign: int) -> None:
+        """
+        Счётчики исполнителей задач ids из source (Task или ArchivedTask) со знаком sign:
+        задачи архивного проекта не входят в счётчики пользователей, а счётчики проекта
+        остаются. Один GROUP BY по пачке и UPSERT.
+        """
+        rows = await self.db.execute(
+            select(source.assigned_to_id, source.status, func.count())
+            .where(source.id.in_(ids), source.assigned_to_id.is_not(None))
+            .group_by(source.assigned_to_id, source.status))
+        delta = TaskCounterDelta()
+        for user_id, status, count in rows:
+            delta.users[user_id][STATUS_COLUMNS[status]] += sign * count
+        await self.apply(delta)
+
+    async def delete_project(self, project_id: int) -> None:
+        await self.db.execute(delete(ProjectTaskCounter).where(ProjectTaskCounter.project_id == project_id))
+
+    async def rebuild(self) -> tuple[int, int]:
+        """
+        Пересчитывает все счётчики двумя INSERT ... SELECT ... GROUP BY.
+        Возвращает число строк (проектные, пользовательские). Commit - на вызывающем.
+        """
+        await self.db.execute(delete(ProjectTaskCounter))
+        await self.db.execute(delete(UserTaskCounter))
+
+        # Счётчики проекта учитывают и архивные задачи, пользователей - только живые
+        all_tasks = union_all(
+            *(select(model.project_id, model.status, model.priority) for model in (Task, ArchivedTask))
+        ).subquery()
+        projects = await self.db.execute(
+            self._insert(ProjectTaskCounter).from_select(
+                ['project_id', 'status', 'priority', 'count'],
+                select(all_tasks.c.project_id, all_tasks.c.status, all_tasks.c.priority, func.count())
+                .group_by(all_tasks.c.project_id, all_tasks.c.status, all_tasks.c.priority)))
+
+        by_column = {column: [status for status, name in STATUS_COLUMNS.items() if name == column]
+                     for column in USER_COUNT_COLUMNS}
+        users = await self.db.execute(
+            self._insert(UserTaskCounter).from_select(
+                ['user_id', *USER_COUNT_COLUMNS],
+                select(Task.assigned_to_id,
+                       *(func.sum(case((Task.status.in_(by_column[column]), 1), else_=0))
+                         for column in USER_COUNT_COLUMNS))
+                .where(Task.assigned_to_id.is_not(None))
+                .group_by(Task.assigned_to_id)))
+        return projects.rowcount, users.rowcount
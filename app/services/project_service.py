@@ -1,105 +1,249 @@
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_
-from sqlalchemy.orm import selectinload, joinedload
+from typing import Optional
 
+from sqlalchemy import Select, and_, case, delete, func, insert, select, or_
+from sqlalchemy.orm import selectinload, joinedload, undefer
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.cache import TTLCache
 from app.models.users import User as UserModel, UserRole
-from app.models.projects import Project
-from app.schemas.projects import ProjectCreate as ProjectSchema, ProjectUpdate
+from app.models.archive import ARCHIVED_TASK_COLUMNS, ArchivedTask
+from app.models.projects import Project, ProjectMember
+from app.models.tasks import Task, TaskPriority, TaskStatus
+from app.config import settings
+from app.db_depends import primary_session
+from app.fieldsets import FieldSet
+from app.membership import membership_index
+from app.pagination import count_rows, keyset_page, split_page
+from app.services.access_service import ProjectAccessService, ProjectAction
+from app.services.counter_service import TaskCounterService
+from app.schemas.projects import (ProjectCreate as ProjectSchema, ProjectFilter, ProjectUpdate,
+                                  ProjectAssigneeLoad, ProjectStats)
+
+# project_id -> ProjectStats. Сбрасывается после commit записи задач (TaskService)
+project_stats_cache = TTLCache(maxsize=settings.PROJECT_STATS_CACHE_SIZE,
+                               ttl=settings.PROJECT_STATS_CACHE_TTL_SECONDS,
+                               name='project_stats')
 
 
 class ProjectService:
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.access = ProjectAccessService(db)
 
     async def create_project(self, project: ProjectSchema,
                              owner: UserModel):
         """
         Создает новый проект, используя данные из схемы и ID владельца.
+        Связи для ответа заполняются в памяти: у нового проекта нет задач,
+        а единственный участник - владелец, поэтому повторный SELECT не нужен.
         """
+        # owner может быть Principal (AUTH_STATELESS), в сессии нужен ORM-пользователь;
+        # после аутентификации он обычно уже в identity map и get() не ходит в БД
+        owner_user = await self.db.get(UserModel, owner.id)
         new_project = Project(
             title=project.title,
             description=project.description,
-            owner_id=owner.id,
-            dub_date=project.dub_date,)
-        new_project.members.append(owner)
+            owner=owner_user,
+            dub_date=project.dub_date,
+            tasks=[],
+            members=[owner_user],
+            members_count=1,
+            task_counters=[],)
         self.db.add(new_project)
+        # INSERT ... RETURNING id, updated_at и INSERT участника - единственные запросы
         await self.db.commit()
-        await self.db.refresh(new_project)
-
-        stmt = (select(Project)
-                .where(Project.id == new_project.id)
-                .options(
-            selectinload(Project.owner).selectinload(UserModel.assigned_tasks),
-            selectinload(Project.tasks),
-            selectinload(Project.members)
-        ))
-        loaded_project = await self.db.scalar(stmt)
-        return loaded_project
+        membership_index.add_project(new_project.id, owner_user.id)
+        return new_project
 
 
-    async def get_projects(self, current_user: UserModel,
-                           only_owned: bool = False)->list[Project]:
+    def _projects_query(self, current_user: UserModel, only_owned: bool,
+                        filters: Optional[ProjectFilter]) -> Select:
         """
-        Получает список проектов, в которых пользователь является владельцем ИЛИ членом.
-        Если only_owned=True, возвращает только проекты, принадлежащие пользователю.
+        Запрос проектов, доступных пользователю, с фильтрами - без сортировки и загрузки связей.
         """
-        stmt = (
-            select(Project)
-            .options(
-                joinedload(Project.owner),
-                selectinload(Project.members),
-            )
-            .order_by(Project.created_at.desc())
-        )
-        if current_user.role == UserRole.admin:
-            projects = (await self.db.scalars(stmt)).all()
-            return list(projects)
+        stmt = select(Project)
         if only_owned:
             stmt = stmt.where(Project.owner_id == current_user.id)
-        else:
+        elif current_user.role != UserRole.admin:
+            # IN по project_members.user_id вместо members.any(): оба условия OR
+            # идут по индексам, без полного просмотра projects
+            member_project_ids = (select(ProjectMember.project_id)
+                                  .where(ProjectMember.user_id == current_user.id))
             access_condition = or_(
                 Project.owner_id == current_user.id,
-                Project.members.any(UserModel.id == current_user.id)
+                Project.id.in_(member_project_ids)
             )
             stmt = stmt.where(access_condition)
 
-        projects = (await self.db.scalars(stmt)).all()
-        return list(projects)
-
+        if filters is None:
+            return stmt
+        if filters.title:
+            stmt = stmt.where(Project.title.startswith(filters.title, autoescape=True))
+        if filters.owner_id is not None:
+            stmt = stmt.where(Project.owner_id == filters.owner_id)
+        if filters.is_active is not None:
+            stmt = stmt.where(Project.is_active == filters.is_active)
+        if filters.created_from is not None:
+            stmt = stmt.where(Project.created_at >= filters.created_from)
+        if filters.created_to is not None:
+            stmt = stmt.where(Project.created_at < filters.created_to)
+        if filters.dub_date_from is not None:
+            stmt = stmt.where(Project.dub_date >= filters.dub_date_from)
+        if filters.dub_date_to is not None:
+            stmt = stmt.where(Project.dub_date <= filters.dub_date_to)
+        return stmt
 
-    async def get_project(self, project_id: int, current_user: UserModel)->Project:
+    async def get_projects(self, current_user: UserModel,
+                           only_owned: bool = False,
+                           filters: Optional[ProjectFilter] = None,
+                           limit: int = settings.PAGE_SIZE_DEFAULT,
+                           cursor: Optional[str] = None,
+                           fieldset: Optional[FieldSet] = None)->tuple[list[Project], Optional[str]]:
         """
-        Отдает проект и проверяет членство/владение для контроля доступа.
+        Получает страницу проектов, в которых пользователь является владельцем ИЛИ членом
+        (админ видит все), от новых к старым, и курсор следующей страницы.
+        Если only_owned=True, возвращает только проекты, принадлежащие пользователю.
+        fieldset - запрошенные поля и связи; без него загружается владелец.
         """
-        project = await self.db.scalar(
-            select(Project)
-            .options(
-                selectinload(Project.owner),
-                selectinload(Project.tasks),
-                selectinload(Project.members))
-            .where(Project.id == project_id))
-        if project is None:
-            raise ValueError(f"Проект с ID {project_id} не найден.")
-
-        is_admin = current_user.role == UserRole.admin
-        if is_admin:
-            return project
+        options = fieldset.load_options() if fieldset is not None else [joinedload(Project.owner)]
+        stmt = self._projects_query(current_user, only_owned, filters).options(*options)
+        stmt = keyset_page(stmt, Project.created_at, Project.id, limit, cursor)
+        projects = (await self.db.scalars(stmt)).unique().all()
+        return split_page(projects, limit)
+
+    async def count_projects(self, current_user: UserModel,
+                             only_owned: bool = False,
+                             filters: Optional[ProjectFilter] = None) -> tuple[int, bool]:
+        """
+        Число проектов для тех же условий, что и get_projects, и признак оценки.
+        """
+        stmt = self._projects_query(current_user, only_owned, filters)
+        return await count_rows(self.db, stmt, settings.COUNT_EXACT_LIMIT)
 
-        is_owner = project.owner_id == current_user.id
-        is_member = any(member.id == current_user.id for member in project.members)
 
-        if not (is_owner or is_member):
-            raise PermissionError("У вас нет доступа к этому проекту.")
+    async def get_project_header(self, project_id: int, current_user: UserModel) -> Project:
+        """
+        Заголовок проекта: строка проекта с владельцем и числом участников (JOIN и подзапрос
+        в запросе проверки доступа) и счётчики задач. Задачи и участники не загружаются,
+        поэтому изменение проекта не зависит от его размера.
+        """
+        decision = await self.access.check(
+            project_id, current_user, ProjectAction.view,
+            joinedload(Project.owner),
+            undefer(Project.members_count),
+            selectinload(Project.task_counters))
+        return decision.ensure("У вас нет доступа к этому проекту.")
+
+    async def get_project(self, project_id: int, current_user: UserModel,
+                          fieldset: Optional[FieldSet] = None,
+                          tasks_limit: int = settings.PAGE_SIZE_DEFAULT,
+                          archived: bool = False)->Project:
+        """
+        Отдает проект и проверяет членство/владение для контроля доступа.
+        Членство проверяется EXISTS в том же запросе; к заголовку добавляются участники
+        и первая страница задач (tasks_limit, от новых к старым) с курсором продолжения
+        в tasks_next_cursor. С fieldset загружаются только запрошенные колонки и связи
+        (GET /projects/{id}?fields=&include=). archived - задачи из archived_tasks.
+        """
+        if fieldset is not None:
+            options = fieldset.load_options()
+        else:
+            options = [joinedload(Project.owner),
+                       undefer(Project.members_count),
+                       selectinload(Project.members),
+                       selectinload(Project.task_counters)]
+        decision = await self.access.check(project_id, current_user, ProjectAction.view, *options)
+        project = decision.ensure("У вас нет доступа к этому проекту.")
+        if fieldset is None or 'tasks' in fieldset.include:
+            await self._load_task_page(project, tasks_limit, archived)
         return project
 
+    async def _load_task_page(self, project: Project, limit: int, archived: bool = False) -> None:
+        """
+        Первая страница задач проекта в project.tasks и курсор в project.tasks_next_cursor.
+        Порядок и курсор - как у GET /projects/{id}/tasks/, исполнитель и автор - JOIN.
+        """
+        source = ArchivedTask if archived else Task
+        stmt = keyset_page(
+            select(source)
+            .where(source.project_id == project.id)
+            .options(joinedload(source.assigned_to), joinedload(source.author)),
+            source.created_at, source.id, limit)
+        tasks, next_cursor = split_page((await self.db.scalars(stmt)).all(), limit)
+        # Страница, а не вся коллекция: значение без истории изменений, flush его не касается
+        set_committed_value(project, 'tasks', tasks)
+        setattr(project, 'tasks_next_cursor', next_cursor)
+
+    async def get_project_stats(self, project_id: int, current_user: UserModel,
+                                archived: bool = False) -> ProjectStats:
+        """
+        Статистика задач проекта: статусы, приоритеты, просрочка и нагрузка исполнителей.
+        Считается одним GROUP BY по tasks (покрывающий индекс по project_id) и кэшируется
+        на проект; права проверяются при каждом обращении, для участников - по индексу членства.
+        archived - по archived_tasks, без кэша: архив читают редко.
+        """
+        decision = await self.access.check(project_id, current_user, ProjectAction.view_tasks,
+                                           load_project=False)
+        decision.ensure('У вас нет прав на просмотр этих данных')
+
+        today = datetime.now(timezone.utc).date()
+        stats = project_stats_cache.get(project_id) if not archived else None
+        # Просрочка зависит от даты: вчерашняя запись не годится
+        if stats is not None and stats.as_of == today:
+            return stats
+
+        source = ArchivedTask if archived else Task
+        is_overdue = and_(source.due_date < today, source.status != TaskStatus.done)
+        # Кэш общий для процесса, поэтому заполняется из основной БД, а не из реплики
+        reader = nullcontext(self.db) if archived else primary_session(self.db)
+        async with reader as db:
+            rows = (await db.execute(
+                select(source.status, source.priority, source.assigned_to_id,
+                       func.count().label('total'),
+                       func.sum(case((is_overdue, 1), else_=0)).label('overdue'))
+                .where(source.project_id == project_id)
+                .group_by(source.status, source.priority, source.assigned_to_id)
+            )).all()
+
+        by_status = Counter({status: 0 for status in TaskStatus})
+        by_priority = Counter({priority: 0 for priority in TaskPriority})
+        assignees: dict[Optional[int], Counter] = {}
+        for row in rows:
+            by_status[row.status] += row.total
+            by_priority[row.priority] += row.total
+            load = assignees.setdefault(row.assigned_to_id, Counter())
+            load['total'] += row.total
+            load['overdue'] += row.overdue
+            if row.status in (TaskStatus.todo, TaskStatus.in_progress):
+                load['open'] += row.total
+
+        stats = ProjectStats(
+            project_id=project_id,
+            total=sum(by_status.values()),
+            overdue=sum(load['overdue'] for load in assignees.values()),
+            by_status=by_status,
+            by_priority=by_priority,
+            assignees=[ProjectAssigneeLoad(user_id=user_id, total=load['total'],
+                                           open=load['open'], overdue=load['overdue'])
+                       for user_id, load in sorted(assignees.items(),
+                                                   key=lambda item: (item[0] is None, item[0] or 0))],
+            as_of=today)
+        if not archived:
+            project_stats_cache.set(project_id, stats)
+        return stats
+
     async def update_project(
             self, project_id: int,
             project: ProjectUpdate,
             owner: UserModel)->Project:
         """
-        Обновляет поля в проекте.
+        Обновляет поля в проекте. Загружается только заголовок проекта.
         """
-        db_project = await self.get_project(project_id, owner)
+        db_project = await self.get_project_header(project_id, owner)
 
         if db_project.owner_id != owner.id:
             raise PermissionError("У вас нет прав на редактирование этого проекта.")
@@ -112,34 +256,35 @@ class ProjectService:
             db_project.dub_date = project.dub_date
 
         await self.db.commit()
-        await self.db.refresh(db_project)
         return db_project
 
     async def add_member(self, project_id: int, email: str, owner: UserModel)->Project:
         """
-        Добавляет участника в проект.
+        Добавляет участника в проект. Членство проверяется по PK project_members,
+        список участников загружается один раз - для ответа, после commit.
         """
-        db_project = await self.get_project(project_id, owner)
+        db_project = await self.get_project_header(project_id, owner)
         if db_project.owner_id != owner.id:
             raise PermissionError("У вас нет прав на добавление участников в этот проект.")
 
         db_user = await self.db.scalar(select(UserModel).where(UserModel.email == email))
         if db_user is None:
             raise ValueError(f"Пользователь с email {email} не найден.")
-        is_member = any(member.email == email for member in db_project.members)
-        if is_member:
+        if await self.db.get(ProjectMember, (project_id, db_user.id)) is not None:
             raise ValueError(f'Пользователь с email {email} уже учавствует в этом проекте')
 
-        db_project.members.append(db_user)
+        self.db.add(ProjectMember(project_id=project_id, user_id=db_user.id))
         await self.db.commit()
-        await self.db.refresh(db_project)
+        membership_index.add_member(project_id, db_user.id)
+        await self.db.refresh(db_project, ['members', 'members_count'])
         return db_project
 
     async def remove_member(self,project_id: int, user_id: int, current_user):
         """
-        Удаляет учакстника из проекта.
+        Удаляет учакстника из проекта. Как и add_member, работает со строкой
+        project_members, а не со списком участников.
         """
-        db_project = await self.get_project(project_id, current_user)
+        db_project = await self.get_project_header(project_id, current_user)
         if db_project.owner_id != current_user.id:
             raise PermissionError("У вас нет прав на изгнание участников из этого проекта.")
         db_user = await self.db.scalar(
@@ -148,17 +293,14 @@ class ProjectService:
         if db_user is None:
             raise ValueError(f"Пользователь с ID {user_id} не найден.")
 
-        user_to_remove = next(
-            (member for member in db_project.members if member.id == user_id),
-            None
-        )
-
-        if user_to_remove is None:
+        membership = await self.db.get(ProjectMember, (project_id, user_id))
+        if membership is None:
             raise ValueError(f'Пользователь с ID {user_id} отсутствует в этом проекте')
 
-        db_project.members.remove(user_to_remove)
+        await self.db.delete(membership)
         await self.db.commit()
-        await self.db.refresh(db_project)
+        membership_index.remove_member(project_id, user_id)
+        await self.db.refresh(db_project, ['members', 'members_count'])
         return db_project
 
     async def delete_project(self, project_id: int, current_user:UserModel):
@@ -176,11 +318,71 @@ class ProjectService:
         if  not can_delete:
             raise PermissionError('Проект может удалить только владелец или админ')
 
+        await TaskCounterService(self.db).delete_project(project_id)
+        await self.db.execute(delete(ArchivedTask).where(ArchivedTask.project_id == project_id))
         await self.db.delete(project)
         await self.db.commit()
+        membership_index.remove_project(project_id)
+        project_stats_cache.invalidate(project_id)
         return
 
+    async def archive_project(self, project_id: int, current_user: UserModel) -> Project:
+        """
+        Переносит задачи проекта в archived_tasks и помечает проект неактивным.
+        Сначала commit флага - новые задачи в проекте больше не создаются, затем перенос
+        пачками по ARCHIVE_CHUNK_SIZE, каждая в своей транзакции: горячая таблица не
+        блокируется надолго, а прерванный перенос продолжает повторный вызов.
+        Доступ: владелец проекта и админ.
+        """
+        db_project = (await self.access.check(
+            project_id, current_user, ProjectAction.archive,
+            joinedload(Project.owner), undefer(Project.members_count), selectinload(Project.task_counters))
+        ).ensure('Архивировать проект может только владелец или админ')
+
+        if db_project.is_active:
+            db_project.is_active = False
+            await self.db.commit()
+        await self._move_tasks(project_id, Task, ArchivedTask)
+        project_stats_cache.invalidate(project_id)
+        return db_project
 
+    async def unarchive_project(self, project_id: int, current_user: UserModel) -> Project:
+        """
+        Возвращает задачи проекта из archived_tasks в tasks теми же пачками
+        и снова делает проект активным. Доступ - как у archive_project.
+        """
+        db_project = (await self.access.check(
+            project_id, current_user, ProjectAction.archive,
+            joinedload(Project.owner), undefer(Project.members_count), selectinload(Project.task_counters))
+        ).ensure('Вернуть проект из архива может только владелец или админ')
+
+        await self._move_tasks(project_id, ArchivedTask, Task)
+        if not db_project.is_active:
+            db_project.is_active = True
+            await self.db.commit()
+        project_stats_cache.invalidate(project_id)
+        return db_project
 
-
-
+    async def _move_tasks(self, project_id: int, source, target) -> int:
+        """
+        Переносит задачи проекта из source в target пачками: INSERT ... SELECT и DELETE
+        по одним и тем же id, плюс сдвиг счётчиков исполнителей - в одной транзакции.
+        Возвращает число перенесённых задач.
+        """
+        counters = TaskCounterService(self.db)
+        sign = -1 if target is ArchivedTask else 1
+        columns = [getattr(source, name) for name in ARCHIVED_TASK_COLUMNS]
+        moved = 0
+        while True:
+            # Без ORDER BY: любые chunk строк по индексу project_id, без сортировки всего проекта
+            ids = list(await self.db.scalars(
+                select(source.id).where(source.project_id == project_id)
+                .limit(settings.ARCHIVE_CHUNK_SIZE)))
+            if not ids:
+                return moved
+            await counters.shift_assignees(source, ids, sign)
+            await self.db.execute(insert(target).from_select(
+                list(ARCHIVED_TASK_COLUMNS), select(*columns).where(source.id.in_(ids))))
+            await self.db.execute(delete(source).where(source.id.in_(ids)))
+            await self.db.commit()
+            moved += len(ids)
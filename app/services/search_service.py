@@ -0,0 +1,109 @@
+import re
+from abc import ABC, abstractmethod
+from typing import Optional, Sequence
+
+from sqlalchemy import Row, Select, and_, false, func, literal, literal_column, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.projects import Project
+from app.models.search import SEARCH_CONFIG, project_search_vector, search_fts, task_search_vector
+from app.models.tasks import Task
+from app.models.users import User as UserModel
+from app.services.access_service import ProjectAccessService, ProjectAction
+
+_TERM = re.compile(r'\w+')
+
+
+class SearchBackend(ABC):
+    """
+    Построение поискового запроса для конкретной СУБД. Запрос возвращает строки
+    (kind, id, project_id, title, rank), rank - чем больше, тем релевантнее.
+    project_scope/task_scope - проекты, доступные для поиска проектов/задач
+    (None - без ограничений); фильтр доступа - часть запроса.
+    """
+
+    @abstractmethod
+    def query(self, terms: list[str], project_scope: Optional[frozenset[int]],
+              task_scope: Optional[frozenset[int]], limit: int) -> Select:
+        ...
+
+
+class PostgresSearchBackend(SearchBackend):
+    """Генерируемые tsvector-колонки с GIN-индексами, ранжирование ts_rank."""
+
+    def query(self, terms, project_scope, task_scope, limit):
+        # Все слова обязательны, последнее - по префиксу (поиск по мере ввода)
+        tsquery = func.to_tsquery(SEARCH_CONFIG, ' & '.join(terms) + ':*')
+        projects = (
+            select(literal('project').label('kind'), Project.id.label('id'),
+                   Project.id.label('project_id'), Project.title,
+                   func.ts_rank(project_search_vector, tsquery).label('rank'))
+            .where(project_search_vector.bool_op('@@')(tsquery)))
+        if project_scope is not None:
+            projects = projects.where(Project.id.in_(project_scope))
+        tasks = (
+            select(literal('task').label('kind'), Task.id.label('id'),
+                   Task.project_id, Task.title,
+                   func.ts_rank(task_search_vector, tsquery).label('rank'))
+            .where(task_search_vector.bool_op('@@')(tsquery)))
+        if task_scope is not None:
+            tasks = tasks.where(Task.project_id.in_(task_scope))
+        hits = union_all(projects, tasks).subquery()
+        return (select(hits)
+                .order_by(hits.c.rank.desc(), hits.c.kind, hits.c.id)
+                .limit(limit))
+
+
+class SqliteSearchBackend(SearchBackend):
+    """FTS5-таблица search_fts (тестовая база), ранжирование bm25."""
+
+    def query(self, terms, project_scope, task_scope, limit):
+        # Каждое слово в кавычках - спецсимволы FTS5 из запроса не интерпретируются
+        match = ' '.join(f'"{term}"' for term in terms) + '*'
+        fts = literal_column('search_fts')
+        rank = (-func.bm25(fts)).label('rank')
+        access = [
+            and_(search_fts.c.kind == kind,
+                 search_fts.c.project_id.in_(scope) if scope is not None else True)
+            for kind, scope in (('project', project_scope), ('task', task_scope))
+        ]
+        return (
+            select(search_fts.c.kind, search_fts.c.ref_id.label('id'),
+                   search_fts.c.project_id, search_fts.c.title, rank)
+            .where(fts.op('MATCH')(match), or_(false(), *access))
+            .order_by(rank.desc(), search_fts.c.kind, search_fts.c.ref_id)
+            .limit(limit))
+
+
+SEARCH_BACKENDS: dict[str, type[SearchBackend]] = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SqliteSearchBackend,
+}
+
+
+class SearchService:
+    """Полнотекстовый поиск по названиям и описаниям проектов и задач."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.access = ProjectAccessService(db)
+        dialect = db.get_bind().dialect.name
+        if dialect not in SEARCH_BACKENDS:
+            raise RuntimeError(f'Полнотекстовый поиск не поддерживается для {dialect}')
+        self.backend = SEARCH_BACKENDS[dialect]()
+
+    async def search(self, q: str, current_user: UserModel,
+                     limit: int = settings.PAGE_SIZE_DEFAULT) -> Sequence[Row]:
+        """
+        Проекты и задачи, где встречаются все слова запроса, по убыванию релевантности.
+        Видны проекты, которые пользователь может открыть, и задачи проектов, задачи
+        которых он может смотреть. Бросает ValueError, если в запросе нет слов.
+        """
+        terms = [term.lower() for term in _TERM.findall(q)]
+        if not terms:
+            raise ValueError('Поисковый запрос должен содержать хотя бы одно слово.')
+        project_scope = await self.access.accessible_project_ids(current_user, ProjectAction.view)
+        task_scope = await self.access.accessible_project_ids(current_user, ProjectAction.view_tasks)
+        stmt = self.backend.query(terms, project_scope, task_scope, limit)
+        return (await self.db.execute(stmt)).all()
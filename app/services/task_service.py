@@ -1,120 +1,166 @@
 from typing import Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_
+from sqlalchemy import and_, select, or_, update
 
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, selectinload
 
-from app.models import Project
+from app.models import ArchivedTask, Project, ProjectMember
 from app.models.tasks import Task, TaskPriority, TaskStatus
 from app.models.users import User as UserModel, UserRole, User
+from app.config import settings
+from app.fieldsets import ARCHIVED_TASK_FIELDS, FieldSet
+from app.membership import membership_index
+from app.pagination import keyset_page, split_page
+from app.services.access_service import ProjectAccessService, ProjectAction
+from app.services.counter_service import TaskCounterDelta, TaskCounterService, TaskCounterState
+from app.services.project_service import project_stats_cache
 from app.schemas.tasks import TaskCreate, TaskUpdate
 
+# Колонки задачи, которые нельзя сбросить в NULL явным null в patch
+NOT_NULL_TASK_FIELDS = frozenset(column.key for column in Task.__table__.columns if not column.nullable)
+
 
 class TaskService:
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.access = ProjectAccessService(db)
+        self.counters = TaskCounterService(db)
 
     async def create_task(
             self, project_id, task: TaskCreate,
             current_user: UserModel):
+        """
+        Создаёт задачу. Права проверяются одним запросом EXISTS без загрузки участников;
+        ответ собирается из уже загруженных объектов, повторный SELECT не нужен.
+        """
+        db_project = (await self.access.check(project_id, current_user, ProjectAction.create_task)).ensure(
+            "Только владелец или участник проекта может создавать задачи в этом проекте.")
+        self._ensure_active(db_project)
 
-        db_project = await self.db.scalar(
-            select(Project)
-            .options(selectinload(Project.members), selectinload(Project.owner))
-            .where(Project.id == project_id)
-        )
-        if not db_project:
-            raise ValueError(f"Проект с ID {project_id} не найден.")
-
-        is_creator_member_or_owner = (db_project.owner_id == current_user.id or
-                              any(member.id == current_user.id for member in db_project.members))
-
-        if not is_creator_member_or_owner:
-            raise PermissionError("Только владелец или участник проекта может создавать задачи в этом проекте.")
-
-        task_data = task.model_dump()
-        assigned_to_id: Optional[int] = None
-        assigned_to_email = task.assigned_to_email
-
-        if assigned_to_email is not None:
-            assigned_user: Optional[UserModel] = None
-
-            if db_project.owner.email == assigned_to_email:
-                assigned_user = db_project.owner
-            else:
-                assigned_user = next((member for member in db_project.members if member.email == assigned_to_email),
-                None)
-            if assigned_user is None:
-                raise ValueError("Назначенный исполнитель не является участником этого проекта.")
-            assigned_to_id = assigned_user.id
-        task_data = task.model_dump()
-        if 'assigned_to_email' in task_data:
-            del task_data['assigned_to_email']
+        # Автор обычно уже в identity map после аутентификации
+        author = await self.db.get(UserModel, current_user.id)
+        assigned_user = await self._get_project_user_by_email(db_project, task.assigned_to_email)
 
         new_task = Task(
-            **task_data,
-            project_id = db_project.id,
-            author_id = current_user.id,
-            assigned_to_id=assigned_to_id
+            **task.model_dump(exclude={'assigned_to_email'}),
+            project=db_project,
+            author=author,
+            assigned_to=assigned_user
         )
         self.db.add(new_task)
+        delta = TaskCounterDelta()
+        delta.add(TaskCounterState.of(new_task))
+        await self.counters.apply(delta)
+        # INSERT ... RETURNING id и UPSERT счётчиков; created_at и status заданы на стороне приложения
         await self.db.commit()
-        await self.db.refresh(new_task)
+        project_stats_cache.invalidate(project_id)
+        return new_task
 
-        loaded_task = await self.db.scalar(
-            select(Task).where(Task.id == new_task.id)
-            .options(selectinload(Task.project),
-                     selectinload(Task.assigned_to)),
-        )
-        return loaded_task
+    async def create_tasks_bulk(self, project_id: int, tasks: list[TaskCreate],
+                                current_user: UserModel) -> list[tuple[int, Optional[Task], Optional[str]]]:
+        """
+        Создаёт пакет задач в одной транзакции. Права проверяются один раз, автор и все
+        исполнители находятся одним запросом, вставка - одним многострочным INSERT.
+        Возвращает (позиция, задача или None, ошибка или None) для каждой задачи.
+        """
+        db_project = await self.db.scalar(
+            select(Project).options(joinedload(Project.owner)).where(Project.id == project_id))
+        if db_project is None:
+            raise ValueError(f"Проект с ID {project_id} не найден.")
+        self._ensure_active(db_project)
+
+        emails = {task.assigned_to_email for task in tasks if task.assigned_to_email is not None}
+        member_ids = select(ProjectMember.user_id).where(ProjectMember.project_id == project_id)
+        project_users = (await self.db.scalars(
+            select(UserModel)
+            .where(or_(UserModel.id == current_user.id, UserModel.email.in_(emails)),
+                   or_(UserModel.id == db_project.owner_id, UserModel.id.in_(member_ids)))
+        )).all()
+        author = next((user for user in project_users if user.id == current_user.id), None)
+        if author is None:
+            raise PermissionError("Только владелец или участник проекта может создавать задачи в этом проекте.")
+        users_by_email = {user.email: user for user in project_users}
+
+        results: list[tuple[int, Optional[Task], Optional[str]]] = []
+        new_tasks = []
+        for index, task in enumerate(tasks):
+            assigned_user = None
+            if task.assigned_to_email is not None:
+                assigned_user = users_by_email.get(task.assigned_to_email)
+                if assigned_user is None:
+                    results.append((index, None, "Назначенный исполнитель не является участником этого проекта."))
+                    continue
+            new_task = Task(
+                **task.model_dump(exclude={'assigned_to_email'}),
+                project=db_project,
+                author=author,
+                assigned_to=assigned_user)
+            new_tasks.append(new_task)
+            results.append((index, new_task, None))
+
+        if new_tasks:
+            # Объекты одного класса без заданных id: на PostgreSQL unit of work отправляет
+            # один INSERT ... VALUES (...), (...) RETURNING id на пакет (insertmanyvalues)
+            self.db.add_all(new_tasks)
+            delta = TaskCounterDelta()
+            for new_task in new_tasks:
+                delta.add(TaskCounterState.of(new_task))
+            await self.counters.apply(delta)
+            await self.db.commit()
+            project_stats_cache.invalidate(project_id)
+        return results
+
+    @staticmethod
+    def _ensure_active(db_project: Project) -> None:
+        """Задачи архивного проекта лежат в archived_tasks: новые в нём не создаются."""
+        if not db_project.is_active:
+            raise PermissionError("Проект в архиве: новые задачи в нём не создаются.")
 
     async def get_project_tasks(self, project_id:int,
                                 current_user:UserModel,
                                 status_filter: Optional[TaskStatus],
-                                priority_filter: Optional[TaskPriority]):
+                                priority_filter: Optional[TaskPriority],
+                                limit: int = settings.PAGE_SIZE_DEFAULT,
+                                cursor: Optional[str] = None,
+                                fieldset: Optional[FieldSet] = None,
+                                archived: bool = False)->tuple[list[Task], Optional[str]]:
         """
-        Получает список задач проекта. Доступ: owner, member, admin или manager.
+        Получает страницу задач проекта (от новых к старым) и курсор следующей страницы.
+        Доступ: owner, member, admin или manager.
         """
-        db_project = await self.db.scalar(
-            select(Project)
-            .options(selectinload(Project.members))
-            .where(Project.id == project_id)
-        )
-        if db_project is None:
-            raise ValueError(f'Проект с ID {project_id} не найден.')
-
-        workers_in = any(member.id == current_user.id for member in db_project.members)
-        is_project_owner = db_project.owner_id == current_user.id
-        big_worker = current_user.role == UserRole.admin or current_user.role == UserRole.manager
-
-        if not (is_project_owner or big_worker or workers_in):
-            raise PermissionError('У вас нет прав на просмотр этих данных')
+        # Владельцу и участнику доступ подтверждает индекс членства, без SQL
+        decision = await self.access.check(project_id, current_user, ProjectAction.view_tasks,
+                                           load_project=False)
+        decision.ensure('У вас нет прав на просмотр этих данных')
 
+        source = ArchivedTask if archived else Task
         stmt = (
-            select(Task)
-            .where(Task.project_id==project_id)
-            .options(selectinload(Task.assigned_to),
-                     selectinload(Task.project),
-                     selectinload(Task.author))
-            .order_by(Task.created_at.desc())
+            select(source)
+            .where(source.project_id==project_id)
+            .options(*self._load_options(fieldset, model=source))
         )
         if status_filter is not None:
-            stmt = stmt.where(Task.status == status_filter)
+            stmt = stmt.where(source.status == status_filter)
         if priority_filter is not None:
-            stmt = stmt.where(Task.priority == priority_filter)
+            stmt = stmt.where(source.priority == priority_filter)
+        stmt = keyset_page(stmt, source.created_at, source.id, limit, cursor)
 
         tasks = (await self.db.scalars(stmt)).all()
-        return tasks
+        return split_page(tasks, limit)
 
 
     async def update_task(self, task_id, task: TaskUpdate,
                           current_user: UserModel)->Task:
+        """
+        Частично обновляет задачу. Задача, проект, автор и исполнитель читаются одним
+        запросом с JOIN; ответ строится из них же, без refresh и повторного SELECT.
+        """
         db_task = await self.db.scalar(
             select(Task)
-            .options(selectinload(Task.project).selectinload(Project.owner),
-                     selectinload(Task.assigned_to),
-                     selectinload(Task.author))
+            .options(joinedload(Task.project),
+                     joinedload(Task.assigned_to),
+                     joinedload(Task.author))
             .where(Task.id == task_id))
 
         if db_task is None:
@@ -122,7 +168,7 @@ class TaskService:
 
         db_project = db_task.project
 
-        is_project_owner = db_task.project.owner_id == current_user.id
+        is_project_owner = db_project.owner_id == current_user.id
         is_assignee = db_task.assigned_to_id == current_user.id
         is_author = db_task.author_id == current_user.id
 
@@ -130,32 +176,138 @@ class TaskService:
             raise PermissionError("У вас нет прав на редактирование этой задачи."
                                   "Только владелец проекта, автор или исполнитель.")
 
-
         update_data = task.model_dump(exclude_unset=True)
-        new_assigned_to_id = update_data.get('assigned_to_id')
-
-        if new_assigned_to_id in update_data:
-            if new_assigned_to_id == 0:
-                update_data['assigned_to_id'] = None
-                new_assigned_to_id = None
-            if new_assigned_to_id is not None:
-                assigned_is_member = (db_project.owner_id == new_assigned_to_id or
-                                      any(member.id == new_assigned_to_id for member in db_project.members))
-                if not assigned_is_member:
-                    raise ValueError("Новый назначенный исполнитель не является участником этого проекта.")
+        before = TaskCounterState.of(db_task)
+
+        if 'assigned_to_email' in update_data:
+            assigned_to_email = update_data.pop('assigned_to_email')
+            db_task.assigned_to = await self._get_project_user_by_email(db_project, assigned_to_email)
 
         for key, value in update_data.items():
             setattr(db_task, key, value)
 
+        delta = TaskCounterDelta()
+        delta.move(before, TaskCounterState.of(db_task))
+        await self.counters.apply(delta)
         await self.db.commit()
-        await self.db.refresh(db_task)
-        loaded_task = await self.db.scalar(
-            select(Task).where(Task.id == db_task.id)
-            .options(selectinload(Task.project),
-                     selectinload(Task.assigned_to),
-                     selectinload(Task.author)),
-        )
-        return loaded_task
+        project_stats_cache.invalidate(db_project.id)
+        return db_task
+
+    async def update_tasks_batch(self, patches: dict[int, dict],
+                                 current_user: UserModel) -> dict[int, Optional[str]]:
+        """
+        Пакетно обновляет задачи. patches: ID задачи -> изменённые поля (как в TaskUpdate).
+        Права проверяются одним запросом по всем ID, исполнители - одним запросом по всем email,
+        изменения применяются UPDATE ... WHERE id IN (...) на каждую группу одинаковых изменений.
+        Возвращает ID задачи -> текст ошибки или None, если задача обновлена.
+        """
+        results: dict[int, Optional[str]] = {}
+        rows = (await self.db.execute(
+            select(Task.id, Task.project_id, Task.author_id, Task.assigned_to_id,
+                   Task.status, Task.priority, Project.owner_id)
+            .join(Project, Project.id == Task.project_id)
+            .where(Task.id.in_(patches))
+        )).all()
+        found = {row.id: row for row in rows}
+        allowed = {}
+        for task_id in patches:
+            row = found.get(task_id)
+            if row is None:
+                results[task_id] = f'Задача с ID {task_id} не найдена.'
+            elif current_user.id not in (row.owner_id, row.author_id, row.assigned_to_id):
+                results[task_id] = 'У вас нет прав на редактирование этой задачи.'
+            else:
+                allowed[task_id] = row
+
+        emails = {patches[task_id]['assigned_to_email'] for task_id in allowed
+                  if patches[task_id].get('assigned_to_email') is not None}
+        assignees = await self._resolve_assignees(emails, {row.project_id for row in allowed.values()})
+
+        # Группы задач с одинаковыми итоговыми значениями - по одному UPDATE на группу
+        groups: dict[tuple, list[int]] = {}
+        for task_id, row in allowed.items():
+            values = dict(patches[task_id])
+            cleared = sorted(key for key, value in values.items() if value is None and key in NOT_NULL_TASK_FIELDS)
+            if cleared:
+                results[task_id] = f"Поля {', '.join(cleared)} не могут быть пустыми."
+                continue
+            if 'assigned_to_email' in values:
+                email = values.pop('assigned_to_email')
+                if email is None:
+                    values['assigned_to_id'] = None
+                else:
+                    user_id, project_ids = assignees.get(email, (None, set()))
+                    if row.project_id not in project_ids:
+                        results[task_id] = "Новый назначенный исполнитель не является участником этого проекта."
+                        continue
+                    values['assigned_to_id'] = user_id
+            if not values:
+                results[task_id] = None
+                continue
+            groups.setdefault(tuple(sorted(values.items())), []).append(task_id)
+
+        delta = TaskCounterDelta()
+        for values, task_ids in groups.items():
+            updated_ids = set((await self.db.scalars(
+                update(Task)
+                .where(Task.id.in_(task_ids))
+                .values(dict(values))
+                .returning(Task.id)
+                .execution_options(synchronize_session=False)
+            )).all())
+            for task_id in task_ids:
+                results[task_id] = None if task_id in updated_ids else f'Задача с ID {task_id} не найдена.'
+                if task_id in updated_ids:
+                    row = allowed[task_id]
+                    before = TaskCounterState(row.project_id, row.assigned_to_id, row.status, row.priority)
+                    delta.move(before, before._replace(**{key: value for key, value in values
+                                                          if key in TaskCounterState._fields}))
+
+        await self.counters.apply(delta)
+        await self.db.commit()
+        for project_id in {allowed[task_id].project_id for task_id, error in results.items()
+                           if error is None and task_id in allowed}:
+            project_stats_cache.invalidate(project_id)
+        return {task_id: results[task_id] for task_id in patches}
+
+    async def _resolve_assignees(self, emails: set[str],
+                                 project_ids: set[int]) -> dict[str, tuple[int, set[int]]]:
+        """
+        email -> (ID пользователя, проекты из project_ids, где он участник или владелец).
+        Один запрос на все email.
+        """
+        if not emails:
+            return {}
+        rows = (await self.db.execute(
+            select(UserModel.id, UserModel.email, ProjectMember.project_id, Project.id.label('owned_project_id'))
+            .outerjoin(ProjectMember, and_(ProjectMember.user_id == UserModel.id,
+                                           ProjectMember.project_id.in_(project_ids)))
+            .outerjoin(Project, and_(Project.owner_id == UserModel.id, Project.id.in_(project_ids)))
+            .where(UserModel.email.in_(emails))
+        )).all()
+        assignees: dict[str, tuple[int, set[int]]] = {}
+        for row in rows:
+            _, available_in = assignees.setdefault(row.email, (row.id, set()))
+            available_in.update(project_id for project_id in (row.project_id, row.owned_project_id)
+                                if project_id is not None)
+        return assignees
+
+    async def _get_project_user_by_email(self, db_project: Project,
+                                         email: Optional[str]) -> Optional[UserModel]:
+        """
+        Исполнитель задачи: владелец или участник проекта (один запрос).
+        None снимает назначение.
+        """
+        if email is None:
+            return None
+        member_ids = select(ProjectMember.user_id).where(ProjectMember.project_id == db_project.id)
+        assigned_user = await self.db.scalar(
+            select(UserModel)
+            .where(UserModel.email == email,
+                   or_(UserModel.id == db_project.owner_id, UserModel.id.in_(member_ids))))
+        if assigned_user is None:
+            raise ValueError("Назначенный исполнитель не является участником этого проекта.")
+        return assigned_user
 
     async def delete_task(self, task_id:int, current_user: UserModel):
         db_task = await self.db.scalar(
@@ -173,76 +325,95 @@ class TaskService:
             raise PermissionError("У вас нет прав на удаление этой задачи."
                                   "Только владелец проекта или автор могут её удалить.")
 
+        delta = TaskCounterDelta()
+        delta.remove(TaskCounterState.of(db_task))
+        await self.counters.apply(delta)
+        project_id = db_task.project_id
         await self.db.delete(db_task)
         await self.db.commit()
+        project_stats_cache.invalidate(project_id)
         return
 
-    async def get_task_by_id(self, task_id:int, current_user:UserModel):
+    @staticmethod
+    def _load_options(fieldset: Optional[FieldSet], joined: tuple[str, ...] = (), model=Task) -> list:
+        """
+        Загрузчики задач для ответа: по fieldset или проект, исполнитель и автор.
+        model - Task или ArchivedTask (чтение архива).
+        """
+        if fieldset is not None:
+            if model is ArchivedTask:
+                fieldset = fieldset.rebind(ARCHIVED_TASK_FIELDS)
+            return fieldset.load_options(joined)
+        loaders = {name: joinedload if name in joined else selectinload
+                   for name in ('project', 'assigned_to', 'author')}
+        return [loaders['assigned_to'](model.assigned_to),
+                loaders['project'](model.project),
+                loaders['author'](model.author)]
+
+    async def get_task_by_id(self, task_id:int, current_user:UserModel,
+                             fieldset: Optional[FieldSet] = None,
+                             archived: bool = False):
+        """
+        Задача с проектом, автором и исполнителем одним запросом. Участие в проекте
+        проверяется EXISTS, только если пользователь не админ и не владелец.
+        Если проект не запрошен в fieldset, он не загружается: доступ проверяется
+        по индексу членства. archived - задача архивного проекта.
+        """
+        source = ArchivedTask if archived else Task
         db_task = await self.db.scalar(
-            select(Task).options(selectinload(Task.project).selectinload(Project.members),
-                                 selectinload(Task.assigned_to),
-                                 selectinload(Task.author)
-                                 )
-            .where(Task.id == task_id)
+            select(source).options(*self._load_options(fieldset, joined=('project', 'assigned_to', 'author'),
+                                                       model=source))
+            .where(source.id == task_id)
         )
 
         if db_task is None:
             raise ValueError(f'Задача с ID {task_id} не найдена.')
 
-        db_project = db_task.project
-
-        is_project_owner = db_task.project.owner_id == current_user.id
-        is_project_member = any(member.id == current_user.id for member in db_project.members)
-        is_admin = current_user.role == UserRole.admin
-
-        if is_admin:
-            return db_task
-
-        if not (is_project_owner or is_project_member):
-            raise PermissionError("У вас нет прав на просмотр этой задачи.")
-
+        if fieldset is None or 'project' in fieldset.include:
+            decision = await self.access.check_project(db_task.project, current_user, ProjectAction.view)
+        else:
+            decision = await self.access.check(db_task.project_id, current_user, ProjectAction.view,
+                                               load_project=False)
+        decision.ensure("У вас нет прав на просмотр этой задачи.")
         return db_task
 
-    async def get_my_assigned_tasks(self, current_user: UserModel):
+    async def get_my_assigned_tasks(self, current_user: UserModel,
+                                    fieldset: Optional[FieldSet] = None,
+                                    limit: int = settings.PAGE_SIZE_DEFAULT,
+                                    cursor: Optional[str] = None) -> tuple[list[Task], Optional[str]]:
         """
-        Получает список задач, назначенных текущему пользователю.
+        Страница задач, назначенных текущему пользователю, от новых к старым, и курсор следующей.
         """
         stmt = (
             select(Task)
-            .options(selectinload(Task.project),
-                     selectinload(Task.assigned_to),
-                     selectinload(Task.author))
+            .options(*self._load_options(fieldset))
             .where(Task.assigned_to_id == current_user.id)
-            .order_by(Task.created_at.desc())
         )
+        stmt = keyset_page(stmt, Task.created_at, Task.id, limit, cursor)
         tasks = (await self.db.scalars(stmt)).all()
-        return list(tasks)
+        return split_page(tasks, limit)
 
-    async def get_user_tasks(self, user_id, current_user: UserModel):
+    async def get_user_tasks(self, user_id, current_user: UserModel,
+                             fieldset: Optional[FieldSet] = None,
+                             limit: int = settings.PAGE_SIZE_DEFAULT,
+                             cursor: Optional[str] = None) -> tuple[list[Task], Optional[str]]:
         """
-         Получает список задач, назначенных целевому пользователю (user_id).
+         Страница задач, назначенных целевому пользователю (user_id), и курсор следующей.
          Возвращает только те задачи, к проектам которых current_user имеет доступ.
+         Проекты current_user берутся из индекса членства вместо JOIN с project_members.
          """
+        memberships = await membership_index.memberships(self.db, current_user.id)
         task_assignment_condition = Task.assigned_to_id == user_id
-        access_condition = or_(
-            Project.owner_id == current_user.id,
-            Project.members.any(UserModel.id == current_user.id)
-        )
+        access_condition = Task.project_id.in_(memberships.project_ids)
 
         stmt = (
             select(Task)
-            .join(Task.project)
-            .options(
-                selectinload(Task.project),
-                selectinload(Task.assigned_to),
-                selectinload(Task.author),
-            )
+            .options(*self._load_options(fieldset))
             .where(task_assignment_condition, access_condition)
-            .order_by(Task.created_at.desc())
         )
-
+        stmt = keyset_page(stmt, Task.created_at, Task.id, limit, cursor)
         tasks = (await self.db.scalars(stmt)).all()
-        return list(tasks)
+        return split_page(tasks, limit)
 
 
 
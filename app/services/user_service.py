@@ -1,19 +1,49 @@
+import re
 from typing import Optional
 
 import jwt
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import Select, and_, case, func, literal, or_, select, union_all, update
+from fastapi import BackgroundTasks
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, load_only, undefer
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.config import settings
+from app.models.projects import Project, ProjectMember
 from app.models.users import User as UserModel, UserRole
-from app.models.tasks import Task as TaskModel
-from app.schemas.users import UserRegister, UserUpdate, UserAdminUpdate
+from app.models.tasks import Task as TaskModel, TaskPriority, TaskStatus
+from app.password_pool import PoolSaturatedError
+from app.config import settings
+from app.database import async_session_maker
+from app.fieldsets import FieldSet
+from app.pagination import count_rows, keyset_page, split_page
+from app.services.access_service import ProjectAccessService, ProjectAction
+from app.services.counter_service import USER_COUNT_COLUMNS
+from app.user_lookup import LookupRecord, user_lookup_index
+from app.schemas.users import UserRegister, UserUpdate, UserAdminUpdate, UserFilter
 from app.auth import (hash_password,
-                      verify_password,
+                      hash_password_async,
+                      verify_password_async,
+                      password_needs_rehash,
+                      password_pool,
                       create_access_token,
-                      create_refresh_token)
+                      create_refresh_token,
+                      decode_token,
+                      invalidate_principal,
+                      token_claims)
+
+
+_LOOKUP_TERM = re.compile(r'\w+')
+
+_PRIORITY_RANK = {TaskPriority.high: 0, TaskPriority.medium: 1, TaskPriority.low: 2}
+# Порядки сводки профиля: последние задачи и срочные (ближайший дедлайн, без дедлайна - в конце,
+# затем приоритет и новизна). Единственное место, где они заданы: порядок списков берётся из запроса
+_SUMMARY_ORDERS = {
+    'recent_tasks': (TaskModel.created_at.desc(), TaskModel.id.desc()),
+    'urgent_tasks': (TaskModel.due_date.is_(None), TaskModel.due_date,
+                     case(_PRIORITY_RANK, value=TaskModel.priority),
+                     TaskModel.created_at.desc(), TaskModel.id.desc()),
+}
 
 
 class UserService:
@@ -37,7 +67,7 @@ class UserService:
 
         new_user = UserModel(
             email=user_in["email"],
-            hashed_password=hash_password(user_in["password"]),
+            hashed_password=await hash_password_async(user_in["password"]),
             first_name=user_in["first_name"],
             last_name=user_in["last_name"],
             role=role,
@@ -47,6 +77,7 @@ class UserService:
 
         self.db.add(new_user)
         await self.db.commit()
+        user_lookup_index.invalidate()
         await self.db.refresh(new_user)
         return new_user
 
@@ -63,7 +94,7 @@ class UserService:
             raise ValueError('Email already registered')
         new_user = UserModel(
             email=user.email,
-            hashed_password=hash_password(user.password),
+            hashed_password=await hash_password_async(user.password),
             first_name=user.first_name,
             last_name=user.last_name,
             role=UserRole.member
@@ -73,12 +104,15 @@ class UserService:
 
         self.db.add(new_user)
         await self.db.commit()
+        user_lookup_index.invalidate()
         await self.db.refresh(new_user)
         return new_user
 
-    async def login_user(self, from_data: OAuth2PasswordRequestForm):
+    async def login_user(self, from_data: OAuth2PasswordRequestForm,
+                         background_tasks: Optional[BackgroundTasks] = None):
         """
         Аутентифицирует пользователя и возвращает access_token и refresh_token.
+        Хеш с устаревшими параметрами argon2 пересчитывается в фоне после ответа.
         """
         user = await self.db.scalar(
             select(UserModel).where(UserModel.email == from_data.username,
@@ -86,19 +120,41 @@ class UserService:
         if not user:
             raise ValueError('Invalid email or password')
 
-        if not verify_password(from_data.password, user.hashed_password):
+        if not await verify_password_async(from_data.password, user.hashed_password):
             raise ValueError('Invalid email or password')
 
-        access_token = create_access_token(data={"sub": user.email, "role": user.role.name, "id": user.id})
-        refresh_token = create_refresh_token(data={"sub": user.email, "role": user.role.name, "id": user.id})
+        if background_tasks is not None and password_needs_rehash(user.hashed_password):
+            background_tasks.add_task(self.rehash_password,
+                                      user.id, user.hashed_password, from_data.password)
+
+        access_token = create_access_token(data=token_claims(user))
+        refresh_token = create_refresh_token(data=token_claims(user))
         return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
+    async def rehash_password(self, user_id: int, old_hash: str, password: str) -> bool:
+        """
+        Пересчитывает хеш пароля с текущими параметрами argon2 и сохраняет его,
+        если пароль не менялся с момента логина. При занятом пуле откладывает до следующего входа.
+        Выполняется после ответа, поэтому открывает собственную сессию, а не сессию запроса.
+        """
+        try:
+            new_hash = await password_pool.run(hash_password, password)
+        except PoolSaturatedError:
+            return False
+        async with async_session_maker() as db:
+            result = await db.execute(
+                update(UserModel)
+                .where(UserModel.id == user_id, UserModel.hashed_password == old_hash)
+                .values(hashed_password=new_hash))
+            await db.commit()
+        return result.rowcount == 1
+
     async def refresh_token(self, refresh_token: str):
         """
         Обновляет access_token с помощью refresh_token.
         """
         try:
-            payload = jwt.decode(refresh_token,settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            payload = decode_token(refresh_token)
             email: str = payload.get('sub')
             if not email:
                 raise ValueError('No email')
@@ -111,27 +167,101 @@ class UserService:
         )
         if user is None:
             raise ValueError('No such user')
-        access_token = create_access_token(data={"sub": user.email, "role": user.role.name, "id": user.id})
+        if settings.AUTH_STATELESS and user.token_version != payload.get('ver', 0):
+            raise ValueError('Token has been revoked')
+        access_token = create_access_token(data=token_claims(user))
         return {"access_token": access_token, "token_type": "bearer"}
 
-    async def get_user(self, user_id: int, current_user) -> UserModel:
+    @staticmethod
+    def _profile_options(fieldset: Optional[FieldSet]) -> list:
+        """
+        Загрузчики пользователя для профиля: по fieldset или счётчики (LEFT JOIN)
+        и число проектов. Списки задач и проектов догружает _finish_profile.
+        """
+        if fieldset is not None:
+            return fieldset.load_options()
+        return [joinedload(UserModel.task_counter), undefer(UserModel.owned_projects_count)]
+
+    async def _finish_profile(self, user: UserModel, fieldset: Optional[FieldSet],
+                              summary_size: int) -> UserModel:
+        """
+        Сводка профиля: счётчики, summary_size последних и срочных задач и последних проектов.
+        Число запросов и размер ответа не зависят от истории пользователя.
+        """
+        def included(name: str) -> bool:
+            return fieldset is None or name in fieldset.include
+
+        if included('task_counts'):
+            self._set_task_counts(user)
+        await self._load_task_summary(user, summary_size,
+                                      recent=included('recent_tasks'), urgent=included('urgent_tasks'))
+        if included('owned_projects'):
+            projects = await self.db.scalars(
+                select(Project)
+                .options(load_only(Project.id, Project.title))
+                .where(Project.owner_id == user.id)
+                .order_by(Project.created_at.desc(), Project.id.desc())
+                .limit(summary_size))
+            set_committed_value(user, 'owned_projects', list(projects))
+        return user
+
+    async def _load_task_summary(self, user: UserModel, limit: int, recent: bool, urgent: bool) -> None:
+        """
+        recent_tasks и urgent_tasks одним запросом: UNION ALL первых limit id каждого
+        порядка (по ix_tasks_assigned_created) с номером строки, JOIN с задачами и
+        сортировка по (список, номер) - порядок задаёт только SQL.
+        """
+        assigned = TaskModel.assigned_to_id == user.id
+        conditions = {'recent_tasks': (assigned,),
+                      'urgent_tasks': (assigned, TaskModel.status != TaskStatus.done)}
+        names = [name for name, wanted in (('recent_tasks', recent), ('urgent_tasks', urgent)) if wanted]
+        if not names:
+            return
+        # Каждая часть - подзапрос: SQLite не допускает LIMIT в частях составного SELECT
+        parts = [select(
+                     select(TaskModel.id.label('task_id'),
+                            literal(name).label('list'),
+                            func.row_number().over(order_by=_SUMMARY_ORDERS[name]).label('position'))
+                     .where(*conditions[name])
+                     .order_by(*_SUMMARY_ORDERS[name])
+                     .limit(limit)
+                     .subquery())
+                 for name in names]
+        ranked = (union_all(*parts) if len(parts) > 1 else parts[0]).subquery()
+        rows = await self.db.execute(
+            select(TaskModel, ranked.c.list)
+            .join(ranked, ranked.c.task_id == TaskModel.id)
+            .options(joinedload(TaskModel.project), joinedload(TaskModel.author))
+            .order_by(ranked.c.list, ranked.c.position))
+        summary = {name: [] for name in names}
+        for task, name in rows:
+            summary[name].append(task)
+        for name, tasks in summary.items():
+            setattr(user, name, tasks)
+
+    async def get_user(self, user_id: int, current_user,
+                       fieldset: Optional[FieldSet] = None,
+                       summary_size: int = settings.PROFILE_SUMMARY_SIZE) -> UserModel:
         result = await self.db.scalar(
             select(UserModel)
-            .options(selectinload(UserModel.assigned_tasks)
-                     .selectinload(TaskModel.project),
-                     selectinload(UserModel.assigned_tasks)
-                     .selectinload(TaskModel.author),
-                     selectinload(UserModel.owned_projects))
+            .options(*self._profile_options(fieldset))
             .where(UserModel.id == user_id)
         )
         if not result:
             raise ValueError('User not found')
-        assigned_tasks_list = result.assigned_tasks
-        _ = result.owned_projects
+        return await self._finish_profile(result, fieldset, summary_size)
 
-        task_count = len(assigned_tasks_list) if assigned_tasks_list is not None else 0
-        setattr(result, 'tasks_count', task_count)
-        return result
+    @staticmethod
+    def _set_task_counts(user: UserModel) -> None:
+        """
+        tasks_count и task_counts из денормализованного счётчика (LEFT JOIN в запросе
+        пользователя) вместо len() по загруженным задачам.
+        """
+        counter = user.task_counter
+        counts = {column: getattr(counter, column) if counter is not None else 0
+                  for column in USER_COUNT_COLUMNS}
+        setattr(user, 'task_counts', counts)
+        setattr(user, 'tasks_count', sum(counts.values()))
 
     async def update_user(self, user_id: int,
                           user: UserUpdate,
@@ -160,59 +290,98 @@ class UserService:
                 update_data.update(admin_update_data)
 
         if not update_data:
-            return result
+            return await self.get_user(user_id, current_user)
+
+        if 'role' in update_data and update_data['role'] != result.role:
+            # Отзываем выданные токены: старые claims больше не актуальны
+            update_data['token_version'] = UserModel.token_version + 1
+
         updated_user = update(UserModel).where(UserModel.id == user_id).values(**update_data)
         await self.db.execute(updated_user)
         await self.db.commit()
-        stmt = (
-            select(UserModel)
-            .where(UserModel.id == user_id)
-            .options(
-                selectinload(UserModel.assigned_tasks).selectinload(TaskModel.project),
-                selectinload(UserModel.assigned_tasks).selectinload(TaskModel.author),
-                selectinload(UserModel.owned_projects)
-            )
-        )
-        final_user_result = await self.db.scalar(stmt)
-        if not final_user_result:
-            raise ValueError('User not found after update')
-
-        return final_user_result
-
-    async def get_users(self):
-        result = (await self.db.scalars(
-            select(UserModel)
-            .where(UserModel.is_active == True)
-            .order_by(UserModel.first_name))).all()
-        if not result:
+        invalidate_principal(result)
+        user_lookup_index.invalidate()
+        return await self.get_user(user_id, current_user)
+
+    def _users_query(self, filters: Optional[UserFilter]) -> Select:
+        stmt = select(UserModel).where(UserModel.is_active == True)
+        if filters is not None and filters.role is not None:
+            stmt = stmt.where(UserModel.role == filters.role)
+        if filters is not None and filters.position:
+            stmt = stmt.where(UserModel.position == filters.position)
+        return stmt
+
+    async def get_users(self, filters: Optional[UserFilter] = None,
+                        limit: int = settings.PAGE_SIZE_DEFAULT,
+                        cursor: Optional[str] = None,
+                        fieldset: Optional[FieldSet] = None)->tuple[list[UserModel], Optional[str]]:
+        """
+        Страница активных сотрудников по алфавиту (first_name, id) и курсор следующей страницы.
+        """
+        stmt = self._users_query(filters)
+        if fieldset is not None:
+            stmt = stmt.options(*fieldset.load_options())
+        stmt = keyset_page(stmt, UserModel.first_name, UserModel.id, limit, cursor, descending=False)
+        result = (await self.db.scalars(stmt)).all()
+        if not result and cursor is None:
             raise ValueError('Users not found')
-        return result
+        return split_page(result, limit, sort_attr='first_name')
+
+    async def count_users(self, filters: Optional[UserFilter] = None) -> tuple[int, bool]:
+        """Число активных сотрудников с теми же фильтрами и признак оценки."""
+        return await count_rows(self.db, self._users_query(filters), settings.COUNT_EXACT_LIMIT)
 
-    async def get_my_profile(self, current_user: UserModel):
+    async def lookup_users(self, q: str, current_user: UserModel,
+                           project_id: Optional[int] = None,
+                           limit: int = settings.USER_LOOKUP_LIMIT_DEFAULT) -> list[UserModel | LookupRecord]:
+        """
+        Автодополнение исполнителя: активные пользователи, у которых каждое слово запроса
+        входит в email, имя или фамилию (подстрокой или нечётко, по триграммам).
+        Выше - совпадения с начала поля, затем по похожести. project_id ограничивает
+        выдачу владельцем и участниками проекта (нужен доступ к проекту).
+        На PostgreSQL - GIN-индексы pg_trgm, на других СУБД - индекс в памяти процесса.
+        """
+        terms = [term.lower() for term in _LOOKUP_TERM.findall(q)]
+        if not terms:
+            raise ValueError('Запрос должен содержать хотя бы одно слово.')
+
+        scope_owner_id = None
+        if project_id is not None:
+            decision = await ProjectAccessService(self.db).check(project_id, current_user, ProjectAction.view)
+            scope_owner_id = decision.ensure('У вас нет доступа к этому проекту.').owner_id
+        member_ids = select(ProjectMember.user_id).where(ProjectMember.project_id == project_id)
+
+        if self.db.get_bind().dialect.name != 'postgresql':
+            scope = None
+            if project_id is not None:
+                scope = set((await self.db.scalars(member_ids)).all()) | {scope_owner_id}
+            return await user_lookup_index.lookup(self.db, terms, limit, scope)
+
+        fields = (UserModel.email, UserModel.first_name, UserModel.last_name)
+        # Подстрока (ILIKE '%term%') и similarity-оператор % используют GIN-индексы gin_trgm_ops
+        matches = [or_(*(field.icontains(term, autoescape=True) for field in fields),
+                       *(field.op('%')(term) for field in fields))
+                   for term in terms]
+        score = sum(
+            func.greatest(*(func.similarity(field, term) for field in fields))
+            + case((or_(*(field.istartswith(term, autoescape=True) for field in fields)), 1.0), else_=0.0)
+            for term in terms)
+        stmt = (select(UserModel)
+                .where(UserModel.is_active == True, and_(*matches))
+                .order_by(score.desc(), UserModel.first_name, UserModel.id)
+                .limit(limit))
+        if project_id is not None:
+            stmt = stmt.where(or_(UserModel.id == scope_owner_id, UserModel.id.in_(member_ids)))
+        return list((await self.db.scalars(stmt)).all())
+
+    async def get_my_profile(self, current_user: UserModel,
+                             fieldset: Optional[FieldSet] = None,
+                             summary_size: int = settings.PROFILE_SUMMARY_SIZE):
         result = await self.db.scalar(
             select(UserModel)
             .where(UserModel.email == current_user.email)
-            .options(
-                selectinload(UserModel.assigned_tasks).selectinload(TaskModel.project),
-                selectinload(UserModel.assigned_tasks).selectinload(TaskModel.author),
-                selectinload(UserModel.owned_projects)
-            )
+            .options(*self._profile_options(fieldset))
         )
         if not result:
             raise ValueError('User not found')
-
-        assigned_tasks_list = result.assigned_tasks
-        _ = result.owned_projects
-
-        task_count = len(assigned_tasks_list) if assigned_tasks_list is not None else 0
-        setattr(result, 'tasks_count', task_count)
-
-        return result
-
-
-
-
-
-
-
-
+        return await self._finish_profile(result, fieldset, summary_size)
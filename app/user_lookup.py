@@ -0,0 +1,162 @@
+import heapq
+import math
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.users import User as UserModel
+
+# Порог похожести для нечёткого совпадения, как pg_trgm.similarity_threshold по умолчанию
+TRIGRAM_SIMILARITY_THRESHOLD = 0.3
+
+_WORD = re.compile(r'\w+')
+
+
+def trigrams(text: str) -> frozenset[str]:
+    """
+    Триграммы строки по правилам pg_trgm: нижний регистр, каждое слово дополняется
+    двумя пробелами в начале и одним в конце.
+    """
+    result = set()
+    for word in _WORD.findall(text.lower()):
+        padded = f'  {word} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(result)
+
+
+def similarity(left: frozenset[str], right: frozenset[str]) -> float:
+    """similarity() из pg_trgm: доля общих триграмм."""
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+@dataclass(frozen=True, slots=True)
+class LookupRecord:
+    """Поля пользователя для автодополнения (совместимы с UserReadSchema)."""
+    id: int
+    email: str
+    first_name: str
+    last_name: str
+
+    @property
+    def fields(self) -> tuple[str, str, str]:
+        return self.email, self.first_name, self.last_name
+
+
+@dataclass(frozen=True, slots=True)
+class _Entry:
+    record: LookupRecord
+    lowered: tuple[str, ...]
+    field_trigrams: tuple[frozenset[str], ...]
+
+
+class UserLookupIndex:
+    """
+    Триграммный индекс активных пользователей в памяти процесса - замена GIN-индексам
+    pg_trgm на СУБД без них (SQLite в тестах и бенчмарках). Строится одним запросом
+    при первом поиске и сбрасывается при изменении пользователей (UserService).
+    Совпадения и ранжирование повторяют запрос для PostgreSQL.
+    """
+
+    def __init__(self):
+        self._entries: Optional[dict[int, _Entry]] = None
+        self._postings: dict[str, set[int]] = {}
+        # Биграммы слов - для термов из двух символов, у которых нет полной внутренней триграммы
+        self._bigrams: dict[str, set[int]] = {}
+
+    async def _ensure_built(self, db: AsyncSession) -> dict[int, _Entry]:
+        if self._entries is None:
+            rows = (await db.execute(
+                select(UserModel.id, UserModel.email, UserModel.first_name, UserModel.last_name)
+                .where(UserModel.is_active == True))).all()
+            entries = {}
+            postings: defaultdict[str, set[int]] = defaultdict(set)
+            bigrams: defaultdict[str, set[int]] = defaultdict(set)
+            for row in rows:
+                record = LookupRecord(row.id, row.email, row.first_name, row.last_name)
+                lowered = tuple(field.lower() for field in record.fields)
+                field_trigrams = tuple(trigrams(field) for field in lowered)
+                entries[record.id] = _Entry(record, lowered, field_trigrams)
+                for gram in frozenset().union(*field_trigrams):
+                    postings[gram].add(record.id)
+                for word in _WORD.findall(' '.join(lowered)):
+                    for i in range(len(word) - 1):
+                        bigrams[word[i:i + 2]].add(record.id)
+            self._postings = dict(postings)
+            self._bigrams = dict(bigrams)
+            self._entries = entries
+        return self._entries
+
+    def _candidates(self, term: str, term_trigrams: frozenset[str]) -> Iterable[int]:
+        """
+        Надмножество записей, где терм может совпасть. Похожесть >= порога требует
+        не меньше ceil(порог * |T|) общих триграмм, вхождение подстрокой - всех внутренних
+        триграмм терма; запись с k совпадениями из n списков обязана попасть хотя бы
+        в один из n - k + 1 самых коротких, остальные списки только проверяются.
+        """
+        if len(term) < 2:
+            return self._entries.keys()
+        if len(term) == 2:
+            minimum = 1
+        else:
+            inner = len(term) - 2
+            minimum = min(math.ceil(TRIGRAM_SIMILARITY_THRESHOLD * len(term_trigrams)), inner)
+        lists = sorted((self._postings.get(gram, set()) for gram in term_trigrams), key=len)
+        probe = len(lists) - minimum + 1
+        seeds = set().union(*lists[:probe])
+        if minimum > 1:
+            seeds = {user_id for user_id in seeds
+                     if sum(user_id in postings for postings in lists) >= minimum}
+        if len(term) == 2:
+            seeds |= self._bigrams.get(term, set())
+        return seeds
+
+    @staticmethod
+    def _term_score(entry: _Entry, term: str, term_trigrams: frozenset[str]) -> Optional[float]:
+        """Вклад терма в ранг или None, если терм не совпал ни с одним полем."""
+        best = max(similarity(grams, term_trigrams) for grams in entry.field_trigrams)
+        if best < TRIGRAM_SIMILARITY_THRESHOLD and not any(term in field for field in entry.lowered):
+            return None
+        prefix = 1.0 if any(field.startswith(term) for field in entry.lowered) else 0.0
+        return best + prefix
+
+    async def lookup(self, db: AsyncSession, terms: list[str], limit: int,
+                     scope: Optional[set[int]] = None) -> list[LookupRecord]:
+        """Top-k пользователей, совпавших со всеми термами; scope - допустимые ID."""
+        entries = await self._ensure_built(db)
+        terms = [term.lower() for term in terms]
+        term_trigrams = [trigrams(term) for term in terms]
+        candidates = set(scope) if scope is not None else None
+        for term, grams in sorted(zip(terms, term_trigrams), key=lambda item: -len(item[0])):
+            found = self._candidates(term, grams)
+            candidates = set(found) if candidates is None else candidates.intersection(found)
+        scored = []
+        for user_id in candidates:
+            entry = entries.get(user_id)
+            if entry is None:
+                continue
+            score = 0.0
+            for term, grams in zip(terms, term_trigrams):
+                term_score = self._term_score(entry, term, grams)
+                if term_score is None:
+                    break
+                score += term_score
+            else:
+                scored.append((-score, entry.record.first_name, entry.record.id, entry.record))
+        return [item[3] for item in heapq.nsmallest(limit, scored, key=lambda item: item[:3])]
+
+    def invalidate(self) -> None:
+        self._entries = None
+
+    def clear(self) -> None:
+        self.invalidate()
+        self._postings = {}
+        self._bigrams = {}
+
+
+user_lookup_index = UserLookupIndex()
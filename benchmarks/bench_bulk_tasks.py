@@ -0,0 +1,67 @@
+"""
+Создание пачки задач: по одной через POST /projects/{id}/tasks против
+одного POST /projects/{id}/tasks:bulk. Печатает время и число SQL-запросов
+(сумма X-DB-Queries):
+    python -m benchmarks.bench_bulk_tasks --tasks 200
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import auth_header, client, create_users, setup_app
+from app.models import Project
+from app.models.users import UserRole
+
+
+def _task_payload(number: int, assignee_email: str) -> dict:
+    return {
+        'title': f'Импорт {number}',
+        'description': 'Задача из пакетного импорта',
+        'priority': 'medium',
+        'assigned_to_email': assignee_email,
+    }
+
+
+async def run(mode: str, count: int) -> dict:
+    engine, session_maker = await setup_app()
+    owner, = await create_users(session_maker, 1, role=UserRole.owner, prefix=f'{mode}-owner')
+    async with session_maker() as session:
+        project = Project(title='Импорт', owner_id=owner.id)
+        project.members.append(await session.get(type(owner), owner.id))
+        session.add(project)
+        await session.commit()
+        project_id = project.id
+
+    headers = auth_header(owner)
+    payload = [_task_payload(number, owner.email) for number in range(count)]
+    queries = 0
+    try:
+        async with client() as http:
+            started = time.perf_counter()
+            if mode == 'single':
+                for item in payload:
+                    response = await http.post(f'/projects/{project_id}/tasks', headers=headers, json=item)
+                    assert response.status_code == 201, response.text
+                    queries += int(response.headers['X-DB-Queries'])
+            else:
+                response = await http.post(f'/projects/{project_id}/tasks:bulk', headers=headers, json=payload)
+                assert response.status_code == 200 and response.json()['created'] == count, response.text
+                queries += int(response.headers['X-DB-Queries'])
+            elapsed = time.perf_counter() - started
+    finally:
+        await engine.dispose()
+    return {'tasks': count, 'total_ms': round(elapsed * 1000, 1),
+            'per_task_ms': round(elapsed * 1000 / count, 3), 'sql_queries': queries}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=200, help='задач в пачке')
+    args = parser.parse_args()
+    for mode in ('single', 'bulk'):
+        result = asyncio.run(run(mode, args.tasks))
+        print(f'{mode:>6}: {result}')
+
+
+if __name__ == '__main__':
+    main()
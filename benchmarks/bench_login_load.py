@@ -0,0 +1,65 @@
+"""
+p99 задержки посторонних GET-запросов под нагрузкой логинов.
+
+Сравнивает хеширование argon2 прямо в event loop ("inline") и в
+password_pool ("pool"):
+    python -m benchmarks.bench_login_load --logins 8 --duration 5
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import (BENCH_PASSWORD, auth_header, client, create_users,
+                               percentiles, setup_app)
+import app.auth as auth
+
+
+async def _login_worker(http, email: str, stop_at: float):
+    while time.perf_counter() < stop_at:
+        await http.post('/users/token', data={'username': email, 'password': BENCH_PASSWORD})
+
+
+async def _get_sampler(http, headers: dict, stop_at: float, samples: list[float]):
+    while time.perf_counter() < stop_at:
+        started = time.perf_counter()
+        response = await http.get('/projects/', headers=headers)
+        samples.append(time.perf_counter() - started)
+        assert response.status_code == 200
+        await asyncio.sleep(0.01)
+
+
+async def run(mode: str, logins: int, duration: float) -> dict:
+    engine, session_maker = await setup_app()
+    users = await create_users(session_maker, logins + 1)
+    reader, login_users = users[0], users[1:]
+
+    original = auth._run_password_job
+    if mode == 'inline':
+        async def _inline(func, *args):
+            return func(*args)
+        auth._run_password_job = _inline
+    try:
+        samples: list[float] = []
+        async with client() as http:
+            stop_at = time.perf_counter() + duration
+            await asyncio.gather(
+                _get_sampler(http, auth_header(reader), stop_at, samples),
+                *(_login_worker(http, user.email, stop_at) for user in login_users))
+    finally:
+        auth._run_password_job = original
+        await engine.dispose()
+    return percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--logins', type=int, default=8, help='одновременных клиентов логина')
+    parser.add_argument('--duration', type=float, default=5.0, help='секунд на каждый режим')
+    args = parser.parse_args()
+    for mode in ('inline', 'pool'):
+        result = asyncio.run(run(mode, args.logins, args.duration))
+        print(f'{mode:>6}: GET /projects/ {result}')
+
+
+if __name__ == '__main__':
+    main()
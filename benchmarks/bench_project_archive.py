@@ -0,0 +1,59 @@
+"""
+Архивация и разархивация большого проекта: время, пик памяти и число SQL-запросов
+переноса задач пачками между tasks и archived_tasks, размер горячей таблицы
+до и после и чтение архивной страницы задач:
+    python -m benchmarks.bench_project_archive --tasks 50000
+"""
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import func, select
+
+from benchmarks.bench_project_memory import measure
+from benchmarks.bench_project_stats import seed
+from benchmarks.common import auth_header, client, create_users, setup_app
+from app.models import ArchivedTask, Task
+from app.models.users import UserRole
+
+
+async def run(count: int) -> dict:
+    engine, session_maker = await setup_app()
+    owner, = await create_users(session_maker, 1, role=UserRole.owner, prefix='archive-owner')
+    members = await create_users(session_maker, 20, prefix='archive-member')
+    project_id = await seed(session_maker, owner, members, count)
+    # Соседний активный проект: его задачи остаются в tasks
+    await seed(session_maker, owner, members, count // 10)
+    headers = auth_header(owner)
+
+    async def sizes() -> dict:
+        async with session_maker() as session:
+            return {'tasks': await session.scalar(select(func.count()).select_from(Task)),
+                    'archived_tasks': await session.scalar(select(func.count()).select_from(ArchivedTask))}
+    try:
+        results = {'before': await sizes()}
+        async with client() as http:
+            await http.get(f'/projects/{project_id}/stats', headers=headers)
+            results['archive'] = await measure(http, 'POST', f'/projects/{project_id}/archive', headers=headers)
+            results['archived'] = await sizes()
+            results['read_archive'] = await measure(http, 'GET', f'/projects/{project_id}/tasks/',
+                                                    headers=headers, params={'archived': True})
+            results['unarchive'] = await measure(http, 'POST', f'/projects/{project_id}/unarchive',
+                                                 headers=headers)
+        results['after'] = await sizes()
+        return results
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=50_000, help='задач в архивируемом проекте')
+    args = parser.parse_args()
+    logging.disable(logging.ERROR)
+    for key, value in asyncio.run(run(args.tasks)).items():
+        print(f'{key:>14}: {value}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Память и время запросов к большому проекту: переименование, добавление и удаление
+участника и чтение карточки. Печатает пик выделенной памяти (tracemalloc), время
+и число SQL-запросов на каждый запрос:
+    python -m benchmarks.bench_project_memory --tasks 50000
+"""
+import argparse
+import asyncio
+import logging
+import time
+import tracemalloc
+
+from benchmarks.bench_project_stats import seed
+from benchmarks.common import auth_header, client, create_users, setup_app
+from app.models.users import UserRole
+
+
+async def measure(http, method: str, url: str, **kwargs) -> dict:
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = await http.request(method, url, **kwargs)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'status': response.status_code, 'peak_mib': round(peak / 2 ** 20, 2), 'ms': round(elapsed * 1000, 2),
+            'queries': response.headers.get('X-DB-Queries'), 'kib': round(len(response.content) / 1024, 1)}
+
+
+async def run(count: int) -> dict:
+    engine, session_maker = await setup_app()
+    owner, = await create_users(session_maker, 1, role=UserRole.owner, prefix='memory-owner')
+    members = await create_users(session_maker, 20, prefix='memory-member')
+    newcomer, = await create_users(session_maker, 1, prefix='memory-newcomer')
+    project_id = await seed(session_maker, owner, members, count)
+    headers = auth_header(owner)
+    try:
+        async with client() as http:
+            # Прогрев: пользователь из токена и индекс членства
+            await http.get(f'/projects/{project_id}/stats', headers=headers)
+            return {
+                'rename': await measure(http, 'PATCH', f'/projects/{project_id}', headers=headers,
+                                        json={'title': 'Переименованный проект'}),
+                'add_member': await measure(http, 'POST', f'/projects/{project_id}/members/{newcomer.email}',
+                                            headers=headers),
+                'remove_member': await measure(http, 'DELETE', f'/projects/{project_id}/members/{newcomer.id}',
+                                               headers=headers),
+                'read': await measure(http, 'GET', f'/projects/{project_id}', headers=headers),
+            }
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=50_000, help='задач в проекте')
+    args = parser.parse_args()
+    logging.disable(logging.ERROR)
+    for key, value in asyncio.run(run(args.tasks)).items():
+        print(f'{key:>14}: {value}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+GET /projects/{id}/stats на большом проекте: холодный запрос (GROUP BY по tasks)
+и повторные запросы из кэша. Печатает время и число SQL-запросов:
+    python -m benchmarks.bench_project_stats --tasks 100000
+"""
+import argparse
+import asyncio
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+
+from benchmarks.common import auth_header, client, create_users, percentiles, setup_app
+from app.models import Project, Task
+from app.models.tasks import TaskPriority, TaskStatus
+from app.models.users import UserRole
+from app.services.counter_service import TaskCounterService
+
+
+async def seed(session_maker, owner, members, count: int) -> int:
+    """Проект с count задачами, вставленными пачками в обход ORM."""
+    async with session_maker() as session:
+        project = Project(title='Большой проект', owner_id=owner.id)
+        session.add(project)
+        await session.flush()
+        statuses, priorities = list(TaskStatus), list(TaskPriority)
+        today = date.today()
+        for start in range(0, count, 5000):
+            await session.execute(insert(Task), [
+                {'project_id': project.id, 'title': f'Задача {n}', 'description': 'Описание задачи',
+                 'status': statuses[n % 4], 'priority': priorities[n % 3],
+                 'author_id': owner.id, 'assigned_to_id': members[n % len(members)].id if n % 7 else None,
+                 'due_date': today + timedelta(days=n % 30 - 15)}
+                for n in range(start, min(start + 5000, count))])
+        await TaskCounterService(session).rebuild()
+        await session.commit()
+        return project.id
+
+
+async def run(count: int, repeats: int) -> dict:
+    engine, session_maker = await setup_app()
+    owner, = await create_users(session_maker, 1, role=UserRole.owner, prefix='stats-owner')
+    members = await create_users(session_maker, 20, prefix='stats-member')
+    project_id = await seed(session_maker, owner, members, count)
+    headers = auth_header(owner)
+    result = {}
+    try:
+        async with client() as http:
+            started = time.perf_counter()
+            response = await http.get(f'/projects/{project_id}/stats', headers=headers)
+            assert response.status_code == 200, response.text
+            result['stats_cold_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            result['stats_cold_queries'] = int(response.headers['X-DB-Queries'])
+
+            samples = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                response = await http.get(f'/projects/{project_id}/stats', headers=headers)
+                samples.append(time.perf_counter() - started)
+            result['stats_cached'] = percentiles(samples)
+    finally:
+        await engine.dispose()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=100_000, help='задач в проекте')
+    parser.add_argument('--repeats', type=int, default=200, help='повторных запросов из кэша')
+    args = parser.parse_args()
+    print(asyncio.run(run(args.tasks, args.repeats)))
+
+
+if __name__ == '__main__':
+    main()
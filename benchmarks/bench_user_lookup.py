@@ -0,0 +1,65 @@
+"""
+GET /users/lookup на большом справочнике: задержка автодополнения по префиксу,
+подстроке и с опечаткой. На SQLite работает индекс в памяти процесса
+(app/user_lookup.py), первый запрос строит его:
+    python -m benchmarks.bench_user_lookup --users 20000
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from sqlalchemy import insert
+
+from benchmarks.common import auth_header, client, create_users, percentiles, setup_app
+from app.models.users import User as UserModel, UserRole
+
+FIRST_NAMES = ['Иван', 'Пётр', 'Анна', 'Мария', 'Олег', 'Ольга', 'Сергей', 'Елена', 'Дмитрий', 'Наталья']
+LAST_NAMES = ['Иванов', 'Петров', 'Смирнов', 'Кузнецов', 'Попов', 'Соколов', 'Лебедев', 'Козлов']
+QUERIES = ['ivan', 'петро', 'мария соколов', 'lebed', 'Кузнецв', 'user1234']
+
+
+async def run(count: int, repeats: int) -> dict:
+    engine, session_maker = await setup_app()
+    caller, = await create_users(session_maker, 1, role=UserRole.owner, prefix='lookup-caller')
+    rng = random.Random(1)
+    async with session_maker() as session:
+        for start in range(0, count, 5000):
+            await session.execute(insert(UserModel), [
+                {'email': f'user{n}.{rng.choice(["ivan", "petr", "lebed", "kuz"])}@bench.com',
+                 'first_name': rng.choice(FIRST_NAMES), 'last_name': rng.choice(LAST_NAMES),
+                 'hashed_password': '-', 'role': UserRole.member}
+                for n in range(start, min(start + 5000, count))])
+        await session.commit()
+
+    headers = auth_header(caller)
+    result = {}
+    try:
+        async with client() as http:
+            started = time.perf_counter()
+            response = await http.get('/users/lookup', headers=headers, params={'q': QUERIES[0]})
+            assert response.status_code == 200, response.text
+            result['first_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            for q in QUERIES:
+                samples = []
+                for _ in range(repeats):
+                    started = time.perf_counter()
+                    response = await http.get('/users/lookup', headers=headers, params={'q': q})
+                    samples.append(time.perf_counter() - started)
+                result[q] = {**percentiles(samples), 'hits': len(response.json())}
+    finally:
+        await engine.dispose()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=20_000, help='пользователей в справочнике')
+    parser.add_argument('--repeats', type=int, default=50, help='повторов каждого запроса')
+    args = parser.parse_args()
+    for key, value in asyncio.run(run(args.users, args.repeats)).items():
+        print(f'{key:>15}: {value}')
+
+
+if __name__ == '__main__':
+    main()
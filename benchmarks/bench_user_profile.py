@@ -0,0 +1,57 @@
+"""
+Сводка профиля у пользователей с разной историей: GET /users/me и GET /users/{id}
+при 100 ... 50 000 назначенных задач. Размер ответа и число запросов постоянны,
+память и время растут только с ценой подзапросов по индексам:
+    python -m benchmarks.bench_user_profile --history 100 1000 10000 50000
+"""
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import insert
+
+from benchmarks.bench_project_memory import measure
+from benchmarks.bench_project_stats import seed
+from benchmarks.common import auth_header, client, create_users, setup_app
+from app.models import Project
+from app.models.users import UserRole
+
+
+async def run(history: list[int]) -> dict:
+    engine, session_maker = await setup_app()
+    viewer, = await create_users(session_maker, 1, role=UserRole.admin, prefix='profile-viewer')
+    users = await create_users(session_maker, len(history), role=UserRole.owner, prefix='profile-user')
+    for user, count in zip(users, history):
+        # Задачи проекта пользователя назначены ему же; плюс по проекту на каждые 50 задач
+        await seed(session_maker, user, [user], count)
+        async with session_maker() as session:
+            await session.execute(insert(Project), [{'title': f'Проект {n}', 'owner_id': user.id}
+                                                    for n in range(count // 50)])
+            await session.commit()
+    try:
+        results = {}
+        async with client() as http:
+            for user, count in zip(users, history):
+                headers = auth_header(user)
+                # Прогрев: пользователь из токена
+                await http.get('/users/me', headers=headers, params={'fields': 'id', 'include': ''})
+                results[f'me/{count}'] = await measure(http, 'GET', '/users/me', headers=headers)
+                results[f'user/{count}'] = await measure(http, 'GET', f'/users/{user.id}',
+                                                         headers=auth_header(viewer))
+        return results
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--history', type=int, nargs='+', default=[100, 1000, 10_000, 50_000],
+                        help='назначенных задач у пользователей')
+    args = parser.parse_args()
+    logging.disable(logging.ERROR)
+    for key, value in asyncio.run(run(args.history)).items():
+        print(f'{key:>12}: {value}')
+
+
+if __name__ == '__main__':
+    main()
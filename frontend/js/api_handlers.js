@@ -42,8 +42,9 @@ async function handleEditProject(event) {
             projectEditFormCard.classList.add('hidden');
             projectViewCard.classList.remove('hidden');
 
-            // Обновить данные на странице
-            renderProjectDetails(updatedProject);
+            // PATCH отдаёт только заголовок проекта (без задач и участников):
+            // накладываем его на уже загруженный проект
+            renderProjectDetails({ ...currentProjectData, ...updatedProject });
 
         } else {
             const errorData = await response.json();
@@ -137,8 +138,9 @@ async function handleAddMember(e) {
             throw new Error(errorDetail);
         }
 
+        // Ответ - заголовок проекта с участниками, без задач: задачи берём из загруженного проекта
         const project = await response.json();
-        renderProjectDetails(project); // Обновляем данные проекта и рендерим все заново
+        renderProjectDetails({ ...currentProjectData, ...project });
 
         setStatus(`Участник с email "${email}" успешно добавлен.`, false);
         emailInput.value = '';
@@ -11,6 +11,9 @@ const appSection = document.getElementById('app-section');
 const currentTokenDisplay = document.getElementById('current-token');
 const logoutButton = document.getElementById('logout-button');
 const projectsListContainer = document.getElementById('projects-list');
+const loadMoreProjectsBtn = document.getElementById('load-more-projects-btn');
+// Курсор следующей страницы проектов из заголовка X-Next-Cursor
+let projectsCursor = null;
 
 // Элемент ссылки на профиль (id="link-my-profile" из index.html)
 const profileLink = document.getElementById('link-my-profile'); // <<< ДОБАВЛЕНО
@@ -87,10 +90,13 @@ function navigateToProjectDetail(projectId) {
 
 
 // --- ФУНКЦИЯ ОТОБРАЖЕНИЯ ПРОЕКТОВ ---
-function renderProjects(projects) {
-    projectsListContainer.innerHTML = ''; // Очистка
+// append = true дописывает следующую страницу к уже показанным проектам
+function renderProjects(projects, append = false) {
+    if (!append) {
+        projectsListContainer.innerHTML = ''; // Очистка
+    }
 
-    if (projects.length === 0) {
+    if (projects.length === 0 && !append) {
         projectsListContainer.innerHTML = '<p class="text-gray-500 text-center p-4 border-2 border-dashed border-gray-200 rounded-lg">У вас пока нет проектов. Создайте первый!</p>';
         return;
     }
@@ -131,11 +137,17 @@ function renderProjects(projects) {
 }
 
 // --- ФУНКЦИЯ ЗАГРУЗКИ ПРОЕКТОВ ---
-async function fetchProjects() {
-    projectsListContainer.innerHTML = '<p class="text-gray-400 text-center p-4">Загрузка проектов...</p>';
+// Первая страница заменяет список, "Показать ещё" дописывает следующую по X-Next-Cursor
+async function fetchProjects(append = false) {
+    if (!append) {
+        projectsCursor = null;
+        projectsListContainer.innerHTML = '<p class="text-gray-400 text-center p-4">Загрузка проектов...</p>';
+    }
+    const params = new URLSearchParams();
+    if (projectsCursor) params.set('cursor', projectsCursor);
 
     try {
-        const response = await fetch(`${API_BASE_URL}/projects/`, {
+        const response = await fetch(`${API_BASE_URL}/projects/?${params}`, {
             method: 'GET',
             headers: {
                 'Authorization': `Bearer ${ACCESS_TOKEN}`,
@@ -155,11 +167,17 @@ async function fetchProjects() {
         }
 
         const projects = await response.json();
-        renderProjects(projects);
+        renderProjects(projects, append);
+        projectsCursor = response.headers.get('X-Next-Cursor');
+        if (loadMoreProjectsBtn) {
+            loadMoreProjectsBtn.classList.toggle('hidden', !projectsCursor);
+        }
         setStatus('Проекты успешно загружены.', false);
 
     } catch (error) {
-        projectsListContainer.innerHTML = `<p class="text-red-500 text-center p-4">Ошибка загрузки: ${error.message}</p>`;
+        if (!append) {
+            projectsListContainer.innerHTML = `<p class="text-red-500 text-center p-4">Ошибка загрузки: ${error.message}</p>`;
+        }
         setStatus('Ошибка при загрузке проектов: ' + error.message, true);
     }
 }
@@ -404,6 +422,11 @@ if (logoutButton) {
     logoutButton.addEventListener('click', handleLogout);
 }
 
+// Следующая страница проектов
+if (loadMoreProjectsBtn) {
+    loadMoreProjectsBtn.addEventListener('click', () => fetchProjects(true));
+}
+
 // Обработчики для модального окна создания проекта
 if (createProjectBtn) {
     createProjectBtn.addEventListener('click', showModal);
@@ -34,6 +34,10 @@ const taskPrioritySelect = document.getElementById('task-priority');
 const taskAssignedToSelect = document.getElementById('task-assigned-to-email');
 const projectTasksList = document.getElementById('project-tasks-list');
 const tasksPlaceholder = document.getElementById('tasks-placeholder');
+const loadMoreProjectTasksBtn = document.getElementById('load-more-project-tasks-btn');
+// Курсор следующей страницы задач: сначала tasks_next_cursor проекта, затем next_cursor списка
+let projectTasksCursor = null;
+const PROJECT_TASKS_PAGE_SIZE = 50;
 
 
 // Остальные элементы UI
@@ -125,11 +129,41 @@ function renderProjectDetails(project) {
     // --- ВЫЗОВ РЕНДЕРИНГА СВЯЗАННЫХ СУЩНОСТЕЙ (из rendering.js) ---
     renderMembers(currentProjectMembers, project.owner);
     populateAssignedToSelect(currentProjectMembers, project.owner);
-    renderTasks(project.tasks);
+    renderTasks(project.tasks, countProjectTasks(project.task_counters));
+    projectTasksCursor = project.tasks_next_cursor || null;
+    loadMoreProjectTasksBtn.classList.toggle('hidden', !projectTasksCursor);
 
     // Установка финального статуса
     setStatus(`Проект "${title}" успешно загружен.`, false);
 }
+// --- СЛЕДУЮЩАЯ СТРАНИЦА ЗАДАЧ ПРОЕКТА ---
+// GET /projects/{id}/tasks/?cursor=... дописывает задачи, пока next_cursor не станет null
+async function loadMoreProjectTasks() {
+    if (!projectTasksCursor) return;
+    const params = new URLSearchParams({ limit: PROJECT_TASKS_PAGE_SIZE, cursor: projectTasksCursor });
+
+    try {
+        const response = await fetch(`${API_BASE_URL}/projects/${currentProjectId}/tasks/?${params}`, {
+            headers: { 'Authorization': `Bearer ${ACCESS_TOKEN}` },
+        });
+        if (response.status === 401) {
+            setStatus('Сессия истекла. Перенаправление на страницу входа.', true);
+            setTimeout(() => window.location.href = 'index.html', 2000);
+            return;
+        }
+        if (!response.ok) {
+            const errorData = await response.json().catch(() => ({ detail: 'Неизвестная ошибка сервера.' }));
+            throw new Error(errorData.detail || 'Не удалось загрузить задачи проекта.');
+        }
+        const page = await response.json();
+        renderTasks(page.items, undefined, true);
+        projectTasksCursor = page.next_cursor;
+        loadMoreProjectTasksBtn.classList.toggle('hidden', !projectTasksCursor);
+    } catch (error) {
+        setStatus('Ошибка загрузки задач: ' + error.message, true);
+    }
+}
+
 // --- ФУНКЦИЯ ЗАГРУЗКИ КОНКРЕТНОГО ПРОЕКТА ---
 async function fetchProjectDetail() {
     if (!ACCESS_TOKEN) {
@@ -184,6 +218,9 @@ document.addEventListener('DOMContentLoaded', () => {
     // Запуск загрузки данных при загрузке страницы
     fetchProjectDetail();
 
+    // Следующая страница задач
+    loadMoreProjectTasksBtn.addEventListener('click', loadMoreProjectTasks);
+
     // Навигация
     backToListBtn.addEventListener('click', () => {
         window.location.href = 'index.html';
@@ -182,17 +182,27 @@ function renderMembers(members, owner) {
     });
 }
 // --- ФУНКЦИЯ РЕНДЕРИНГА ЗАДАЧ (ОБНОВЛЕННАЯ С КЛИКАБЕЛЬНОЙ ССЫЛКОЙ) ---
-function renderTasks(tasks) {
-    projectTasksList.innerHTML = '';
-    taskCountSpan.textContent = tasks ? tasks.length : 0;
+// Всего задач проекта - по счётчикам task_counters: в project.tasks только первая страница
+function countProjectTasks(taskCounters) {
+    return (taskCounters || []).reduce((total, counter) => total + counter.count, 0);
+}
+
+// append = true дописывает следующую страницу задач к уже показанным
+function renderTasks(tasks, totalCount, append = false) {
+    if (!append) {
+        projectTasksList.innerHTML = '';
+    }
+    if (totalCount !== undefined) {
+        taskCountSpan.textContent = totalCount;
+    }
 
-    if (!tasks || tasks.length === 0) {
+    if (!append && (!tasks || tasks.length === 0)) {
         tasksPlaceholder.classList.remove('hidden');
         return;
     }
     tasksPlaceholder.classList.add('hidden');
 
-    tasks.forEach(task => {
+    (tasks || []).forEach(task => {
         // Создаем контейнер для задачи
         const taskDiv = document.createElement('div');
         taskDiv.className = 'p-3 bg-white border border-gray-200 rounded-lg shadow-sm hover:shadow-md transition-shadow';
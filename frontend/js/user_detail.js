@@ -10,6 +10,11 @@ let currentUserData = null;
 let authUserData = null;
 let ACCESS_TOKEN = localStorage.getItem('access_token');
 
+// Постраничная загрузка назначенных задач: профиль отдаёт только сводку (recent_tasks)
+const TASKS_PAGE_SIZE = 50;
+let assignedTasksCursor = null;
+let assignedTasksPaged = false;
+
 
 // --- УТИЛИТЫ ---
 
@@ -84,9 +89,23 @@ function renderUserRelations(user) {
         ownedProjectsList.innerHTML = '<li class="text-sm text-gray-500">Нет проектов в управлении.</li>';
     }
 
-    // 2. Рендеринг Задач (Устойчивая обработка отсутствия поля)
+    const ownedProjectsCountSpan = document.getElementById('owned-projects-count-span');
+    ownedProjectsCountSpan && (ownedProjectsCountSpan.textContent = user.owned_projects_count ?? projectsToRender.length);
+
+    // 2. Срочные задачи из сводки профиля
+    const urgentTasksList = document.getElementById('urgent-tasks-list');
+    if (urgentTasksList) {
+        urgentTasksList.innerHTML = '';
+        const urgentTasks = user.urgent_tasks || [];
+        urgentTasks.forEach(task => urgentTasksList.appendChild(renderTaskItem(task, true)));
+        if (urgentTasks.length === 0) {
+            urgentTasksList.innerHTML = '<li class="text-sm text-gray-500">Нет открытых задач.</li>';
+        }
+    }
+
+    // 3. Назначенные задачи: последние из сводки, остальные - по кнопке постранично
     assignedTasksList && (assignedTasksList.innerHTML = '');
-    const tasksToRender = user.assigned_tasks || user.tasks || [];
+    const tasksToRender = user.recent_tasks || [];
 
     // Устанавливаем счетчик задач
     const tasksCount = user.tasks_count !== undefined && user.tasks_count !== null
@@ -94,22 +113,75 @@ function renderUserRelations(user) {
                                  : tasksToRender.length;
     tasksCountSpan && (tasksCountSpan.textContent = tasksCount);
 
-
     if (tasksToRender.length > 0 && assignedTasksList) {
-        tasksToRender.forEach(task => {
-            const statusText = task.status || 'Статус не указан';
-
-            const li = document.createElement('li');
-            li.innerHTML = `
-                <a href="task_detail.html?id=${task.id}" class="text-gray-700 hover:text-gray-900 transition-colors text-sm block p-1 bg-gray-50 rounded">
-                    <span class="font-semibold">${task.title}</span> - ${statusText}
-                </a>
-            `;
-            assignedTasksList.appendChild(li);
-        });
+        tasksToRender.forEach(task => assignedTasksList.appendChild(renderTaskItem(task, false)));
     } else if (assignedTasksList) {
         assignedTasksList.innerHTML = '<li class="text-sm text-gray-500">Нет назначенных задач.</li>';
     }
+
+    assignedTasksCursor = null;
+    assignedTasksPaged = false;
+    const loadMoreBtn = document.getElementById('load-more-tasks-btn');
+    if (loadMoreBtn) {
+        loadMoreBtn.textContent = 'Показать все задачи';
+        loadMoreBtn.classList.toggle('hidden', tasksCount <= tasksToRender.length);
+    }
+}
+
+function renderTaskItem(task, withDueDate) {
+    const statusText = task.status || 'Статус не указан';
+    const dueText = withDueDate && task.due_date ? `, до ${task.due_date}` : '';
+
+    const li = document.createElement('li');
+    li.innerHTML = `
+        <a href="task_detail.html?id=${task.id}" class="text-gray-700 hover:text-gray-900 transition-colors text-sm block p-1 bg-gray-50 rounded">
+            <span class="font-semibold">${task.title}</span> - ${statusText}${dueText}
+        </a>
+    `;
+    return li;
+}
+
+/**
+ * Следующая страница назначенных задач: GET /tasks/my для своего профиля,
+ * GET /users/{id}/tasks для чужого. Первая страница заменяет сводку, следующие
+ * дописываются по next_cursor, пока он не станет null.
+ */
+async function loadMoreAssignedTasks() {
+    const assignedTasksList = document.getElementById('assigned-tasks-list');
+    const loadMoreBtn = document.getElementById('load-more-tasks-btn');
+    if (!currentUserData || !assignedTasksList) return;
+
+    const basePath = getUserIdFromUrl() ? `/users/${currentUserData.id}/tasks` : '/tasks/my';
+    const params = new URLSearchParams({ limit: TASKS_PAGE_SIZE });
+    if (assignedTasksCursor) params.set('cursor', assignedTasksCursor);
+
+    try {
+        const response = await fetch(`${API_BASE_URL}${basePath}?${params}`, {
+            headers: { 'Authorization': `Bearer ${ACCESS_TOKEN.trim()}` },
+        });
+        if (response.status === 401) {
+            handleLogout();
+            return;
+        }
+        if (!response.ok) {
+            throw new Error(`Ошибка сервера: ${response.status}`);
+        }
+        const page = await response.json();
+
+        if (!assignedTasksPaged) {
+            assignedTasksList.innerHTML = '';
+            assignedTasksPaged = true;
+        }
+        (page.items || []).forEach(task => assignedTasksList.appendChild(renderTaskItem(task, false)));
+
+        assignedTasksCursor = page.next_cursor;
+        if (loadMoreBtn) {
+            loadMoreBtn.textContent = 'Показать ещё';
+            loadMoreBtn.classList.toggle('hidden', !assignedTasksCursor);
+        }
+    } catch (error) {
+        setStatus('Ошибка загрузки задач: ' + error.message, true);
+    }
 }
 
 function renderUserDetails(user) {
@@ -385,6 +457,7 @@ document.addEventListener('DOMContentLoaded', () => {
     });
 
     document.getElementById('logout-button')?.addEventListener('click', handleLogout);
+    document.getElementById('load-more-tasks-btn')?.addEventListener('click', loadMoreAssignedTasks);
 
     // Закрытие модального окна
     document.getElementById('close-modal-btn')?.addEventListener('click', () => {
@@ -12,6 +12,9 @@ document.addEventListener('DOMContentLoaded', () => {
     // 2. Инициализируем элементы
     const usersListContainer = document.getElementById('users-list-container');
     const logoutButton = document.getElementById('logout-button');
+    const loadMoreUsersBtn = document.getElementById('load-more-users-btn');
+    // Курсор следующей страницы из заголовка X-Next-Cursor
+    let usersCursor = null;
 
     // 3. Обработчик выхода
     logoutButton.addEventListener('click', () => {
@@ -19,12 +22,41 @@ document.addEventListener('DOMContentLoaded', () => {
         window.location.href = 'index.html';
     });
 
-    // 4. Основная функция: Получение и отображение пользователей
-    async function fetchUsers() {
-        usersListContainer.innerHTML = '<p class="text-gray-500">Загрузка списка пользователей...</p>';
+    // Строка таблицы: элемент кликабельный и ведет на user_detail.html?id=X
+    function renderUserRow(user) {
+        const fullName = `${user.first_name} ${user.last_name}`;
+        const profileLink = `user_detail.html?id=${user.id}`;
+
+        return `
+            <tr class="user-row">
+                <td class="px-6 py-4 whitespace-nowrap text-sm font-medium text-indigo-600">
+                    <a href="${profileLink}" class="hover:text-indigo-800 transition-colors">${fullName}</a>
+                </td>
+                <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
+                    ${user.email}
+                </td>
+                <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-500 capitalize">
+                    ${user.role}
+                </td>
+                <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
+                    ${user.position || '—'}
+                </td>
+            </tr>
+        `;
+    }
+
+    // 4. Основная функция: Получение и отображение пользователей.
+    // append = true дописывает следующую страницу (по X-Next-Cursor) в уже построенную таблицу
+    async function fetchUsers(append = false) {
+        if (!append) {
+            usersCursor = null;
+            usersListContainer.innerHTML = '<p class="text-gray-500">Загрузка списка пользователей...</p>';
+        }
+        const params = new URLSearchParams();
+        if (usersCursor) params.set('cursor', usersCursor);
 
         try {
-            const response = await fetch('http://127.0.0.1:8000/users/', {
+            const response = await fetch(`http://127.0.0.1:8000/users/?${params}`, {
                 method: 'GET',
                 headers: {
                     'Authorization': `Bearer ${ACCESS_TOKEN}`,
@@ -38,6 +70,14 @@ document.addEventListener('DOMContentLoaded', () => {
             }
 
             const users = await response.json();
+            usersCursor = response.headers.get('X-Next-Cursor');
+            loadMoreUsersBtn.classList.toggle('hidden', !usersCursor);
+
+            if (append) {
+                const tbody = usersListContainer.querySelector('tbody');
+                tbody.insertAdjacentHTML('beforeend', users.map(renderUserRow).join(''));
+                return;
+            }
 
             if (users.length === 0) {
                 usersListContainer.innerHTML = '<p class="text-gray-500">Пользователи не найдены.</p>';
@@ -66,28 +106,7 @@ document.addEventListener('DOMContentLoaded', () => {
                     <tbody class="bg-white divide-y divide-gray-200">
             `;
 
-            users.forEach(user => {
-                const fullName = `${user.first_name} ${user.last_name}`;
-                // Элемент становится кликабельным и ведет на user_detail.html?id=X
-                const profileLink = `user_detail.html?id=${user.id}`;
-
-                tableHTML += `
-                    <tr class="user-row">
-                        <td class="px-6 py-4 whitespace-nowrap text-sm font-medium text-indigo-600">
-                            <a href="${profileLink}" class="hover:text-indigo-800 transition-colors">${fullName}</a>
-                        </td>
-                        <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
-                            ${user.email}
-                        </td>
-                        <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-500 capitalize">
-                            ${user.role}
-                        </td>
-                        <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
-                            ${user.position || '—'}
-                        </td>
-                    </tr>
-                `;
-            });
+            tableHTML += users.map(renderUserRow).join('');
 
             tableHTML += `
                     </tbody>
@@ -98,6 +117,9 @@ document.addEventListener('DOMContentLoaded', () => {
 
         } catch (error) {
             console.error('Ошибка при получении пользователей:', error);
+            if (append) {
+                return;
+            }
             usersListContainer.innerHTML = `
                 <div class="bg-red-100 border border-red-400 text-red-700 px-4 py-3 rounded relative" role="alert">
                     <strong class="font-bold">Ошибка!</strong>
@@ -108,5 +130,7 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    loadMoreUsersBtn.addEventListener('click', () => fetchUsers(true));
+
     fetchUsers();
 });
\ No newline at end of file
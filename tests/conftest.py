@@ -2,14 +2,20 @@ import pytest
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base
 
+from app.admission import login_admission
+from app.auth import jwt_cache, principal_cache, token_version_cache
 from app.database import Base
 from app.main import app
-from app.db_depends import get_async_db
+from app.membership import membership_index
+from app.services.project_service import project_stats_cache
+from app.user_lookup import user_lookup_index
+from app.db_depends import get_async_db, get_async_read_db, recent_writers
 from app.models import Task, User, Project, ProjectMember
 from fastapi.testclient import TestClient
 from fixtures.user_fixtures import *
 from fixtures.project_fixtures import *
 from fixtures.task_fixtures import *
+from fixtures.query_fixtures import *
 
 
 @pytest.fixture(scope='session')
@@ -40,6 +46,29 @@ async def async_db_session(async_test_engine):
 
             await transaction.rollback()
 
+@pytest.fixture(scope='function', autouse=True)
+def clear_in_process_caches():
+    """
+    Сбрасывает внутрипроцессные кэши: тестовая БД откатывается после
+    каждого теста, и ID/email пользователей переиспользуются.
+    """
+    principal_cache.clear()
+    token_version_cache.clear()
+    jwt_cache.clear()
+    login_admission.reset()
+    recent_writers.clear()
+    membership_index.clear()
+    project_stats_cache.clear()
+    user_lookup_index.clear()
+    yield
+    principal_cache.clear()
+    token_version_cache.clear()
+    jwt_cache.clear()
+    login_admission.reset()
+    membership_index.clear()
+    project_stats_cache.clear()
+    user_lookup_index.clear()
+
 @pytest.fixture(scope='function')
 def override_get_async_db(async_db_session):
     """
@@ -58,6 +87,7 @@ def test_client(override_get_async_db):
     зависимость БД на транзакционную тестовую сессию.
     """
     app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_async_read_db] = override_get_async_db
 
     with TestClient(app) as client:
         yield client
@@ -0,0 +1,35 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.query_stats import QueryStats
+
+
+@pytest.fixture
+def assert_max_queries():
+    """
+    Контекстный менеджер, проверяющий, что блок выполнил не больше max_queries
+    SQL-запросов. Слушает все движки, поэтому видит и запросы из потока TestClient.
+
+        with assert_max_queries(5):
+            test_client.get('/projects/', headers=auth_header_owner)
+    """
+    @contextmanager
+    def _assert_max_queries(max_queries: int):
+        stats = QueryStats()
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            stats.record(statement, 0)
+
+        event.listen(Engine, 'after_cursor_execute', record)
+        try:
+            yield stats
+        finally:
+            event.remove(Engine, 'after_cursor_execute', record)
+        shapes = '\n'.join(f'{count}x {shape}' for shape, count in stats.shapes.most_common())
+        assert stats.count <= max_queries, \
+            f'Выполнено {stats.count} запросов при лимите {max_queries}:\n{shapes}'
+
+    return _assert_max_queries
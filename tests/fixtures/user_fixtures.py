@@ -92,7 +92,8 @@ def auth_header_factory():
         token_data = {
             'sub': user.email,
             'role': user.role.name,
-            'id': user.id
+            'id': user.id,
+            'ver': user.token_version,
         }
         token = create_access_token(token_data)
         return {
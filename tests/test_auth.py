@@ -0,0 +1,258 @@
+import time
+from http import HTTPStatus
+
+import jwt
+import pytest
+from passlib.context import CryptContext
+from pytest_lazyfixture import lazy_fixture
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.admission import LoginAdmission, TokenBucket, login_admission
+from app.auth import (Principal, create_access_token, decode_token, get_current_user,
+                      jwt_cache, password_needs_rehash, token_claims, token_version_cache,
+                      verify_password)
+from app.config import settings
+from app.models.users import UserRole
+from app.scripts.calibrate_argon2 import calibrate, write_env
+
+
+@pytest.fixture
+def stateless_auth(monkeypatch):
+    """Включает режим аутентификации по claims (AUTH_STATELESS)."""
+    monkeypatch.setattr(settings, 'AUTH_STATELESS', True)
+
+
+async def test_stateless_mode_returns_principal_from_claims(stateless_auth, async_db_session,
+                                                            owner_user_data):
+    """
+    В режиме AUTH_STATELESS пользователь не загружается: версия токена берётся из кэша.
+    """
+    token = create_access_token(token_claims(owner_user_data))
+
+    first = await get_current_user(token=token, db=async_db_session)
+    second = await get_current_user(token=token, db=async_db_session)
+
+    assert isinstance(first, Principal)
+    assert first == second
+    assert first.id == owner_user_data.id
+    assert first.role == owner_user_data.role
+    assert token_version_cache.stats()['hits'] == 1
+
+
+def test_stateless_mode_serves_owner_routes(stateless_auth, test_client, auth_header_owner,
+                                            create_project_data):
+    """Principal подходит для get_current_owner и сервисов проектов."""
+    response = test_client.post('/projects', json=create_project_data, headers=auth_header_owner)
+    assert response.status_code == HTTPStatus.CREATED
+
+    response = test_client.get('/projects', headers=auth_header_owner)
+    assert response.status_code == HTTPStatus.OK
+    assert len(response.json()) == 1
+
+
+def test_role_change_revokes_issued_tokens(stateless_auth, test_client, test_user_data,
+                                           auth_header_member, auth_header_admin):
+    """
+    Смена роли увеличивает token_version, и ранее выданные токены перестают действовать.
+    """
+    assert test_client.get('/users/me', headers=auth_header_member).status_code == HTTPStatus.OK
+
+    response = test_client.patch(
+        f'/users/{test_user_data.id}',
+        json={'user': {'first_name': 'Броксигар', 'last_name': 'Саурфанг'},
+              'user_admin_data': {'role': 'owner'}},
+        headers=auth_header_admin)
+    assert response.status_code == HTTPStatus.OK
+
+    response = test_client.get('/users/me', headers=auth_header_member)
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert response.json()['detail'] == 'Token has been revoked'
+
+
+def test_refresh_token_revoked_after_role_change(stateless_auth, test_client, owner_user_data,
+                                                auth_header_admin):
+    """Refresh-токен со старой версией не обменивается на новый access-токен."""
+    tokens = test_client.post('/users/token',
+                              data={'username': owner_user_data.email, 'password': '12345Qwert'}).json()
+
+    response = test_client.patch(
+        f'/users/{owner_user_data.id}',
+        json={'user': {'first_name': 'Артас', 'last_name': 'Менетил'},
+              'user_admin_data': {'role': 'member'}},
+        headers=auth_header_admin)
+    assert response.status_code == HTTPStatus.OK
+
+    response = test_client.post('/users/refresh-token',
+                                headers={'Authorization': f"Bearer {tokens['refresh_token']}"})
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_decoded_tokens_are_memoized(owner_user_data):
+    """Повторное декодирование того же токена берётся из кэша."""
+    token = create_access_token(token_claims(owner_user_data))
+
+    assert decode_token(token) == decode_token(token)
+    stats = jwt_cache.stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] == 1
+
+
+def test_expired_token_is_not_memoized(owner_user_data):
+    """Просроченный токен отклоняется и не попадает в кэш."""
+    expired = jwt.encode({**token_claims(owner_user_data), 'exp': int(time.time()) - 1},
+                         settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+    with pytest.raises(jwt.ExpiredSignatureError):
+        decode_token(expired)
+    assert len(jwt_cache) == 0
+
+
+def test_memoized_payload_expires_with_token(owner_user_data, monkeypatch):
+    """Запись кэша живёт не дольше exp токена."""
+    token = jwt.encode({**token_claims(owner_user_data), 'exp': int(time.time()) + 60},
+                       settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    decode_token(token)
+
+    real_monotonic = time.monotonic
+    monkeypatch.setattr(time, 'monotonic', lambda: real_monotonic() + 61)
+    decode_token(token)
+    assert jwt_cache.stats()['misses'] == 2
+
+
+@pytest.mark.parametrize('auth_header_lazy, expected_status', [
+    (lazy_fixture('auth_header_admin'), HTTPStatus.OK),
+    (lazy_fixture('auth_header_owner'), HTTPStatus.FORBIDDEN),
+])
+def test_admin_cache_stats_access(test_client, auth_header_lazy, expected_status):
+    """Статистика кэшей доступна только администратору."""
+    response = test_client.get('/admin/caches', headers=auth_header_lazy)
+    assert response.status_code == expected_status
+    if expected_status == HTTPStatus.OK:
+        names = [cache['name'] for cache in response.json()['caches']]
+        assert names == ['principals', 'token_versions', 'jwt', 'read_your_writes', 'memberships',
+                         'project_stats']
+
+
+def test_token_bucket_refills_over_time():
+    """Bucket отдаёт burst сразу, затем по одному токену в 1/refill_rate секунд."""
+    bucket = TokenBucket(capacity=2, refill_rate=0.5, now=0.0)
+
+    assert bucket.try_acquire(0.0) == 0
+    assert bucket.try_acquire(0.0) == 0
+    assert bucket.try_acquire(0.0) == pytest.approx(2.0)
+    assert bucket.try_acquire(2.0) == 0
+
+
+def test_login_admission_limits_burst_per_email_and_ip():
+    """Всплеск по одному email упирается в его bucket, другие email проходят до лимита IP."""
+    now = [0.0]
+    admission = LoginAdmission(ip_burst=6, ip_per_minute=60, email_burst=3, email_per_minute=6,
+                               max_in_flight=2, max_keys=100, clock=lambda: now[0])
+
+    results = [admission.check_rate('10.0.0.1', 'victim@test.com') for _ in range(5)]
+    assert results[:3] == [0, 0, 0]
+    assert results[3] == pytest.approx(10.0)
+
+    assert admission.check_rate('10.0.0.1', 'other@test.com') == 0
+    assert admission.check_rate('10.0.0.1', 'third@test.com') > 0
+    assert admission.check_rate('10.0.0.2', 'third@test.com') == 0
+
+    now[0] += 10
+    assert admission.check_rate('10.0.0.3', 'VICTIM@test.com') == 0
+
+
+def test_login_admission_caps_in_flight_and_tracked_keys():
+    admission = LoginAdmission(ip_burst=1, ip_per_minute=1, email_burst=1, email_per_minute=1,
+                               max_in_flight=1, max_keys=4)
+    assert admission.try_enter() is True
+    assert admission.try_enter() is False
+    admission.leave()
+    assert admission.try_enter() is True
+
+    for i in range(10):
+        admission.check_rate(f'10.0.0.{i}', f'user{i}@test.com')
+    assert admission.stats()['tracked_keys'] == 4
+
+
+def test_login_burst_is_rejected_with_retry_after(test_client, owner_user_data):
+    """
+    Скриптовый перебор паролей одного email получает 429 с Retry-After,
+    не доходя до проверки пароля.
+    """
+    login_data = {'username': owner_user_data.email, 'password': 'WrongPassword123'}
+    statuses = [test_client.post('/users/token', data=login_data).status_code
+                for _ in range(settings.LOGIN_RATE_EMAIL_BURST)]
+    assert statuses == [HTTPStatus.UNAUTHORIZED] * settings.LOGIN_RATE_EMAIL_BURST
+
+    response = test_client.post('/users/token', data=login_data)
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert int(response.headers['Retry-After']) >= 1
+
+
+def test_login_rejected_when_in_flight_cap_reached(test_client, owner_user_data, monkeypatch):
+    """При исчерпании общего лимита проверок пароля логин отвечает 503."""
+    monkeypatch.setattr(login_admission, 'in_flight', login_admission.max_in_flight)
+
+    response = test_client.post('/users/token',
+                                data={'username': owner_user_data.email, 'password': '12345Qwert'})
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert 'Retry-After' in response.headers
+
+
+async def test_login_rehashes_stale_password_hash(test_client, user_factory, async_db_session,
+                                                   monkeypatch):
+    """
+    Хеш с устаревшими параметрами argon2 пересчитывается после успешного логина
+    в отдельной сессии фоновой задачи.
+    """
+    from app.services import user_service
+
+    # Фоновая сессия работает в той же тестовой транзакции
+    monkeypatch.setattr(user_service, 'async_session_maker',
+                        lambda: AsyncSession(async_db_session.bind, expire_on_commit=False))
+    user = await user_factory(email='legacy@test.com', role=UserRole.member)
+    legacy_context = CryptContext(schemes=['argon2'], argon2__rounds=1,
+                                  argon2__memory_cost=8192, argon2__parallelism=1)
+    user.hashed_password = legacy_context.hash('12345Qwert')
+    await async_db_session.flush()
+    assert password_needs_rehash(user.hashed_password)
+
+    response = test_client.post('/users/token',
+                                data={'username': user.email, 'password': '12345Qwert'})
+    assert response.status_code == HTTPStatus.OK
+
+    await async_db_session.refresh(user)
+    assert not password_needs_rehash(user.hashed_password)
+    assert verify_password('12345Qwert', user.hashed_password)
+
+
+async def test_login_keeps_current_password_hash(test_client, owner_user_data, async_db_session):
+    original_hash = owner_user_data.hashed_password
+
+    response = test_client.post('/users/token',
+                                data={'username': owner_user_data.email, 'password': '12345Qwert'})
+    assert response.status_code == HTTPStatus.OK
+
+    await async_db_session.refresh(owner_user_data)
+    assert owner_user_data.hashed_password == original_hash
+
+
+def test_argon2_calibration_writes_profile(tmp_path, monkeypatch):
+    """Калибровка выбирает профиль под цель и обновляет только свои ключи в env-файле."""
+    from app.scripts import calibrate_argon2
+
+    monkeypatch.setattr(calibrate_argon2, 'measure_ms',
+                        lambda time_cost, memory_cost_kib, parallelism, samples: time_cost * memory_cost_kib / 1024)
+    profile = calibrate(target_ms=10, max_memory_kib=8192, parallelism=1,
+                        memory_candidates=(2048, 8192, 16384))
+    assert (profile.memory_cost_kib, profile.time_cost) == (2048, 4)
+
+    env_file = tmp_path / '.env'
+    env_file.write_text('SECRET_KEY=abc\nPASSWORD_HASH_TIME_COST=9\n', encoding='utf-8')
+    write_env(str(env_file), profile.as_env(target_ms=100))
+
+    content = env_file.read_text(encoding='utf-8').splitlines()
+    assert content[0] == 'SECRET_KEY=abc'
+    assert 'PASSWORD_HASH_TIME_COST=4' in content
+    assert 'PASSWORD_HASH_MEMORY_COST_KIB=2048' in content
+    assert 'PASSWORD_HASH_TARGET_MS=100' in content
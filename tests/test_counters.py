@@ -0,0 +1,89 @@
+from http import HTTPStatus
+
+from sqlalchemy import select, update
+
+from app.models import ProjectTaskCounter, UserTaskCounter
+from app.services.counter_service import TaskCounterService
+
+
+async def _counters(db):
+    projects = {(row.project_id, row.status.value, row.priority.value): row.count
+                for row in (await db.scalars(select(ProjectTaskCounter))).all() if row.count}
+    users = {row.user_id: (row.open_count, row.done_count, row.blocked_count)
+             for row in (await db.scalars(select(UserTaskCounter))).all() if row.total}
+    return projects, users
+
+
+async def _recounted(db):
+    await TaskCounterService(db).rebuild()
+    return await _counters(db)
+
+
+async def test_counters_follow_task_writes(async_db_session, test_client, project_with_member,
+                                           task_create_data, auth_header_owner, test_user_data):
+    """Создание, обновление, пакетное обновление и удаление задач сохраняют счётчики точными."""
+    project_id = project_with_member['id']
+    created = [test_client.post(f'/projects/{project_id}/tasks', headers=auth_header_owner,
+                                json={**task_create_data, 'assigned_to_email': test_user_data.email}).json()
+               for _ in range(3)]
+    bulk = test_client.post(f'/projects/{project_id}/tasks:bulk', headers=auth_header_owner,
+                            json=[{**task_create_data, 'priority': 'high'}] * 2)
+    assert bulk.json()['created'] == 2
+
+    test_client.patch(f'/tasks/{created[0]["id"]}', headers=auth_header_owner, json={'status': 'done'})
+    test_client.patch(f'/tasks/{created[1]["id"]}', headers=auth_header_owner, json={'assigned_to_email': None})
+    response = test_client.patch('/tasks/batch', headers=auth_header_owner,
+                                 json={'ids': [created[2]['id']], 'patch': {'status': 'blocked', 'priority': 'low'}})
+    assert response.json()['updated'] == 1
+    assert test_client.delete(f'/tasks/{created[1]["id"]}',
+                              headers=auth_header_owner).status_code == HTTPStatus.NO_CONTENT
+
+    projects, users = await _counters(async_db_session)
+    assert users == {test_user_data.id: (0, 1, 1)}
+    assert projects == {(project_id, 'done', 'medium'): 1,
+                        (project_id, 'blocked', 'low'): 1,
+                        (project_id, 'todo', 'high'): 2}
+    assert (projects, users) == await _recounted(async_db_session)
+
+
+async def test_archive_keeps_project_counters_and_shifts_user_counters(
+        async_db_session, test_client, project_with_member, task_create_data, auth_header_owner, test_user_data):
+    """Задачи архива остаются в счётчиках проекта и выпадают из счётчиков исполнителей."""
+    project_id = project_with_member['id']
+    for _ in range(3):
+        test_client.post(f'/projects/{project_id}/tasks', headers=auth_header_owner,
+                         json={**task_create_data, 'assigned_to_email': test_user_data.email})
+    assert test_client.post(f'/projects/{project_id}/archive', headers=auth_header_owner).status_code == HTTPStatus.OK
+
+    projects, users = await _counters(async_db_session)
+    assert projects == {(project_id, 'todo', 'medium'): 3}
+    assert users == {}
+    assert (projects, users) == await _recounted(async_db_session)
+
+
+async def test_rebuild_repairs_drifted_counters(async_db_session, task_in_project):
+    await async_db_session.execute(update(ProjectTaskCounter).values(count=42))
+    await async_db_session.execute(update(UserTaskCounter).values(open_count=42))
+
+    projects, users = await _recounted(async_db_session)
+    assert projects == {(task_in_project['project_id'], 'todo', 'medium'): 1}
+    assert users == {}
+
+
+async def test_profile_and_project_read_counters(test_client, project_with_member, task_create_data,
+                                                 auth_header_owner, auth_header_member, test_user_data):
+    project_id = project_with_member['id']
+    for status in ('done', 'blocked', None):
+        task = test_client.post(f'/projects/{project_id}/tasks', headers=auth_header_owner,
+                                json={**task_create_data, 'assigned_to_email': test_user_data.email}).json()
+        if status:
+            test_client.patch(f'/tasks/{task["id"]}', headers=auth_header_owner, json={'status': status})
+
+    me = test_client.get('/users/me', headers=auth_header_member).json()
+    assert me['tasks_count'] == 3
+    assert me['task_counts'] == {'open_count': 1, 'done_count': 1, 'blocked_count': 1}
+    assert test_client.get(f'/users/{test_user_data.id}', headers=auth_header_owner).json()['tasks_count'] == 3
+
+    project = test_client.get(f'/projects/{project_id}', headers=auth_header_owner).json()
+    assert {(row['status'], row['count']) for row in project['task_counters']} == \
+        {('todo', 1), ('done', 1), ('blocked', 1)}
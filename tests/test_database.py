@@ -0,0 +1,152 @@
+from http import HTTPStatus
+
+import httpx
+import pytest
+from pytest_lazyfixture import lazy_fixture
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from starlette.requests import Request
+
+from app import db_depends
+from app.auth import create_access_token, token_claims
+from app.config import settings
+from app.database import Base, build_engine
+from app.db_depends import get_async_read_db, recent_writers, remember_write
+from app.main import app
+from app.models.users import User as UserModel, UserRole
+from app.pool_metrics import PoolMetrics
+
+
+def auth_header_for(user: UserModel) -> dict:
+    return {'Authorization': f'Bearer {create_access_token(token_claims(user))}'}
+
+
+@pytest.fixture
+def small_pool_settings(monkeypatch):
+    monkeypatch.setattr(settings, 'DB_POOL_SIZE', 1)
+    monkeypatch.setattr(settings, 'DB_MAX_OVERFLOW', 1)
+    monkeypatch.setattr(settings, 'DB_POOL_TIMEOUT', 0.1)
+
+
+async def test_pool_metrics_track_overflow_and_timeouts(small_pool_settings, tmp_path):
+    """
+    Пул из настроек: второе соединение уходит в overflow, третье ждёт и падает по таймауту.
+    """
+    metrics = PoolMetrics('test')
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}", metrics)
+    try:
+        first = await engine.connect()
+        second = await engine.connect()
+        await first.execute(text('select 1'))
+
+        snapshot = metrics.snapshot(engine.pool)
+        assert snapshot['checked_out'] == 2
+        assert snapshot['overflow_events'] == 1
+        assert snapshot['connection_age_seconds']['open'] == 2
+
+        with pytest.raises(PoolTimeoutError):
+            await engine.connect()
+
+        await first.close()
+        await second.close()
+        snapshot = metrics.snapshot(engine.pool)
+        assert snapshot['checked_out'] == 0
+        assert snapshot['timeouts'] == 1
+        assert snapshot['wait_ms']['count'] == 3
+        assert sum(snapshot['wait_ms']['histogram'].values()) == 3
+        assert snapshot['wait_ms']['max'] >= 100
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.parametrize('auth_header_lazy, expected_status', [
+    (lazy_fixture('auth_header_admin'), HTTPStatus.OK),
+    (lazy_fixture('auth_header_member'), HTTPStatus.FORBIDDEN),
+])
+def test_admin_db_pool_stats_access(test_client, auth_header_lazy, expected_status):
+    """Метрики пула доступны только администратору."""
+    response = test_client.get('/admin/db-pool', headers=auth_header_lazy)
+    assert response.status_code == expected_status
+    if expected_status == HTTPStatus.OK:
+        data = response.json()
+        assert data['name'] == 'primary'
+        assert data['size'] == settings.DB_POOL_SIZE
+        assert 'histogram' in data['wait_ms']
+
+
+@pytest.fixture
+async def primary_and_replica(tmp_path, monkeypatch):
+    """
+    Два файла SQLite в роли основной БД и реплики. В обеих есть один и тот же
+    владелец, но реплика "отстаёт" и не видит новых проектов.
+    """
+    makers = []
+    engines = []
+    for name in ('primary', 'replica'):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / name}.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        maker = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+        async with maker() as session:
+            session.add(UserModel(email='owner@test.com', first_name='Артас', last_name='Менетил',
+                                  hashed_password='-', role=UserRole.owner))
+            await session.commit()
+        engines.append(engine)
+        makers.append(maker)
+
+    monkeypatch.setattr(db_depends, 'async_session_maker', makers[0])
+    monkeypatch.setattr(db_depends, 'async_read_session_maker', makers[1])
+    yield makers
+    for engine in engines:
+        await engine.dispose()
+
+
+def _request(headers: dict) -> Request:
+    raw_headers = [(key.lower().encode(), value.encode()) for key, value in headers.items()]
+    return Request({'type': 'http', 'method': 'GET', 'path': '/', 'headers': raw_headers})
+
+
+async def _database_of(request: Request) -> str:
+    dependency = get_async_read_db(request)
+    session = await anext(dependency)
+    try:
+        return str(session.bind.url.database).rsplit('/', 1)[-1]
+    finally:
+        await dependency.aclose()
+
+
+async def test_read_dependency_routes_to_replica_until_user_writes(primary_and_replica):
+    owner = UserModel(id=1, email='owner@test.com', role=UserRole.owner, token_version=0)
+    request = _request(auth_header_for(owner))
+    anonymous = _request({})
+
+    assert await _database_of(request) == 'replica.db'
+    remember_write(request)
+    assert await _database_of(request) == 'primary.db'
+    assert await _database_of(anonymous) == 'replica.db'
+
+    recent_writers.clear()
+    assert await _database_of(request) == 'replica.db'
+
+
+async def test_project_list_reads_own_writes_then_replica(primary_and_replica):
+    """
+    Сразу после создания проекта список читается из основной БД (проект виден),
+    после окна READ_YOUR_WRITES_SECONDS - из отстающей реплики.
+    """
+    owner = UserModel(id=1, email='owner@test.com', role=UserRole.owner, token_version=0)
+    headers = auth_header_for(owner)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                 base_url='http://test') as client:
+        response = await client.post('/projects/', headers=headers,
+                                     json={'title': 'Новый', 'description': 'Описание'})
+        assert response.status_code == HTTPStatus.CREATED
+
+        response = await client.get('/projects/', headers=headers)
+        assert [project['title'] for project in response.json()] == ['Новый']
+
+        recent_writers.clear()
+        response = await client.get('/projects/', headers=headers)
+        assert response.json() == []
@@ -0,0 +1,145 @@
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app import db_depends
+from app.database import Base
+from app.membership import MembershipIndex, UserMemberships, membership_index
+from app.services.project_service import ProjectService, project_stats_cache
+from app.services.access_service import ProjectAccessService, ProjectAction, ProjectRelation
+
+
+def test_membership_index_evicts_by_total_project_ids():
+    """Индекс ограничен суммарным числом ID проектов: вытесняются давно не читанные записи."""
+    index = MembershipIndex(max_users=10, max_project_ids=5, ttl=60)
+    index._store(1, UserMemberships(owned=frozenset({1, 2})))
+    index._store(2, UserMemberships(member_of=frozenset({3, 4})))
+    assert index.get(1) is not None
+    index._store(3, UserMemberships(owned=frozenset({5, 6})))
+
+    assert index.get(2) is None
+    assert index.get(1) is not None and index.get(3) is not None
+    stats = index.stats()
+    assert (stats['project_ids'], stats['evictions']) == (4, 1)
+
+
+def test_membership_index_skips_entries_larger_than_limit():
+    index = MembershipIndex(max_users=10, max_project_ids=2, ttl=60)
+    index._store(1, UserMemberships(owned=frozenset({1, 2, 3})))
+    assert len(index) == 0
+
+
+def test_membership_index_drops_entry_that_outgrows_limit():
+    """Запись, выросшая сверх лимита, удаляется из индекса, а не остаётся устаревшей."""
+    index = MembershipIndex(max_users=10, max_project_ids=2, ttl=60)
+    index._store(1, UserMemberships(owned=frozenset({1, 2})))
+    index.add_project(3, owner_id=1)
+
+    assert index.get(1) is None
+    assert index.stats()['project_ids'] == 0
+
+
+async def test_membership_index_builds_lazily_and_counts_hits(
+        async_db_session, project_with_member, test_user_data, assert_max_queries):
+    """Первое обращение - один запрос, повторное - из памяти; владение отличается от участия."""
+    with assert_max_queries(1):
+        memberships = await membership_index.memberships(async_db_session, test_user_data.id)
+    assert memberships.member_of == {project_with_member['id']}
+    assert memberships.owned == frozenset()
+
+    with assert_max_queries(0):
+        assert await membership_index.memberships(async_db_session, test_user_data.id) is memberships
+    stats = membership_index.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 0.5)
+
+
+async def test_membership_index_follows_project_writes(
+        test_client, async_db_session, owner_project, auth_header_owner,
+        owner_user_data, test_user_data):
+    """Создание/удаление проекта и изменение состава участников обновляют закэшированные записи."""
+    await membership_index.memberships(async_db_session, owner_user_data.id)
+    await membership_index.memberships(async_db_session, test_user_data.id)
+
+    response = test_client.post('/projects', headers=auth_header_owner,
+                                json={'title': 'Второй', 'description': 'Проект'})
+    assert response.status_code == HTTPStatus.CREATED
+    second_id = response.json()['id']
+    assert membership_index.get(owner_user_data.id).owned == {owner_project['id'], second_id}
+
+    response = test_client.post(f'/projects/{second_id}/members/{test_user_data.email}',
+                                headers=auth_header_owner)
+    assert response.status_code == HTTPStatus.CREATED
+    assert membership_index.get(test_user_data.id).member_of == {second_id}
+
+    response = test_client.delete(f'/projects/{second_id}/members/{test_user_data.id}',
+                                  headers=auth_header_owner)
+    assert response.status_code == HTTPStatus.OK
+    assert membership_index.get(test_user_data.id).member_of == frozenset()
+
+    response = test_client.delete(f'/projects/{owner_project["id"]}', headers=auth_header_owner)
+    assert response.status_code == HTTPStatus.NO_CONTENT
+    assert membership_index.get(owner_user_data.id).owned == {second_id}
+
+
+async def test_access_check_without_sql_for_indexed_member(
+        async_db_session, project_with_member, test_user_data, second_owner_user_data,
+        assert_max_queries):
+    """Участнику с построенной записью индекса проверка прав не стоит ни одного запроса."""
+    access = ProjectAccessService(async_db_session)
+    await membership_index.memberships(async_db_session, test_user_data.id)
+
+    with assert_max_queries(0):
+        decision = await access.check(project_with_member['id'], test_user_data,
+                                      ProjectAction.view_tasks, load_project=False)
+    assert (decision.relation, decision.allowed) == (ProjectRelation.member, True)
+    assert decision.ensure('нет доступа') is None
+
+    # Отказ подтверждается запросом: нужно отличить «нет проекта» от «нет прав»
+    decision = await access.check(project_with_member['id'], second_owner_user_data,
+                                  ProjectAction.view_tasks, load_project=False)
+    assert decision.project_exists and not decision.allowed
+
+
+@pytest.fixture
+async def lagging_replica(async_db_session, monkeypatch):
+    """
+    Сессия отдельной «реплики», которая ещё не получила ни одной записи основной БД.
+    Основная БД для кэшей - тестовая транзакция.
+    """
+    engine = create_async_engine('sqlite+aiosqlite:///:memory:', poolclass=StaticPool)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    monkeypatch.setattr(db_depends, 'async_read_engine', engine)
+    monkeypatch.setattr(db_depends, 'async_session_maker',
+                        lambda: AsyncSession(async_db_session.bind, expire_on_commit=False))
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+async def test_membership_index_not_filled_from_replica(lagging_replica, project_with_member,
+                                                        test_user_data):
+    """Промах индекса через сессию реплики загружается из основной БД: новый участник не теряется."""
+    assert db_depends.is_replica_session(lagging_replica)
+
+    memberships = await membership_index.memberships(lagging_replica, test_user_data.id)
+
+    assert memberships.member_of == {project_with_member['id']}
+    assert membership_index.get(test_user_data.id) == memberships
+
+
+async def test_project_stats_cache_not_filled_from_replica(lagging_replica, test_client, project_with_member,
+                                                           task_create_data, auth_header_owner,
+                                                           owner_user_data):
+    """Статистика для общего кэша считается по основной БД, а не по отстающей реплике."""
+    project_id = project_with_member['id']
+    response = test_client.post(f'/projects/{project_id}/tasks', headers=auth_header_owner,
+                                json=task_create_data)
+    assert response.status_code == HTTPStatus.CREATED
+
+    stats = await ProjectService(lagging_replica).get_project_stats(project_id, owner_user_data)
+
+    assert stats.total == 1
+    assert project_stats_cache.get(project_id).total == 1
@@ -3,6 +3,11 @@ from http import HTTPStatus
 import pytest
 from pytest_lazyfixture import lazy_fixture
 
+from sqlalchemy import inspect
+
+from app.config import settings
+from app.models import Project
+from app.services.access_service import ProjectAccessService, ProjectAction, ProjectRelation
 from tests.fixtures.project_fixtures import project_with_member
 
 FIRST_ID = 1
@@ -127,6 +132,73 @@ async def test_get_projects_owner_sees_only_relevant(
     assert third_project_as_member['id'] not in project_ids
 
 
+def test_get_project_embeds_first_page_of_tasks(test_client, auth_header_owner, project_with_member,
+                                                task_create_data):
+    """Карточка проекта содержит страницу задач, продолжение - через GET /projects/{id}/tasks/."""
+    project_id = project_with_member['id']
+    for number in range(3):
+        response = test_client.post(f'/projects/{project_id}/tasks', headers=auth_header_owner,
+                                    json={**task_create_data, 'title': f'Задача {number}'})
+        assert response.status_code == HTTPStatus.CREATED
+
+    response = test_client.get(f'/projects/{project_id}', headers=auth_header_owner, params={'tasks_limit': 2})
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert [task['title'] for task in data['tasks']] == ['Задача 2', 'Задача 1']
+    assert data['members_count'] == len(data['members']) == 2
+    assert sum(counter['count'] for counter in data['task_counters']) == 3
+
+    rest = test_client.get(f'/projects/{project_id}/tasks/', headers=auth_header_owner,
+                           params={'cursor': data['tasks_next_cursor']}).json()
+    assert [task['title'] for task in rest['items']] == ['Задача 0']
+    assert rest['next_cursor'] is None
+
+
+@pytest.mark.parametrize(
+    'method, path, body',
+    [
+        ('PATCH', '/projects/{project_id}', {'title': 'Новое название'}),
+        ('POST', '/projects/{project_id}/members/{second_owner_email}', None),
+        ('DELETE', '/projects/{project_id}/members/{member_id}', None),
+    ]
+)
+def test_project_mutations_load_only_header(test_client, assert_max_queries, auth_header_owner,
+                                            task_in_project, test_user_data, second_owner_user_data,
+                                            method, path, body):
+    """Изменение проекта не читает его задачи, сколько бы их ни было."""
+    url = path.format(project_id=task_in_project['project_id'], member_id=test_user_data.id,
+                      second_owner_email=second_owner_user_data.email)
+    with assert_max_queries(10) as stats:
+        response = test_client.request(method, url, headers=auth_header_owner, json=body)
+    assert response.status_code < 300, response.text
+    assert 'tasks' not in response.json()
+    assert not any('FROM tasks' in shape for shape in stats.shapes)
+
+
+def test_get_project_sparse_fieldset(test_client, auth_header_owner, task_in_project):
+    """fields и include оставляют в ответе только запрошенные поля и связи."""
+    project_id = task_in_project['project_id']
+
+    full = test_client.get(f'/projects/{project_id}', headers=auth_header_owner).json()
+    assert {'title', 'description', 'owner', 'tasks', 'members', 'task_counters'} <= full.keys()
+
+    response = test_client.get(f'/projects/{project_id}', headers=auth_header_owner,
+                               params={'fields': 'title', 'include': 'owner'})
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'id': project_id, 'title': full['title'], 'owner': full['owner']}
+
+    response = test_client.get('/projects/', headers=auth_header_owner, params={'include': ''})
+    assert response.status_code == HTTPStatus.OK
+    assert all('owner' not in item and 'title' in item for item in response.json())
+
+
+@pytest.mark.parametrize('params', [{'fields': 'title,secret'}, {'include': 'tasks,owner_id'}])
+def test_get_project_sparse_fieldset_rejects_unknown_names(test_client, auth_header_owner,
+                                                          owner_project, params):
+    response = test_client.get(f'/projects/{owner_project["id"]}', headers=auth_header_owner, params=params)
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
 @pytest.mark.parametrize(
     'auth_header_lazy, expected_status, case_description',
     [
@@ -230,3 +302,255 @@ async def test_delete_project_permissions(test_client, owner_project,
             headers=auth_header_lazy)
         assert get_response.status_code == HTTPStatus.NOT_FOUND
 
+
+
+def _create_projects(test_client, headers, titles):
+    ids = []
+    for title in titles:
+        response = test_client.post('/projects', headers=headers,
+                                    json={'title': title, 'description': 'Проект для списка'})
+        assert response.status_code == HTTPStatus.CREATED
+        ids.append(response.json()['id'])
+    return ids
+
+
+async def test_get_projects_cursor_pagination(test_client, auth_header_owner):
+    """Страницы по X-Next-Cursor покрывают все проекты от новых к старым без повторов."""
+    created_ids = _create_projects(test_client, auth_header_owner, [f'Проект {n}' for n in range(5)])
+
+    seen, cursor = [], None
+    while True:
+        params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+        response = test_client.get('/projects/', headers=auth_header_owner, params=params)
+        assert response.status_code == HTTPStatus.OK
+        assert len(response.json()) <= 2
+        seen.extend(project['id'] for project in response.json())
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor is None:
+            break
+    assert seen == list(reversed(created_ids))
+
+
+async def test_get_projects_filters(test_client, auth_header_owner, owner_user_data,
+                                    auth_header_second_owner):
+    """Фильтры по началу названия, владельцу и датам применяются на стороне сервера."""
+    alpha, beta = _create_projects(test_client, auth_header_owner, ['Alpha 100%', 'Beta'])
+    _create_projects(test_client, auth_header_second_owner, ['Alpha чужой'])
+
+    def ids(**params):
+        response = test_client.get('/projects/', headers=auth_header_owner, params=params)
+        assert response.status_code == HTTPStatus.OK
+        return [project['id'] for project in response.json()]
+
+    assert ids(title='Alpha') == [alpha]
+    assert ids(title='Alpha 100%') == [alpha]
+    assert ids(title='_') == []
+    assert ids(owner_id=owner_user_data.id) == [beta, alpha]
+    assert ids(is_active=False) == []
+    assert ids(created_from='2000-01-01T00:00:00', created_to='2100-01-01T00:00:00') == [beta, alpha]
+    assert ids(created_to='2000-01-01T00:00:00') == []
+
+
+async def test_get_projects_total_count(test_client, auth_header_owner, monkeypatch):
+    """with_total возвращает точное число, а выше COUNT_EXACT_LIMIT - оценку."""
+    _create_projects(test_client, auth_header_owner, [f'Проект {n}' for n in range(3)])
+
+    response = test_client.get('/projects/', headers=auth_header_owner,
+                               params={'limit': 1, 'with_total': True})
+    assert response.headers['X-Total-Count'] == '3'
+    assert response.headers['X-Total-Count-Estimated'] == 'false'
+
+    monkeypatch.setattr('app.services.project_service.settings.COUNT_EXACT_LIMIT', 1)
+    response = test_client.get('/projects/', headers=auth_header_owner,
+                               params={'limit': 1, 'with_total': True})
+    # SQLite не даёт оценку планировщика - возвращается нижняя граница
+    assert response.headers['X-Total-Count'] == '2'
+    assert response.headers['X-Total-Count-Estimated'] == 'true'
+
+    response = test_client.get('/projects/', headers=auth_header_owner)
+    assert 'X-Total-Count' not in response.headers
+
+
+def test_total_count_estimate_binds_filter_values():
+    """EXPLAIN для оценки передаёт значения фильтров параметрами, а не вставляет их в SQL."""
+    from sqlalchemy import select
+    from sqlalchemy.dialects.postgresql import asyncpg
+
+    from app.pagination import Explain
+
+    title = "x'; DROP TABLE users; --"
+    compiled = Explain(select(Project).where(Project.title.startswith(title))).compile(
+        dialect=asyncpg.dialect())
+
+    assert compiled.string.startswith('EXPLAIN (FORMAT JSON) SELECT')
+    assert 'DROP TABLE' not in compiled.string
+    assert title in compiled.params.values()
+
+
+async def test_get_projects_invalid_cursor(test_client, auth_header_owner):
+    response = test_client.get('/projects/', headers=auth_header_owner, params={'cursor': '@@'})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.parametrize(
+    'user_fixture, action, expected_relation, expected_allowed',
+    [
+        (lazy_fixture('owner_user_data'), ProjectAction.edit, ProjectRelation.owner, True),
+        (lazy_fixture('test_user_data'), ProjectAction.create_task, ProjectRelation.member, True),
+        (lazy_fixture('test_user_data'), ProjectAction.edit, ProjectRelation.member, False),
+        (lazy_fixture('admin_user_data'), ProjectAction.view, ProjectRelation.none, True),
+        (lazy_fixture('admin_user_data'), ProjectAction.create_task, ProjectRelation.none, False),
+        (lazy_fixture('second_owner_user_data'), ProjectAction.view, ProjectRelation.none, False),
+    ]
+)
+async def test_project_access_decision(async_db_session, project_with_member, assert_max_queries,
+                                       user_fixture, action, expected_relation, expected_allowed):
+    """Решение о доступе - один запрос с EXISTS, участники проекта не загружаются."""
+    access = ProjectAccessService(async_db_session)
+    async_db_session.expunge_all()
+    with assert_max_queries(1):
+        decision = await access.check(project_with_member['id'], user_fixture, action)
+    assert (decision.relation, decision.allowed) == (expected_relation, expected_allowed)
+    assert 'members' in inspect(decision.project).unloaded
+
+
+async def test_project_access_missing_project(async_db_session, owner_user_data):
+    decision = await ProjectAccessService(async_db_session).check(999_999, owner_user_data, ProjectAction.view)
+    assert not decision.project_exists
+    with pytest.raises(ValueError):
+        decision.ensure('нет доступа')
+
+
+async def test_project_access_check_loaded_project_skips_query_for_owner(
+        async_db_session, project_with_member, owner_user_data, test_user_data, assert_max_queries):
+    """Для загруженного проекта владельцу запрос не нужен, участнику - один (построение индекса)."""
+    access = ProjectAccessService(async_db_session)
+    project = await async_db_session.get(Project, project_with_member['id'])
+    with assert_max_queries(0):
+        assert (await access.check_project(project, owner_user_data, ProjectAction.view)).allowed
+    with assert_max_queries(1):
+        assert (await access.check_project(project, test_user_data, ProjectAction.view)).allowed
+
+
+async def test_project_stats(test_client, project_with_member, task_create_data,
+                             auth_header_owner, test_user_data):
+    """Разбивка по статусам и приоритетам, просрочка и нагрузка исполнителей."""
+    project_id = project_with_member['id']
+    tasks = [
+        {**task_create_data, 'assigned_to_email': test_user_data.email},
+        {**task_create_data, 'assigned_to_email': test_user_data.email, 'priority': 'high',
+         'due_date': '2999-01-01'},
+        {**task_create_data, 'priority': 'low'},
+    ]
+    created = test_client.post(f'/projects/{project_id}/tasks:bulk', headers=auth_header_owner, json=tasks)
+    done_id = created.json()['items'][0]['task']['id']
+    test_client.patch(f'/tasks/{done_id}', headers=auth_header_owner, json={'status': 'done'})
+
+    response = test_client.get(f'/projects/{project_id}/stats', headers=auth_header_owner)
+    assert response.status_code == HTTPStatus.OK
+    stats = response.json()
+    assert stats['total'] == 3
+    assert stats['by_status'] == {'todo': 2, 'in_progress': 0, 'blocked': 0, 'done': 1}
+    assert stats['by_priority'] == {'low': 1, 'medium': 1, 'high': 1}
+    # Просрочена только невыполненная задача без исполнителя (due_date 2021 года)
+    assert stats['overdue'] == 1
+    assert stats['assignees'] == [
+        {'user_id': test_user_data.id, 'total': 2, 'open': 1, 'overdue': 0},
+        {'user_id': None, 'total': 1, 'open': 1, 'overdue': 1},
+    ]
+
+
+async def test_project_stats_cached_until_task_write(test_client, project_with_member, task_create_data,
+                                                     auth_header_member, auth_header_owner,
+                                                     assert_max_queries):
+    """Повторный запрос участника не обращается к БД; запись задачи сбрасывает кэш."""
+    url = f'/projects/{project_with_member["id"]}/stats'
+    assert test_client.get(url, headers=auth_header_member).json()['total'] == 0
+    with assert_max_queries(0):
+        assert test_client.get(url, headers=auth_header_member).json()['total'] == 0
+
+    test_client.post(f'/projects/{project_with_member["id"]}/tasks',
+                     headers=auth_header_owner, json=task_create_data)
+    assert test_client.get(url, headers=auth_header_member).json()['total'] == 1
+
+
+@pytest.mark.parametrize(
+    'project_id_key, expected_status',
+    [
+        ('id', HTTPStatus.FORBIDDEN),
+        (None, HTTPStatus.NOT_FOUND),
+    ])
+async def test_project_stats_access(test_client, owner_project, auth_header_second_owner,
+                                    project_id_key, expected_status):
+    project_id = owner_project[project_id_key] if project_id_key else 999_999
+    response = test_client.get(f'/projects/{project_id}/stats', headers=auth_header_second_owner)
+    assert response.status_code == expected_status
+
+
+async def test_archive_and_unarchive_project(test_client, project_with_member, task_create_data,
+                                             auth_header_owner, auth_header_member, test_user_data,
+                                             async_db_session, monkeypatch):
+    """Архивация переносит задачи пачками в archived_tasks, разархивация возвращает их с теми же id."""
+    monkeypatch.setattr(settings, 'ARCHIVE_CHUNK_SIZE', 2)
+    project_id = project_with_member['id']
+    task_ids = [test_client.post(f'/projects/{project_id}/tasks', headers=auth_header_owner,
+                                 json={**task_create_data, 'title': f'Задача {number}',
+                                       'assigned_to_email': test_user_data.email}).json()['id']
+                for number in range(5)]
+
+    response = test_client.post(f'/projects/{project_id}/archive', headers=auth_header_owner)
+    assert response.status_code == HTTPStatus.OK, response.text
+    assert response.json()['is_active'] is False
+    assert sum(counter['count'] for counter in response.json()['task_counters']) == 5
+
+    tasks_url = f'/projects/{project_id}/tasks/'
+    assert test_client.get(tasks_url, headers=auth_header_member).json()['items'] == []
+    archived = test_client.get(tasks_url, headers=auth_header_member, params={'archived': True}).json()
+    assert [task['id'] for task in archived['items']] == task_ids[::-1]
+    project = test_client.get(f'/projects/{project_id}', headers=auth_header_member,
+                              params={'archived': True, 'tasks_limit': 2}).json()
+    assert [task['id'] for task in project['tasks']] == task_ids[:2:-1]
+    assert project['tasks_next_cursor'] is not None
+    assert test_client.get(f'/tasks/{task_ids[0]}', headers=auth_header_member).status_code == HTTPStatus.NOT_FOUND
+    response = test_client.get(f'/tasks/{task_ids[0]}', headers=auth_header_member,
+                               params={'archived': True, 'fields': 'title', 'include': 'author'})
+    assert response.json() == {'id': task_ids[0], 'title': 'Задача 0', 'author': response.json()['author']}
+    stats = test_client.get(f'/projects/{project_id}/stats', headers=auth_header_member,
+                            params={'archived': True}).json()
+    assert stats['total'] == 5
+    assert test_client.get('/users/me', headers=auth_header_member).json()['tasks_count'] == 0
+
+    response = test_client.post(f'/projects/{project_id}/tasks', headers=auth_header_owner, json=task_create_data)
+    assert response.status_code == HTTPStatus.FORBIDDEN
+
+    response = test_client.post(f'/projects/{project_id}/unarchive', headers=auth_header_owner)
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['is_active'] is True
+    live = test_client.get(tasks_url, headers=auth_header_member).json()
+    assert [task['id'] for task in live['items']] == task_ids[::-1]
+    assert test_client.get(tasks_url, headers=auth_header_member, params={'archived': True}).json()['items'] == []
+    # Сессия тестов общая для запросов: счётчик пользователя из прошлого /users/me остался в identity map
+    async_db_session.expire_all()
+    assert test_client.get('/users/me', headers=auth_header_member).json()['tasks_count'] == 5
+
+
+async def test_archive_project_access(test_client, project_with_member, auth_header_second_owner,
+                                      auth_header_admin):
+    project_id = project_with_member['id']
+    response = test_client.post(f'/projects/{project_id}/archive', headers=auth_header_second_owner)
+    assert response.status_code == HTTPStatus.FORBIDDEN
+    response = test_client.post('/projects/999999/archive', headers=auth_header_admin)
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    response = test_client.post(f'/projects/{project_id}/archive', headers=auth_header_admin)
+    assert response.status_code == HTTPStatus.OK
+
+
+async def test_delete_archived_project(test_client, task_in_project, auth_header_owner):
+    project_id = task_in_project['project_id']
+    assert test_client.post(f'/projects/{project_id}/archive', headers=auth_header_owner).status_code == HTTPStatus.OK
+    response = test_client.delete(f'/projects/{project_id}', headers=auth_header_owner)
+    assert response.status_code == HTTPStatus.NO_CONTENT
+    response = test_client.get(f'/tasks/{task_in_project["id"]}', headers=auth_header_owner,
+                               params={'archived': True})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
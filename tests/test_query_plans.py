@@ -0,0 +1,177 @@
+"""
+Планы SQL-запросов сервисов. test_service_queries_use_indexes проверяет план SQLite
+(тестовая БД в памяти) и запускается всегда. Вариант с пометкой postgres проверяет
+EXPLAIN (FORMAT JSON) PostgreSQL и выполняется, только если задан TEST_POSTGRES_URL
+(postgresql+asyncpg://...); DATABASE_URL для этого не используется.
+"""
+import json
+import os
+import re
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.database import Base
+from app.models import Project, ProjectMember, Task, User
+from app.models.tasks import TaskPriority, TaskStatus
+from app.models.users import UserRole
+from app.pagination import encode_cursor
+from app.schemas.projects import ProjectFilter
+from app.services.project_service import ProjectService
+from app.services.task_service import TaskService
+from app.services.user_service import UserService
+
+HOT_TABLES = ('tasks', 'archived_tasks', 'projects', 'project_members', 'users')
+# "SCAN <таблица>" в EXPLAIN QUERY PLAN SQLite - полный просмотр таблицы или индекса
+FULL_SCAN = re.compile(rf'^SCAN ({"|".join(HOT_TABLES)})\b')
+# Просмотр индекса в порядке сортировки допустим для страницы с LIMIT: он останавливается на limit строк
+ORDERED_INDEX_SCAN = re.compile(r'^SCAN \w+ USING (COVERING )?INDEX ')
+
+
+async def seed_dataset(session: AsyncSession) -> tuple[list[User], list[Project]]:
+    """
+    Набор данных, на котором планировщик выбирает между индексом и полным просмотром:
+    20 пользователей, 40 проектов по 5 участников, 800 задач.
+    """
+    users = [User(email=f'plan{i}@test.com', first_name='План', last_name=f'Тест{i}',
+                  hashed_password='-', role=UserRole.owner) for i in range(20)]
+    session.add_all(users)
+    await session.flush()
+    projects = [Project(title=f'Проект {i}', owner_id=users[i % 20].id) for i in range(40)]
+    session.add_all(projects)
+    await session.flush()
+    session.add_all(ProjectMember(project_id=project.id, user_id=user.id)
+                    for project in projects for user in users[:5])
+    statuses, priorities = list(TaskStatus), list(TaskPriority)
+    session.add_all(Task(project_id=projects[i % 40].id, title=f'Задача {i}', description='Описание задачи',
+                         status=statuses[i % 4], priority=priorities[i % 3],
+                         author_id=users[0].id, assigned_to_id=users[i % 20].id if i % 5 else None)
+                    for i in range(800))
+    await session.flush()
+    return users, projects
+
+
+@pytest.fixture
+async def seeded_dataset(async_db_session):
+    return await seed_dataset(async_db_session)
+
+
+@pytest.fixture
+async def postgres_session():
+    """
+    Сессия PostgreSQL из TEST_POSTGRES_URL в транзакции, откатываемой после теста.
+    Схема создаётся в той же транзакции, если её ещё нет.
+    """
+    url = os.environ.get('TEST_POSTGRES_URL')
+    if not url:
+        pytest.skip('TEST_POSTGRES_URL не задан: проверяется только план SQLite')
+    engine = create_async_engine(url)
+    try:
+        async with engine.connect() as connection:
+            async with connection.begin() as transaction:
+                await connection.run_sync(Base.metadata.create_all)
+                # На маленьком наборе PostgreSQL предпочитает Seq Scan и при наличии индекса;
+                # с enable_seqscan = off он остаётся в плане, только если индекса нет
+                await connection.execute(text('SET LOCAL enable_seqscan = off'))
+                yield engine, AsyncSession(connection, expire_on_commit=False)
+                await transaction.rollback()
+    finally:
+        await engine.dispose()
+
+
+SERVICE_QUERIES = {
+    'project_tasks': lambda db, user, project: TaskService(db).get_project_tasks(
+        project.id, user, status_filter=None, priority_filter=None),
+    'project_tasks_by_status': lambda db, user, project: TaskService(db).get_project_tasks(
+        project.id, user, status_filter=TaskStatus.todo, priority_filter=None),
+    'project_tasks_by_status_and_priority': lambda db, user, project: TaskService(db).get_project_tasks(
+        project.id, user, status_filter=TaskStatus.todo, priority_filter=TaskPriority.high),
+    'project_tasks_after_cursor': lambda db, user, project: TaskService(db).get_project_tasks(
+        project.id, user, status_filter=None, priority_filter=None, limit=10,
+        cursor=encode_cursor(datetime.now(timezone.utc), 10 ** 9)),
+    'archived_project_tasks': lambda db, user, project: TaskService(db).get_project_tasks(
+        project.id, user, status_filter=None, priority_filter=None, archived=True),
+    'task_by_id': lambda db, user, project: TaskService(db).get_task_by_id(1, user),
+    'my_assigned_tasks': lambda db, user, project: TaskService(db).get_my_assigned_tasks(user),
+    'user_tasks': lambda db, user, project: TaskService(db).get_user_tasks(user.id + 1, user),
+    'projects_member_or_owner': lambda db, user, project: ProjectService(db).get_projects(user),
+    'projects_only_owned': lambda db, user, project: ProjectService(db).get_projects(user, only_owned=True),
+    'projects_admin_page': lambda db, user, project: ProjectService(db).get_projects(
+        User(id=user.id, role=UserRole.admin), limit=10),
+    'projects_title_prefix': lambda db, user, project: ProjectService(db).get_projects(
+        user, filters=ProjectFilter(title='Проект 1')),
+    'project_detail': lambda db, user, project: ProjectService(db).get_project(project.id, user),
+    'project_stats': lambda db, user, project: ProjectService(db).get_project_stats(project.id, user),
+    'archived_project_stats': lambda db, user, project: ProjectService(db).get_project_stats(
+        project.id, user, archived=True),
+    'users_directory': lambda db, user, project: UserService(db).get_users(limit=10),
+    'user_profile': lambda db, user, project: UserService(db).get_user(user.id, user),
+}
+
+
+async def capture_selects(engine, session: AsyncSession, query_name: str,
+                          users: list[User], projects: list[Project]) -> list[tuple]:
+    """Выполняет сервисный метод и возвращает его SELECT-запросы с параметрами драйвера."""
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            captured.append((statement, parameters))
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', capture)
+    try:
+        await SERVICE_QUERIES[query_name](session, users[1], projects[1])
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', capture)
+    assert captured
+    return captured
+
+
+def seq_scans(node: dict) -> list[str]:
+    """Горячие таблицы, которые план PostgreSQL читает через Seq Scan."""
+    found = []
+    if node.get('Node Type') == 'Seq Scan' and node.get('Relation Name') in HOT_TABLES:
+        found.append(node['Relation Name'])
+    for child in node.get('Plans', []):
+        found.extend(seq_scans(child))
+    return found
+
+
+@pytest.mark.parametrize('query_name', SERVICE_QUERIES)
+async def test_service_queries_use_indexes(async_test_engine, async_db_session,
+                                           seeded_dataset, query_name):
+    """
+    Каждый SELECT сервисного метода выполняется через индексы, без полного просмотра
+    горячих таблиц. Падает, если запрос или индекс регрессирует до SCAN.
+    """
+    users, projects = seeded_dataset
+    captured = await capture_selects(async_test_engine, async_db_session, query_name, users, projects)
+
+    connection = await async_db_session.connection()
+    for statement, parameters in captured:
+        plan = (await connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)).all()
+        details = [row[-1] for row in plan]
+        paginated = ' LIMIT ' in statement
+        scans = [detail for detail in details if FULL_SCAN.match(detail)
+                 and not (paginated and ORDERED_INDEX_SCAN.match(detail))]
+        assert not scans, f'{query_name}: полный просмотр {scans}\n{statement}\n' + '\n'.join(details)
+
+
+@pytest.mark.postgres
+@pytest.mark.parametrize('query_name', SERVICE_QUERIES)
+async def test_service_queries_use_indexes_postgres(postgres_session, query_name):
+    """
+    То же для планировщика PostgreSQL: в EXPLAIN (FORMAT JSON) нет Seq Scan по горячим таблицам.
+    """
+    engine, session = postgres_session
+    users, projects = await seed_dataset(session)
+    captured = await capture_selects(engine, session, query_name, users, projects)
+
+    connection = await session.connection()
+    for statement, parameters in captured:
+        raw = (await connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}', parameters)).scalar_one()
+        plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]['Plan']
+        scans = seq_scans(plan)
+        assert not scans, f'{query_name}: Seq Scan {scans}\n{statement}\n{json.dumps(plan, indent=1)}'
@@ -0,0 +1,150 @@
+from http import HTTPStatus
+
+import pytest
+from pytest_lazyfixture import lazy_fixture
+from sqlalchemy import select
+
+from app.auth import principal_cache
+from app.membership import membership_index
+from app.models import User
+from app.query_stats import QueryStats, capture_queries, statement_shape
+
+
+def test_statement_shape_collapses_whitespace_and_in_lists():
+    """Одинаковые запросы с разной длиной IN-списка имеют одну форму."""
+    first = statement_shape('SELECT users.id FROM users\n  WHERE users.id IN (?, ?, ?)')
+    second = statement_shape('SELECT users.id FROM users WHERE users.id IN (?)')
+    assert first == second == 'SELECT users.id FROM users WHERE users.id IN (?)'
+
+
+def test_query_stats_headers_flag_repeated_shapes():
+    """Повтор одной формы запроса не меньше порога помечается заголовком X-DB-N-Plus-One."""
+    stats = QueryStats()
+    for _ in range(2):
+        stats.record('SELECT projects.id FROM projects', 0.001)
+    assert 'X-DB-N-Plus-One' not in stats.headers()
+
+    for _ in range(5):
+        stats.record('SELECT users.id FROM users WHERE users.id = ?', 0.001)
+    headers = stats.headers()
+    assert headers['X-DB-Queries'] == '7'
+    assert headers['X-DB-N-Plus-One'] == '5'
+    assert headers['Server-Timing'] == 'db;dur=7.00;desc="7 queries"'
+
+
+async def test_capture_queries_counts_only_current_context(async_db_session, test_user_data):
+    """capture_queries считает запросы, выполненные внутри блока."""
+    await async_db_session.scalar(select(User).where(User.id == test_user_data.id))
+    with capture_queries() as stats:
+        for _ in range(3):
+            await async_db_session.scalar(select(User).where(User.id == test_user_data.id))
+    assert stats.count == 3
+    assert list(stats.shapes.values()) == [3]
+
+
+def test_response_has_query_headers(test_client, auth_header_owner, owner_project):
+    """Ответ API содержит число SQL-запросов и время в БД."""
+    response = test_client.get(f'/projects/{owner_project["id"]}', headers=auth_header_owner)
+    assert response.status_code == HTTPStatus.OK
+    assert int(response.headers['X-DB-Queries']) > 0
+    assert response.headers['Server-Timing'].startswith('db;dur=')
+
+
+def test_query_headers_exposed_to_browser(test_client, auth_header_owner):
+    """CORS-ответ открывает браузеру заголовки статистики и пагинации."""
+    response = test_client.get('/projects/', headers={**auth_header_owner, 'Origin': 'http://127.0.0.1:5500'})
+    exposed = {name.strip() for name in response.headers['Access-Control-Expose-Headers'].split(',')}
+    assert {'X-DB-Queries', 'X-DB-N-Plus-One', 'Server-Timing', 'X-Next-Cursor',
+            'X-Total-Count', 'X-Total-Count-Estimated'} <= exposed
+
+
+@pytest.mark.parametrize(
+    'path, max_queries',
+    [
+        ('/projects/', 3),
+        ('/projects/{project_id}', 5),
+        ('/projects/{project_id}/tasks/', 5),
+        ('/tasks/{task_id}', 2),
+        ('/tasks/my', 2),
+        ('/users/me', 4),
+        ('/users/', 2),
+        ('/users/{member_id}', 4),
+        ('/users/{member_id}/tasks', 3),
+    ]
+)
+def test_read_endpoints_query_budget(test_client, assert_max_queries, auth_header_owner,
+                                     task_in_project, test_user_data, path, max_queries):
+    """
+    Бюджет SQL-запросов на эндпоинт чтения (с загрузкой пользователя из токена
+    и построением индекса членства). Рост числа запросов в app/services/* должен ронять этот тест.
+    """
+    url = path.format(project_id=task_in_project['project_id'],
+                      task_id=task_in_project['id'],
+                      member_id=test_user_data.id)
+    principal_cache.clear()
+    membership_index.clear()
+    with assert_max_queries(max_queries):
+        response = test_client.get(url, headers=auth_header_owner)
+    assert response.status_code == HTTPStatus.OK
+    assert 'X-DB-N-Plus-One' not in response.headers
+
+
+@pytest.mark.parametrize(
+    'method, path, payload, max_queries',
+    [
+        # Было 9: refresh и SELECT проекта со связями после commit
+        ('post', '/projects/', {'title': 'Новый', 'description': 'Описание проекта'}, 3),
+        # Было 9: refresh и SELECT задачи со связями после commit;
+        # + UPSERT счётчиков проекта и исполнителя
+        ('post', '/projects/{project_id}/tasks',
+         {'title': 'Задача', 'description': 'Описание задачи', 'priority': 'high',
+          'assigned_to_email': 'member@test.com'}, 6),
+        # Было 10; + UPSERT счётчиков
+        ('patch', '/tasks/{task_id}', {'title': 'Обновлено', 'status': 'done'}, 4),
+        ('patch', '/tasks/{task_id}', {'assigned_to_email': 'member@test.com'}, 5),
+    ]
+)
+def test_write_endpoints_query_budget(test_client, assert_max_queries, auth_header_owner,
+                                      task_in_project, method, path, payload, max_queries):
+    """
+    Запись без повторного чтения после commit: ответ собирается из объектов,
+    загруженных для проверки прав, а INSERT возвращает id через RETURNING.
+    """
+    url = path.format(project_id=task_in_project['project_id'], task_id=task_in_project['id'])
+    principal_cache.clear()
+    with assert_max_queries(max_queries):
+        response = getattr(test_client, method)(url, headers=auth_header_owner, json=payload)
+    assert response.status_code in (HTTPStatus.OK, HTTPStatus.CREATED)
+    data = response.json()
+    for key, value in payload.items():
+        if key == 'assigned_to_email':
+            assert data['assigned_to']['email'] == value
+        else:
+            assert data[key] == value
+
+
+@pytest.mark.parametrize(
+    'path, absent',
+    [
+        ('/projects/{project_id}?fields=title&include=',
+         ('FROM tasks', 'FROM users', 'project_task_counters', 'projects.description')),
+        ('/projects/{project_id}/tasks/?fields=title,status&include=',
+         ('tasks.description', 'FROM projects', 'FROM users')),
+        ('/tasks/{task_id}?fields=title&include=', ('tasks.description', 'JOIN users', 'JOIN projects')),
+        ('/users/{member_id}?fields=email&include=', ('FROM tasks', 'FROM projects', 'user_task_counters',
+                                                      'users.position')),
+    ]
+)
+def test_sparse_fieldsets_skip_unrequested_data(test_client, assert_max_queries, auth_header_owner,
+                                                task_in_project, test_user_data, path, absent):
+    """Не запрошенные связи не загружаются, не запрошенные колонки не выбираются."""
+    url = path.format(project_id=task_in_project['project_id'],
+                      task_id=task_in_project['id'],
+                      member_id=test_user_data.id)
+    # Прогрев: пользователь из токена и индекс членства не должны попасть в замер
+    assert test_client.get(url, headers=auth_header_owner).status_code == HTTPStatus.OK
+    with assert_max_queries(1) as stats:
+        response = test_client.get(url, headers=auth_header_owner)
+    assert response.status_code == HTTPStatus.OK
+    for shape in stats.shapes:
+        assert not any(fragment in shape for fragment in absent), shape
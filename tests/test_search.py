@@ -0,0 +1,63 @@
+from http import HTTPStatus
+
+import pytest
+from pytest_lazyfixture import lazy_fixture
+
+
+@pytest.fixture
+def searchable_tasks(test_client, project_with_member, task_create_data, auth_header_owner):
+    """Две задачи в проекте владельца: одна упоминает отчёт в названии, другая - в описании."""
+    payload = [
+        {**task_create_data, 'title': 'Квартальный отчёт', 'description': 'Собрать цифры продаж'},
+        {**task_create_data, 'title': 'Созвон', 'description': 'Обсудить отчёт с бухгалтерией'},
+    ]
+    response = test_client.post(f'/projects/{project_with_member["id"]}/tasks:bulk',
+                                headers=auth_header_owner, json=payload)
+    return [item['task']['id'] for item in response.json()['items']]
+
+
+def _search(test_client, headers, q):
+    response = test_client.get('/search', headers=headers, params={'q': q})
+    assert response.status_code == HTTPStatus.OK
+    return [(hit['kind'], hit['id']) for hit in response.json()]
+
+
+def test_search_finds_tasks_and_projects(test_client, auth_header_owner, project_with_member, searchable_tasks):
+    """Совпадение в названии ранжируется выше совпадения в описании; регистр не важен."""
+    in_title, in_description = searchable_tasks
+    assert _search(test_client, auth_header_owner, 'ОТЧЁТ') == [('task', in_title), ('task', in_description)]
+    assert _search(test_client, auth_header_owner, 'квартальный отчёт') == [('task', in_title)]
+    # Последнее слово - по префиксу
+    assert _search(test_client, auth_header_owner, 'бухгалт') == [('task', in_description)]
+    assert ('project', project_with_member['id']) in _search(test_client, auth_header_owner, 'Test_Project')
+
+
+@pytest.mark.parametrize(
+    'auth_header_lazy, expected_visible',
+    [
+        (lazy_fixture('auth_header_owner'), True),
+        (lazy_fixture('auth_header_member'), True),
+        (lazy_fixture('auth_header_admin'), True),
+        (lazy_fixture('auth_header_second_owner'), False),
+    ])
+def test_search_filters_by_project_access(test_client, searchable_tasks, auth_header_lazy, expected_visible):
+    hits = _search(test_client, auth_header_lazy, 'отчёт')
+    assert bool(hits) == expected_visible
+
+
+def test_search_follows_task_writes(test_client, auth_header_owner, searchable_tasks):
+    in_title, in_description = searchable_tasks
+    test_client.patch(f'/tasks/{in_title}', headers=auth_header_owner, json={'title': 'Годовой баланс'})
+    test_client.patch('/tasks/batch', headers=auth_header_owner,
+                      json={'ids': [in_description], 'patch': {'description': 'Обсудить баланс с бухгалтерией'}})
+    assert _search(test_client, auth_header_owner, 'отчёт') == []
+    assert {hit for hit in _search(test_client, auth_header_owner, 'баланс')} == \
+        {('task', in_title), ('task', in_description)}
+
+    test_client.delete(f'/tasks/{in_title}', headers=auth_header_owner)
+    assert _search(test_client, auth_header_owner, 'годовой') == []
+
+
+def test_search_rejects_query_without_words(test_client, auth_header_owner):
+    response = test_client.get('/search', headers=auth_header_owner, params={'q': '"*:)'})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
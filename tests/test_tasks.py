@@ -1,3 +1,5 @@
+import base64
+import json
 from http import HTTPStatus
 
 import pytest
@@ -88,6 +90,34 @@ async def test_3_get_single_task_permissions(test_client, task_in_project,
         assert data['project_id'] == project_id
 
 
+@pytest.mark.parametrize(
+    'auth_header_lazy, expected_status',
+    [
+        (lazy_fixture('auth_header_owner'), HTTPStatus.OK),
+        (lazy_fixture('auth_header_admin'), HTTPStatus.OK),
+        (lazy_fixture('auth_header_second_owner'), HTTPStatus.FORBIDDEN),
+    ]
+)
+def test_get_task_sparse_fieldset(test_client, task_in_project, auth_header_lazy, expected_status):
+    """Без include=project права проверяются без загрузки проекта, ответ - только запрошенные поля."""
+    response = test_client.get(f'/tasks/{task_in_project["id"]}', headers=auth_header_lazy,
+                               params={'fields': 'title,status', 'include': 'author'})
+    assert response.status_code == expected_status
+    if expected_status == HTTPStatus.OK:
+        data = response.json()
+        assert data.keys() == {'id', 'title', 'status', 'author'}
+        assert data['title'] == task_in_project['title']
+
+
+def test_get_tasks_list_sparse_fieldset(test_client, task_in_project, auth_header_owner):
+    response = test_client.get(f'/projects/{task_in_project["project_id"]}/tasks/', headers=auth_header_owner,
+                               params={'fields': 'title,due_date', 'include': ''})
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert data['next_cursor'] is None
+    assert [item.keys() for item in data['items']] == [{'id', 'title', 'due_date'}]
+
+
 @pytest.mark.parametrize(
     'auth_header_lazy, expected_status, case_description',
     [
@@ -142,4 +172,268 @@ async def test_5_delete_task_permissions(test_client, task_in_project,  # Зад
         check_response = test_client.get(
             f'/tasks/{task_id}',
             headers=auth_header_lazy)
-        assert check_response.status_code == HTTPStatus.NOT_FOUND
\ No newline at end of file
+        assert check_response.status_code == HTTPStatus.NOT_FOUND
+
+async def test_get_my_assigned_tasks(test_client, project_with_member, task_create_data,
+                                     auth_header_owner, auth_header_member, test_user_data):
+    """GET /tasks/my возвращает задачи, назначенные текущему пользователю."""
+    project_id = project_with_member['id']
+    task_data = {**task_create_data, 'assigned_to_email': test_user_data.email}
+    created = test_client.post(f'/projects/{project_id}/tasks',
+                               headers=auth_header_owner, json=task_data)
+    assert created.status_code == HTTPStatus.CREATED
+
+    response = test_client.get('/tasks/my', headers=auth_header_member)
+    assert response.status_code == HTTPStatus.OK
+    assert [task['id'] for task in response.json()['items']] == [created.json()['id']]
+
+    response = test_client.get('/tasks/my', headers=auth_header_owner)
+    assert response.json()['items'] == []
+
+
+def _create_tasks(test_client, project_id, headers, task_create_data, count):
+    ids = []
+    for number in range(count):
+        response = test_client.post(f'/projects/{project_id}/tasks', headers=headers,
+                                    json={**task_create_data, 'title': f'Задача {number}'})
+        assert response.status_code == HTTPStatus.CREATED
+        ids.append(response.json()['id'])
+    return ids
+
+
+async def test_get_tasks_list_cursor_pagination(test_client, project_with_member,
+                                                task_create_data, auth_header_owner):
+    """Страницы по курсору покрывают все задачи от новых к старым без повторов."""
+    project_id = project_with_member['id']
+    created_ids = _create_tasks(test_client, project_id, auth_header_owner, task_create_data, 5)
+
+    seen, cursor = [], None
+    while True:
+        params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+        response = test_client.get(f'/projects/{project_id}/tasks/',
+                                   headers=auth_header_owner, params=params)
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert len(data['items']) <= 2
+        seen.extend(task['id'] for task in data['items'])
+        cursor = data['next_cursor']
+        if cursor is None:
+            break
+    assert seen == list(reversed(created_ids))
+
+
+async def test_get_tasks_list_cursor_stable_under_inserts(test_client, project_with_member,
+                                                          task_create_data, auth_header_owner):
+    """Задачи, созданные между запросами страниц, не сдвигают следующую страницу."""
+    project_id = project_with_member['id']
+    created_ids = _create_tasks(test_client, project_id, auth_header_owner, task_create_data, 4)
+    url = f'/projects/{project_id}/tasks/'
+
+    first_page = test_client.get(url, headers=auth_header_owner, params={'limit': 2}).json()
+    _create_tasks(test_client, project_id, auth_header_owner, task_create_data, 2)
+    second_page = test_client.get(url, headers=auth_header_owner,
+                                  params={'limit': 2, 'cursor': first_page['next_cursor']}).json()
+
+    assert [task['id'] for task in first_page['items']] == created_ids[:1:-1]
+    assert [task['id'] for task in second_page['items']] == created_ids[1::-1]
+    assert second_page['next_cursor'] is None
+
+
+@pytest.mark.parametrize('params', [{'cursor': 'не-курсор'}, {'limit': 0}, {'limit': 10_000}])
+async def test_get_tasks_list_invalid_pagination(test_client, project_with_member,
+                                                 auth_header_owner, params):
+    """Повреждённый курсор - 400, limit вне допустимых границ - 422."""
+    response = test_client.get(f'/projects/{project_with_member["id"]}/tasks/',
+                               headers=auth_header_owner, params=params)
+    expected = HTTPStatus.BAD_REQUEST if 'cursor' in params else HTTPStatus.UNPROCESSABLE_ENTITY
+    assert response.status_code == expected
+
+
+def _forge_cursor(payload) -> str:
+    raw = json.dumps(payload).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('payload', [
+    [[1], 2],
+    [{'a': 1}, 2],
+    ['2024-01-01T00:00:00', [2], 'dt'],
+    ['not-a-date', 2, 'dt'],
+    [5, 2, 'dt'],
+    ['2024-01-01T00:00:00', 2],
+    ['2024-01-01T00:00:00', 2, 'xx'],
+    [None, 2],
+    ['2024-01-01T00:00:00', True, 'dt'],
+])
+async def test_get_tasks_list_forged_cursor(test_client, project_with_member, task_create_data,
+                                            auth_header_owner, payload):
+    """Курсор с корректным base64/JSON, но чужими типами значений - 400, а не ошибка SQL."""
+    _create_tasks(test_client, project_with_member['id'], auth_header_owner, task_create_data, 1)
+    response = test_client.get(f'/projects/{project_with_member["id"]}/tasks/',
+                               headers=auth_header_owner, params={'cursor': _forge_cursor(payload)})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+async def test_update_task_reassign(test_client, task_in_project, auth_header_owner,
+                                    test_user_data, second_owner_user_data):
+    """Исполнителя можно сменить на участника проекта, снять (null), но не назначить постороннего."""
+    url = f'/tasks/{task_in_project["id"]}'
+
+    response = test_client.patch(url, headers=auth_header_owner,
+                                 json={'assigned_to_email': test_user_data.email})
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['assigned_to']['id'] == test_user_data.id
+
+    response = test_client.patch(url, headers=auth_header_owner,
+                                 json={'assigned_to_email': second_owner_user_data.email})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+    response = test_client.patch(url, headers=auth_header_owner, json={'assigned_to_email': None})
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['assigned_to'] is None
+
+
+async def test_create_tasks_bulk_reports_per_item(test_client, project_with_member, task_create_data,
+                                                  auth_header_member, test_user_data, owner_user_data,
+                                                  second_owner_user_data):
+    """Пакет создаётся одной транзакцией, задачи с посторонним исполнителем отклоняются по отдельности."""
+    project_id = project_with_member['id']
+    payload = [
+        {**task_create_data, 'title': 'Без исполнителя'},
+        {**task_create_data, 'title': 'Владельцу', 'assigned_to_email': owner_user_data.email},
+        {**task_create_data, 'title': 'Постороннему', 'assigned_to_email': second_owner_user_data.email},
+        {**task_create_data, 'title': 'Себе', 'assigned_to_email': test_user_data.email},
+    ]
+    response = test_client.post(f'/projects/{project_id}/tasks:bulk',
+                                headers=auth_header_member, json=payload)
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert (data['created'], data['failed']) == (3, 1)
+    assert [item['status'] for item in data['items']] == ['created', 'created', 'error', 'created']
+    assert data['items'][2]['task'] is None and data['items'][2]['error']
+    assert data['items'][1]['task']['assigned_to']['id'] == owner_user_data.id
+    assert {item['task']['author']['id'] for item in data['items'] if item['task']} == {test_user_data.id}
+
+    listed = test_client.get(f'/projects/{project_id}/tasks/', headers=auth_header_member).json()['items']
+    assert sorted(task['title'] for task in listed) == ['Без исполнителя', 'Владельцу', 'Себе']
+
+
+@pytest.mark.parametrize(
+    'auth_header_lazy, expected_status',
+    [
+        (lazy_fixture('auth_header_second_owner'), HTTPStatus.FORBIDDEN),
+        (lazy_fixture('auth_header_admin'), HTTPStatus.FORBIDDEN),
+    ]
+)
+async def test_create_tasks_bulk_permissions(test_client, project_with_member, task_create_data,
+                                             auth_header_lazy, expected_status):
+    response = test_client.post(f'/projects/{project_with_member["id"]}/tasks:bulk',
+                                headers=auth_header_lazy, json=[task_create_data])
+    assert response.status_code == expected_status
+
+
+async def test_create_tasks_bulk_constant_query_count(test_client, project_with_member, task_create_data,
+                                                      auth_header_owner, test_user_data, assert_max_queries,
+                                                      async_test_engine):
+    """
+    Число чтений не зависит от размера пакета: пользователь из токена, проект, пользователи проекта.
+    INSERT задач один на пакет там, где СУБД возвращает id многострочной вставки по порядку
+    (PostgreSQL); SQLite такой гарантии не даёт, и SQLAlchemy вставляет построчно.
+    Счётчики задач обновляются двумя UPSERT на весь пакет.
+    """
+    payload = [{**task_create_data, 'title': f'Задача {n}', 'assigned_to_email': test_user_data.email}
+               for n in range(50)]
+    with assert_max_queries(len(payload) + 5) as stats:
+        response = test_client.post(f'/projects/{project_with_member["id"]}/tasks:bulk',
+                                    headers=auth_header_owner, json=payload)
+    assert response.json()['created'] == 50
+    inserts = sum(count for shape, count in stats.shapes.items() if shape.startswith('INSERT INTO tasks'))
+    upserts = sum(count for shape, count in stats.shapes.items() if shape.startswith('INSERT INTO')) - inserts
+    assert stats.count - inserts - upserts <= 3
+    assert upserts == 2
+    batched = async_test_engine.dialect.name == 'postgresql'
+    assert inserts == (1 if batched else len(payload))
+
+
+async def test_create_tasks_bulk_validates_size(test_client, project_with_member, auth_header_owner):
+    response = test_client.post(f'/projects/{project_with_member["id"]}/tasks:bulk',
+                                headers=auth_header_owner, json=[])
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def _bulk_create(test_client, project_id, headers, task_create_data, count):
+    response = test_client.post(f'/projects/{project_id}/tasks:bulk', headers=headers,
+                                json=[{**task_create_data, 'title': f'Задача {n}'} for n in range(count)])
+    assert response.status_code == HTTPStatus.OK
+    return [item['task']['id'] for item in response.json()['items']]
+
+
+async def test_update_tasks_batch_shared_patch(test_client, project_with_member, second_owner_project,
+                                               task_create_data, auth_header_owner, auth_header_second_owner):
+    """Общий patch применяется к доступным задачам, остальные ID получают ошибку."""
+    own_ids = _bulk_create(test_client, project_with_member['id'], auth_header_owner, task_create_data, 3)
+    foreign_id, = _bulk_create(test_client, second_owner_project['id'], auth_header_second_owner,
+                               task_create_data, 1)
+
+    response = test_client.patch('/tasks/batch', headers=auth_header_owner,
+                                 json={'ids': own_ids + [foreign_id, 999_999],
+                                       'patch': {'status': 'done'}})
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert (data['updated'], data['failed']) == (3, 2)
+    statuses = {item['id']: item['status'] for item in data['items']}
+    assert statuses == {**{task_id: 'updated' for task_id in own_ids},
+                        foreign_id: 'error', 999_999: 'error'}
+
+    listed = test_client.get(f'/projects/{project_with_member["id"]}/tasks/', headers=auth_header_owner)
+    assert {task['status'] for task in listed.json()['items']} == {'done'}
+    foreign = test_client.get(f'/tasks/{foreign_id}', headers=auth_header_second_owner).json()
+    assert foreign['status'] == 'todo'
+
+
+async def test_update_tasks_batch_per_item_patches(test_client, project_with_member, task_create_data,
+                                                   auth_header_owner, test_user_data,
+                                                   second_owner_user_data, assert_max_queries):
+    """Отдельные patch-и: переназначение участнику, отказ для постороннего, постоянное число запросов."""
+    first, second, third = _bulk_create(test_client, project_with_member['id'], auth_header_owner,
+                                        task_create_data, 3)
+    payload = {'items': [
+        {'id': first, 'assigned_to_email': test_user_data.email, 'priority': 'high'},
+        {'id': second, 'assigned_to_email': second_owner_user_data.email},
+        {'id': third, 'title': 'Переименована'},
+    ]}
+    with assert_max_queries(6):
+        response = test_client.patch('/tasks/batch', headers=auth_header_owner, json=payload)
+    errors = {item['id']: item['error'] for item in response.json()['items']}
+    assert errors[first] is None and errors[third] is None and errors[second]
+
+    first_task = test_client.get(f'/tasks/{first}', headers=auth_header_owner).json()
+    assert (first_task['assigned_to']['id'], first_task['priority']) == (test_user_data.id, 'high')
+    assert test_client.get(f'/tasks/{third}', headers=auth_header_owner).json()['title'] == 'Переименована'
+
+
+async def test_update_tasks_batch_rejects_null_for_required_fields(test_client, project_with_member,
+                                                                   task_create_data, auth_header_owner):
+    """Явный null в обязательном поле - отказ для этой задачи, остальные обновляются."""
+    first, second = _bulk_create(test_client, project_with_member['id'], auth_header_owner,
+                                 task_create_data, 2)
+    payload = {'items': [{'id': first, 'title': None, 'due_date': None},
+                         {'id': second, 'title': 'Переименована'}]}
+    response = test_client.patch('/tasks/batch', headers=auth_header_owner, json=payload)
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    errors = {item['id']: item['error'] for item in data['items']}
+    assert 'title' in errors[first] and errors[second] is None
+    assert (data['updated'], data['failed']) == (1, 1)
+    assert test_client.get(f'/tasks/{first}', headers=auth_header_owner).json()['title'] == 'Задача 0'
+
+
+@pytest.mark.parametrize('payload', [
+    {'ids': [1]},
+    {'patch': {'status': 'done'}},
+    {'ids': [1], 'patch': {'status': 'done'}, 'items': [{'id': 1, 'title': 'Дубль'}]},
+    {},
+])
+async def test_update_tasks_batch_validation(test_client, auth_header_owner, payload):
+    response = test_client.patch('/tasks/batch', headers=auth_header_owner, json=payload)
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
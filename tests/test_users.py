@@ -3,6 +3,7 @@ from http import HTTPStatus
 from pytest_lazyfixture import lazy_fixture
 
 from app.auth import verify_password
+from app.models.users import UserRole
 
 AUTH_CASES = [
     (lazy_fixture('auth_header_member'), HTTPStatus.OK, 'member@test.com'),
@@ -136,3 +137,259 @@ def test_login_user_invalid_credentials(test_client, owner_user_data, email, pas
 
 
 
+
+
+def test_principal_cache_hit_on_repeated_requests(test_client, auth_header_member):
+    """
+    Повторный запрос с тем же токеном не читает пользователя из БД.
+    """
+    from app.auth import principal_cache
+
+    assert test_client.get('/users/me', headers=auth_header_member).status_code == HTTPStatus.OK
+    assert test_client.get('/users/me', headers=auth_header_member).status_code == HTTPStatus.OK
+
+    stats = principal_cache.stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] == 1
+
+
+def test_principal_cache_invalidated_on_role_change(test_client, test_user_data,
+                                                    auth_header_member, auth_header_admin,
+                                                    create_project_data):
+    """
+    Смена роли администратором применяется сразу, несмотря на кэш.
+    """
+    response = test_client.post('/projects', json=create_project_data, headers=auth_header_member)
+    assert response.status_code == HTTPStatus.FORBIDDEN
+
+    response = test_client.patch(
+        f'/users/{test_user_data.id}',
+        json={'user': {'first_name': 'Броксигар', 'last_name': 'Саурфанг'},
+              'user_admin_data': {'role': 'owner'}},
+        headers=auth_header_admin)
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['role'] == 'owner'
+
+    response = test_client.post('/projects', json=create_project_data, headers=auth_header_member)
+    assert response.status_code == HTTPStatus.CREATED
+
+
+async def test_password_pool_rejects_when_saturated():
+    """
+    Пул паролей с заполненной очередью сразу отказывает, а не ждёт.
+    """
+    import asyncio
+    import threading
+    from app.password_pool import BoundedExecutor, PoolSaturatedError
+
+    pool = BoundedExecutor(max_workers=1, max_queue=0)
+    release = threading.Event()
+    running = asyncio.ensure_future(pool.run(release.wait))
+    await asyncio.sleep(0.05)
+
+    with pytest.raises(PoolSaturatedError):
+        await pool.run(lambda: None)
+
+    release.set()
+    assert await running is True
+    assert pool.stats()['rejected'] == 1
+    pool.shutdown()
+
+
+async def test_password_pool_keeps_slot_until_cancelled_job_finishes():
+    """
+    Отмена ожидания не освобождает место, пока задача работает в пуле; ошибки считаются отдельно.
+    """
+    import asyncio
+    import threading
+    from app.password_pool import BoundedExecutor, PoolSaturatedError
+
+    pool = BoundedExecutor(max_workers=1, max_queue=0)
+    release = threading.Event()
+    running = asyncio.ensure_future(pool.run(release.wait))
+    await asyncio.sleep(0.05)
+    running.cancel()
+    await asyncio.sleep(0.05)
+
+    assert pool.stats()['pending'] == 1
+    with pytest.raises(PoolSaturatedError):
+        await pool.run(lambda: None)
+
+    release.set()
+    await asyncio.sleep(0.05)
+    with pytest.raises(ZeroDivisionError):
+        await pool.run(lambda: 1 / 0)
+
+    stats = pool.stats()
+    assert stats['pending'] == 0
+    assert stats['completed'] == 1
+    assert stats['failed'] == 1
+    pool.shutdown()
+
+
+def test_login_returns_503_when_password_pool_saturated(test_client, owner_user_data, monkeypatch):
+    """
+    При переполнении пула хеширования логин отвечает 503 с Retry-After.
+    """
+    from app.auth import password_pool
+
+    monkeypatch.setattr(password_pool, 'pending', password_pool.capacity)
+    response = test_client.post('/users/token',
+                                data={'username': owner_user_data.email, 'password': '12345Qwert'})
+
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert 'Retry-After' in response.headers
+
+
+async def test_get_users_directory_pagination_and_filters(test_client, user_factory, auth_header_owner):
+    """Справочник сотрудников: по алфавиту, постранично, с фильтрами по роли и должности."""
+    for first_name, role, position in [('Вера', UserRole.member, 'QA'), ('Анна', UserRole.manager, 'PM'),
+                                       ('Борис', UserRole.member, 'Dev'), ('Анна', UserRole.member, 'Dev')]:
+        await user_factory(email=f'{first_name}.{position}@test.com', role=role,
+                           first_name=first_name, position=position)
+
+    names, cursor = [], None
+    while True:
+        params = {'limit': 2, 'with_total': True, **({'cursor': cursor} if cursor else {})}
+        response = test_client.get('/users/', headers=auth_header_owner, params=params)
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers['X-Total-Count'] == '5'
+        names.extend(user['first_name'] for user in response.json())
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor is None:
+            break
+    assert names == sorted(names) and len(names) == 5
+
+    response = test_client.get('/users/', headers=auth_header_owner,
+                               params={'role': 'member', 'position': 'Dev'})
+    assert [(user['first_name'], user['position']) for user in response.json()] == [('Анна', 'Dev'), ('Борис', 'Dev')]
+
+    response = test_client.get('/users/', headers=auth_header_owner, params={'cursor': 'broken'})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def _lookup(test_client, headers, q, **params):
+    response = test_client.get('/users/lookup', headers=headers, params={'q': q, **params})
+    assert response.status_code == HTTPStatus.OK, response.text
+    return [user['email'] for user in response.json()]
+
+
+def test_lookup_users_by_prefix_substring_and_typo(test_client, auth_header_owner, test_user_data,
+                                                   second_owner_user_data, admin_user_data):
+    """Начало email, часть фамилии, опечатка в имени; совпадения с начала поля - выше."""
+    assert _lookup(test_client, auth_header_owner, 'member') == ['member@test.com']
+    assert _lookup(test_client, auth_header_owner, 'фанг') == ['member@test.com']
+    assert _lookup(test_client, auth_header_owner, 'Броксигр') == ['member@test.com']
+    assert _lookup(test_client, auth_header_owner, 'утер светоносный') == ['second_owner@test.com']
+    # 'owner@' совпадает с началом email владельца и с серединой second_owner@
+    assert _lookup(test_client, auth_header_owner, 'owner')[:2] == ['owner@test.com', 'second_owner@test.com']
+    assert _lookup(test_client, auth_header_owner, 'test', limit=2) == _lookup(test_client, auth_header_owner,
+                                                                                  'test')[:2]
+
+
+def test_lookup_users_scoped_to_project(test_client, project_with_member, auth_header_owner,
+                                        second_owner_user_data, auth_header_second_owner):
+    project_id = project_with_member['id']
+    assert set(_lookup(test_client, auth_header_owner, 'test', project_id=project_id)) == \
+        {'owner@test.com', 'member@test.com'}
+
+    response = test_client.get('/users/lookup', headers=auth_header_second_owner,
+                               params={'q': 'test', 'project_id': project_id})
+    assert response.status_code == HTTPStatus.FORBIDDEN
+    response = test_client.get('/users/lookup', headers=auth_header_owner,
+                               params={'q': 'test', 'project_id': 999_999})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_lookup_users_sees_profile_changes(test_client, auth_header_member, test_user_data):
+    assert _lookup(test_client, auth_header_member, 'Гаррош') == []
+    response = test_client.patch(f'/users/{test_user_data.id}', headers=auth_header_member,
+                                 json={'user': {'first_name': 'Гаррош', 'last_name': 'Адский'},
+                                       'user_admin_data': {}})
+    assert response.status_code == HTTPStatus.OK, response.text
+    assert _lookup(test_client, auth_header_member, 'Гаррош') == ['member@test.com']
+
+
+def test_lookup_users_rejects_query_without_words(test_client, auth_header_owner):
+    response = test_client.get('/users/lookup', headers=auth_header_owner, params={'q': '%%'})
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_get_profile_sparse_fieldset(test_client, auth_header_member, test_user_data):
+    """include=task_counts отдаёт счётчики без списков задач и проектов."""
+    response = test_client.get('/users/me', headers=auth_header_member,
+                               params={'fields': 'email', 'include': 'task_counts'})
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert data.keys() == {'id', 'email', 'task_counts', 'tasks_count'}
+    assert data['id'] == test_user_data.id
+
+    response = test_client.get('/users/', headers=auth_header_member, params={'fields': 'first_name'})
+    assert response.status_code == HTTPStatus.OK
+    assert all(item.keys() == {'id', 'first_name'} for item in response.json())
+
+
+def test_get_profile_summary(test_client, project_with_member, task_create_data,
+                             auth_header_owner, auth_header_member, test_user_data, owner_user_data):
+    """Сводка: счётчики, последние и срочные задачи; полный список - в /users/{id}/tasks."""
+    project_id = project_with_member['id']
+    plan = [('2030-03-01', 'medium'), (None, 'high'), ('2030-01-01', 'low'),
+            ('2030-01-01', 'high'), ('2029-12-01', 'medium'), (None, 'low')]
+    ids = []
+    for number, (due_date, priority) in enumerate(plan):
+        response = test_client.post(f'/projects/{project_id}/tasks', headers=auth_header_owner,
+                                    json={**task_create_data, 'title': f'Задача {number}', 'due_date': due_date,
+                                          'priority': priority, 'assigned_to_email': test_user_data.email})
+        assert response.status_code == HTTPStatus.CREATED
+        ids.append(response.json()['id'])
+    response = test_client.patch(f'/tasks/{ids[4]}', headers=auth_header_owner, json={'status': 'done'})
+    assert response.status_code == HTTPStatus.OK
+
+    response = test_client.get('/users/me', headers=auth_header_member, params={'summary_size': 3})
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert 'assigned_tasks' not in data
+    assert data['tasks_count'] == 6
+    assert [task['id'] for task in data['recent_tasks']] == [ids[5], ids[4], ids[3]]
+    # Ближайший дедлайн, при равном - высокий приоритет; выполненная задача не срочная
+    assert [task['id'] for task in data['urgent_tasks']] == [ids[3], ids[2], ids[0]]
+    assert data['urgent_tasks'][0]['project']['id'] == project_id
+
+    response = test_client.get(f'/users/{owner_user_data.id}', headers=auth_header_member)
+    data = response.json()
+    assert data['owned_projects_count'] == 1
+    assert [project['id'] for project in data['owned_projects']] == [project_id]
+
+    response = test_client.get('/users/me', headers=auth_header_member,
+                               params={'fields': 'owned_projects_count', 'include': 'urgent_tasks'})
+    assert response.json().keys() == {'id', 'owned_projects_count', 'urgent_tasks'}
+    assert test_client.get('/users/me', headers=auth_header_member,
+                           params={'summary_size': 0}).status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_get_user_tasks_cursor_pagination(test_client, project_with_member, task_create_data,
+                                          auth_header_owner, test_user_data):
+    """GET /users/{id}/tasks отдаёт все назначенные задачи страницами по курсору."""
+    project_id = project_with_member['id']
+    created_ids = []
+    for number in range(5):
+        response = test_client.post(f'/projects/{project_id}/tasks', headers=auth_header_owner,
+                                    json={**task_create_data, 'title': f'Задача {number}',
+                                          'assigned_to_email': test_user_data.email})
+        created_ids.append(response.json()['id'])
+
+    seen, cursor = [], None
+    while True:
+        params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+        response = test_client.get(f'/users/{test_user_data.id}/tasks', headers=auth_header_owner, params=params)
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        seen.extend(task['id'] for task in data['items'])
+        cursor = data['next_cursor']
+        if cursor is None:
+            break
+    assert seen == created_ids[::-1]
+
+    response = test_client.get(f'/users/{test_user_data.id}/tasks', headers=auth_header_owner,
+                               params={'cursor': 'garbage'})
+    assert response.status_code == HTTPStatus.BAD_REQUEST